@@ -1,11 +1,14 @@
-from sqlalchemy import create_engine
+from sqlalchemy import bindparam, create_engine, event, text
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from typing import Dict
 import urllib
 
 import os
 from dotenv import load_dotenv
 
+from app.services import metrics, read_your_writes
+
 load_dotenv()
 
 server = os.getenv("DB_SERVER")
@@ -14,29 +17,172 @@ username = os.getenv("DB_USERNAME")
 password = os.getenv("DB_PASSWORD")
 driver = "ODBC Driver 17 for SQL Server"
 
+# Opcionális: beágyazott / helyi adatbázis (pl. sqlite:///data/finance.db) - load teszt, fejlesztés
+database_url = os.getenv("DATABASE_URL")
+
+sql_echo = True if os.getenv("DEBUG") == "True" else False  # SQL logolás debug módban
+
+# Opcionális olvasó replika: GET végpontok és analytics innen olvasnak
+# (pl. Azure SQL geo-replika: DB_READ_SERVER, vagy DATABASE_READ_URL=sqlite:///data/replica.db)
+database_read_url = os.getenv("DATABASE_READ_URL")
+read_server = os.getenv("DB_READ_SERVER")
+
+
+def create_url_engine(url: str):
+    return create_engine(
+        url,
+        echo=sql_echo,
+        connect_args=(
+            # Több szálról (uvicorn threadpool) is használható, íráskor vár a zárra
+            {"check_same_thread": False, "timeout": 30}
+            if url.startswith("sqlite")
+            else {}
+        ),
+    )
 
-password = urllib.parse.quote_plus(password)
 
+def create_mssql_engine(host: str, read_only: bool = False):
+    # ApplicationIntent=ReadOnly: readable secondary replikára irányít
+    intent = "&ApplicationIntent=ReadOnly" if read_only else ""
+    return create_engine(
+        f"mssql+pyodbc://{username}:{urllib.parse.quote_plus(password)}@{host}:1433/{database}?driver={urllib.parse.quote_plus(driver)}&Encrypt=yes&TrustServerCertificate=no&Connection+Timeout=60{intent}",
+        echo=sql_echo,
+        pool_pre_ping=True,  # Connection health check
+        pool_recycle=300,  # Connection refresh 5 percenként)
+        pool_timeout=60,  # Connection pool timeout
+        fast_executemany=True,  # Bulk INSERT-ek egy round trip-ben (pl. restore)
+        connect_args={
+            "timeout": 60,  # PyODBC timeout
+            "unicode_results": True,  # ← FONTOS!
+        },
+    )
 
-engine = create_engine(
-    f"mssql+pyodbc://{username}:{password}@{server}:1433/{database}?driver={urllib.parse.quote_plus(driver)}&Encrypt=yes&TrustServerCertificate=no&Connection+Timeout=60",
-    echo=True if os.getenv("DEBUG") == "True" else False,  # SQL logolás debug módban
-    pool_pre_ping=True,  # Connection health check
-    pool_recycle=300,  # Connection refresh 5 percenként)
-    pool_timeout=60,  # Connection pool timeout
-    connect_args={
-        "timeout": 60,  # PyODBC timeout
-        "unicode_results": True,  # ← FONTOS!
-    },
+
+engine = (
+    create_url_engine(database_url) if database_url else create_mssql_engine(server)
 )
+
+if database_read_url:
+    read_engine = create_url_engine(database_read_url)
+elif read_server and not database_url:
+    read_engine = create_mssql_engine(read_server, read_only=True)
+else:
+    read_engine = engine
+
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+ReadSessionLocal = sessionmaker(
+    bind=read_engine,
+    autocommit=False,
+    autoflush=False,
+    info={"replica": read_engine is not engine},
+)
+
+# A DB tranzakcióban növelt data_versions verziók (commit után: commit token)
+_WRITTEN_VERSIONS_KEY = "written_versions"
+
+
+def remember_version(db: Session, name: str, version: int) -> None:
+    """bump_version hívja: a verzió commit után a kliens commit tokenjébe kerül"""
+    db.info.setdefault(_WRITTEN_VERSIONS_KEY, {})[name] = version
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _record_write(session):
+    versions = session.info.pop(_WRITTEN_VERSIONS_KEY, None)
+    if versions:
+        read_your_writes.remember_commit(versions)
+
+
+@event.listens_for(SessionLocal, "after_transaction_end")
+def _discard_written(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(_WRITTEN_VERSIONS_KEY, None)
+
+
+def is_replica(db: Session) -> bool:
+    """A session a replikáról olvas: az eredménye nem kerülhet megosztott cache-be"""
+    return db.info.get("replica", False)
+
+
+def replica_caught_up(db: Session, versions: Dict[str, int]) -> bool:
+    """A replika data_versions verziói elérik-e a kliens commit tokenjét"""
+    statement = text(
+        "SELECT name, version FROM data_versions WHERE name IN :names"
+    ).bindparams(bindparam("names", expanding=True))
+    applied = dict(db.execute(statement, {"names": list(versions)}).all())
+    return all(applied.get(name, 0) >= version for name, version in versions.items())
+
+
+def read_session() -> Session:
+    """
+    Olvasó session: a replikáról, kivéve ha nincs külön replika, vagy a kliens
+    commit tokenje (saját írásai) újabb a replikán már látható verzióknál -
+    ekkor a primary-ről (a kliens a saját írását mindig látja).
+    """
+    if read_engine is engine:
+        return SessionLocal()
+    db = ReadSessionLocal()
+    versions = read_your_writes.client_versions()
+    if versions:
+        if not replica_caught_up(db, versions):
+            db.close()
+            return SessionLocal()
+        read_your_writes.mark_caught_up()
+    return db
+
+
+def replication_status():
+    return {
+        "read_replica": read_engine is not engine,
+        "read_your_writes": "commit_token cookie",
+    }
+
 
 Base = declarative_base()
 
 
-def get_db():
+def get_write_db():
+    """Író session (primary) - módosító végpontok"""
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+def get_read_db():
+    """Olvasó session (replika, read-your-writes ablakkal) - GET végpontok, analytics"""
+    db = read_session()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# Visszafelé kompatibilis név: írás-olvasás a primary-n
+get_db = get_write_db
+
+
+def pool_metrics():
+    """DB connection pool állapota engine-enként (write / read) a /metrics-hez"""
+    engines = {"write": engine}
+    if read_engine is not engine:
+        engines["read"] = read_engine
+    gauges = {
+        "db_pool_size": ("Pool mérete", "size"),
+        "db_pool_checked_out": ("Kiadott (használt) kapcsolatok", "checkedout"),
+        "db_pool_checked_in": ("Szabad kapcsolatok a poolban", "checkedin"),
+        "db_pool_overflow": ("Pool méreten felüli kapcsolatok", "overflow"),
+    }
+    result = []
+    for name, (documentation, method) in gauges.items():
+        samples = [
+            ({"engine": label}, getattr(pool_engine.pool, method)())
+            for label, pool_engine in engines.items()
+            if hasattr(pool_engine.pool, method)
+        ]
+        result.append((name, "gauge", documentation, samples))
+    return result
+
+
+metrics.register_collector(pool_metrics)
@@ -6,8 +6,10 @@ from sqlalchemy import (
     Date,
     DateTime,
     ForeignKey,
+    Index,
     Numeric,
     Unicode,
+    text,
 )
 from decimal import Decimal
 from sqlalchemy.sql import func
@@ -23,6 +25,21 @@ class CategoryKeyword(Base):
     )
     keyword = Column(Unicode(100), nullable=False, index=True)  # ← Index!
 
+    # Szabály beállítások (alapértelmezés: partner név részstring, mint korábban)
+    field = Column(
+        String(30),
+        nullable=False,
+        default="partner_name",
+        server_default="partner_name",
+    )
+    match_type = Column(
+        String(20), nullable=False, default="substring", server_default="substring"
+    )
+    direction = Column(String(10), nullable=True)  # "Bejövő" / "Kimenő" / bármelyik
+    min_amount = Column(Numeric(15, 2), nullable=True)  # Összeg abszolút értékére
+    max_amount = Column(Numeric(15, 2), nullable=True)
+    priority = Column(Integer, nullable=False, default=0, server_default="0")
+
     # Relationship
     category = relationship("Category", back_populates="keywords")
 
@@ -40,6 +57,9 @@ class Category(Base):
     keywords = relationship(
         "CategoryKeyword", back_populates="category", cascade="all, delete-orphan"
     )
+    budgets = relationship(
+        "Budget", back_populates="category", cascade="all, delete-orphan"
+    )
 
 
 class Transaction(Base):
@@ -63,7 +83,110 @@ class Transaction(Base):
         Integer, ForeignKey("categories.id"), nullable=True, index=True
     )
 
+    # Duplikáció szűréshez: dátum + összeg + partner normalizált hash-e
+    fingerprint = Column(String(64), nullable=True)
+
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
 
     category = relationship("Category", back_populates="transactions")
+
+    __table_args__ = (
+        # Filtered unique index: a még ki nem töltött (NULL) fingerprint-ek megengedettek
+        Index(
+            "ux_transactions_fingerprint",
+            "fingerprint",
+            unique=True,
+            mssql_where=text("fingerprint IS NOT NULL"),
+            postgresql_where=text("fingerprint IS NOT NULL"),
+            sqlite_where=text("fingerprint IS NOT NULL"),
+        ),
+        # Számlánkénti egyenleg / cash-flow lekérdezésekhez
+        Index("ix_transactions_account_date", "account_number", "transaction_date"),
+    )
+
+
+class FxRate(Base):
+    __tablename__ = "fx_rates"
+
+    id = Column(Integer, primary_key=True, index=True)
+    rate_date = Column(Date, nullable=False)
+    currency = Column(String(3), nullable=False)
+    rate_to_huf = Column(Numeric(18, 6), nullable=False)  # 1 egység = ennyi HUF
+
+    __table_args__ = (
+        # Árfolyam keresés: currency + legutóbbi dátum <= tranzakció dátuma
+        Index("ux_fx_rates_currency_date", "currency", "rate_date", unique=True),
+    )
+
+
+class Budget(Base):
+    __tablename__ = "budgets"
+
+    id = Column(Integer, primary_key=True, index=True)
+    category_id = Column(
+        Integer, ForeignKey("categories.id"), nullable=False, index=True
+    )
+    period = Column(String(10), nullable=False)  # "monthly" vagy "yearly"
+    amount = Column(Numeric(15, 2), nullable=False)  # Keret HUF-ban
+
+    created_at = Column(DateTime, default=func.now())
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+    category = relationship("Category", back_populates="budgets")
+
+    __table_args__ = (
+        # Kategóriánként periódusonként egy keret
+        Index("ux_budgets_category_period", "category_id", "period", unique=True),
+    )
+
+
+class BudgetTotal(Base):
+    """Kategória havi nettó költése HUF-ban, írásonként inkrementálisan karbantartva"""
+
+    __tablename__ = "budget_totals"
+
+    id = Column(Integer, primary_key=True, index=True)
+    category_id = Column(Integer, nullable=False)
+    year = Column(Integer, nullable=False)
+    month = Column(Integer, nullable=False)
+    spent = Column(Numeric(18, 2), nullable=False, default=0, server_default="0")
+    transaction_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (
+        Index(
+            "ux_budget_totals_category_month",
+            "category_id",
+            "year",
+            "month",
+            unique=True,
+        ),
+    )
+
+
+class DataVersion(Base):
+    """Adatkörönkénti verziószámláló (workerek közötti cache invalidálás)"""
+
+    __tablename__ = "data_versions"
+
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+
+class TransactionChange(Base):
+    """
+    Tranzakció change log: minden írás egy sort kap monoton seq-kel
+    (GET /api/changes?since=<seq> delta szinkronhoz, törlésnél tombstone)
+    """
+
+    __tablename__ = "transaction_changes"
+
+    seq = Column(Integer, primary_key=True)
+    # Nem FK: a törölt tranzakciók tombstone-ja megmarad
+    transaction_id = Column(Integer, nullable=True)
+    operation = Column(String(10), nullable=False)
+    changed_at = Column(DateTime, nullable=False)
+
+    # SQLite: AUTOINCREMENT, hogy törlés után se kerüljön újra kiosztásra egy seq
+    __table_args__ = {"sqlite_autoincrement": True}
@@ -0,0 +1,390 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import case, extract, func, select
+from sqlalchemy.orm import Session
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+from app.database.database import get_read_db, get_write_db
+from app.database.models import Category, Transaction
+from app.services import (
+    anomalies,
+    archive,
+    balances,
+    ledger_cache,
+    recurring,
+    reports,
+)
+from app.services.fx import BASE_CURRENCY, amount_in_base_currency
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+TOTALS_GROUP_BY = ("month", "category", "currency")
+TIMESERIES_INTERVALS = ("day", "month")
+
+
+def parse_date_range(date_from: str = None, date_to: str = None):
+    """ISO dátum paraméterek konvertálása (400 hibás formátumnál)"""
+    try:
+        start_date = datetime.fromisoformat(date_from).date() if date_from else None
+        end_date = datetime.fromisoformat(date_to).date() if date_to else None
+    except ValueError:
+        raise HTTPException(400, "Invalid date format")
+    return start_date, end_date
+
+
+def format_totals_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Aggregált sor egységes formára hozása (SQL és memória út is ezt használja)"""
+    item = {}
+    for key, value in row.items():
+        if key in ("income", "expense", "missing_rate_count", "transaction_count"):
+            continue
+        if key in ("year", "month"):
+            value = int(value)
+        elif key == "date":
+            value = value.isoformat() if value is not None else None
+        elif key == "category_id" and value is not None:
+            value = int(value) if value >= 0 else None
+        item[key] = value
+
+    income_value = float(row["income"] or 0)
+    expense_value = float(row["expense"] or 0)
+    item.update(
+        {
+            "transaction_count": int(row["transaction_count"]),
+            "income": income_value,
+            "expense": expense_value,
+            "net": income_value - expense_value,
+            "missing_rate_count": int(row["missing_rate_count"] or 0),
+        }
+    )
+    return item
+
+
+def sql_aggregate(
+    db: Session,
+    group_by: str,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    category_id: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """Bevétel / kiadás aggregálás HUF-ban egyetlen GROUP BY lekérdezéssel"""
+
+    # Belső lekérdezés: soronként egyszer számolt HUF összeg
+    ledger = select(
+        Transaction.transaction_date,
+        Transaction.category_id,
+        Transaction.currency,
+        Transaction.direction,
+        amount_in_base_currency().label("amount_huf"),
+    )
+    if start_date:
+        ledger = ledger.where(Transaction.transaction_date >= start_date)
+    if end_date:
+        ledger = ledger.where(Transaction.transaction_date <= end_date)
+    if category_id is not None:
+        ledger = ledger.where(Transaction.category_id == category_id)
+    ledger = ledger.subquery()
+
+    # Irány alapján előjelezve (a bank export előjele nem mindig megbízható)
+    income = func.sum(
+        case((ledger.c.direction == "Bejövő", func.abs(ledger.c.amount_huf)), else_=0)
+    )
+    expense = func.sum(
+        case((ledger.c.direction == "Kimenő", func.abs(ledger.c.amount_huf)), else_=0)
+    )
+    missing_rate = func.sum(case((ledger.c.amount_huf.is_(None), 1), else_=0))
+
+    if group_by == "month":
+        year = extract("year", ledger.c.transaction_date)
+        month = extract("month", ledger.c.transaction_date)
+        group_columns = [year, month]
+        query = select(year.label("year"), month.label("month"))
+    elif group_by == "day":
+        group_columns = [ledger.c.transaction_date]
+        query = select(ledger.c.transaction_date.label("date"))
+    elif group_by == "category":
+        group_columns = [ledger.c.category_id]
+        query = select(ledger.c.category_id)
+    else:
+        group_columns = [ledger.c.currency]
+        query = select(ledger.c.currency)
+
+    query = (
+        query.add_columns(
+            income.label("income"),
+            expense.label("expense"),
+            func.count().label("transaction_count"),
+            missing_rate.label("missing_rate_count"),
+        )
+        .select_from(ledger)
+        .group_by(*group_columns)
+        .order_by(*group_columns)
+    )
+
+    return [dict(row) for row in db.execute(query).mappings()]
+
+
+def merge_totals(
+    hot: List[Dict[str, Any]], archived: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """Formázott aggregált sorok összevonása csoport kulcs szerint (net újraszámolva)"""
+    measures = ("transaction_count", "income", "expense", "missing_rate_count")
+    merged: Dict[tuple, Dict[str, Any]] = {}
+    for item in hot + archived:
+        key = tuple(
+            value
+            for name, value in item.items()
+            if name not in measures and name != "net"
+        )
+        existing = merged.get(key)
+        if existing is None:
+            merged[key] = dict(item)
+            continue
+        for name in measures:
+            existing[name] += item[name]
+        existing["net"] = existing["income"] - existing["expense"]
+
+    return [
+        merged[key]
+        for key in sorted(
+            merged, key=lambda key: [(value is not None, value) for value in key]
+        )
+    ]
+
+
+def aggregate(
+    db: Session,
+    group_by: str,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    category_id: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Aggregálás memóriából (ledger cache bekapcsolva) vagy SQL-ből.
+    Mindkét út tartalmazza az archivált (Parquet) tranzakciókat is.
+    """
+    if ledger_cache.ENABLED:
+        grouped = ledger_cache.cache.aggregate(
+            db, group_by, start_date, end_date, category_id
+        )
+        rows = grouped.to_dict("records")
+        results = [format_totals_row(row) for row in rows]
+    else:
+        rows = sql_aggregate(db, group_by, start_date, end_date, category_id)
+        results = [format_totals_row(row) for row in rows]
+
+        # Archivált partíciók (csak a dátum tartományt érintők) hozzáadása
+        if archive.has_archive():
+            archived = archive.read_archived(
+                start_date,
+                end_date,
+                columns=[column.key for column in ledger_cache.LOAD_COLUMNS],
+                category_id=category_id,
+            )
+            if not archived.empty:
+                grouped = ledger_cache.aggregate_frame(
+                    ledger_cache.compact_frame(db, archived), group_by
+                )
+                results = merge_totals(
+                    results,
+                    [format_totals_row(row) for row in grouped.to_dict("records")],
+                )
+
+    if group_by == "category":
+        names = dict(db.execute(select(Category.id, Category.name)).all())
+        for item in results:
+            item["category_name"] = names.get(item["category_id"])
+
+    return results
+
+
+@router.get("/totals")
+def get_totals(
+    group_by: str = "month",
+    date_from: str = None,
+    date_to: str = None,
+    db: Session = Depends(get_read_db),
+):
+    """Bevétel / kiadás összesítés HUF-ban (devizás tételek árfolyammal átváltva)"""
+    if group_by not in TOTALS_GROUP_BY:
+        raise HTTPException(400, f"group_by must be one of {list(TOTALS_GROUP_BY)}")
+
+    start_date, end_date = parse_date_range(date_from, date_to)
+
+    return {
+        "currency": BASE_CURRENCY,
+        "group_by": group_by,
+        "totals": aggregate(db, group_by, start_date, end_date),
+    }
+
+
+@router.get("/timeseries")
+def get_timeseries(
+    interval: str = "month",
+    category_id: int = None,
+    date_from: str = None,
+    date_to: str = None,
+    db: Session = Depends(get_read_db),
+):
+    """Bevétel / kiadás idősor HUF-ban (napi vagy havi bontás, opcionálisan kategóriára)"""
+    if interval not in TIMESERIES_INTERVALS:
+        raise HTTPException(
+            400, f"interval must be one of {list(TIMESERIES_INTERVALS)}"
+        )
+
+    start_date, end_date = parse_date_range(date_from, date_to)
+
+    return {
+        "currency": BASE_CURRENCY,
+        "interval": interval,
+        "category_id": category_id,
+        "series": aggregate(db, interval, start_date, end_date, category_id),
+    }
+
+
+@router.get("/report")
+def get_report(
+    dimensions: str = "month",
+    measures: str = "sum,count",
+    subtotals: bool = False,
+    date_from: str = None,
+    date_to: str = None,
+    category_id: int = None,
+    direction: str = None,
+    currency: str = None,
+    account_number: str = None,
+    db: Session = Depends(get_read_db),
+):
+    """
+    Ad-hoc pivot riport: dimensions (month, category, partner, account, direction,
+    currency) vesszővel elválasztva, measures (sum, count, avg, min, max) az előjeles
+    HUF összegre. subtotals=true: ROLLUP részösszegek (subtotal / level mezők).
+    """
+    start_date, end_date = parse_date_range(date_from, date_to)
+    try:
+        return reports.get_report(
+            db,
+            [name.strip() for name in dimensions.split(",") if name.strip()],
+            [name.strip() for name in measures.split(",") if name.strip()],
+            subtotals,
+            {
+                "date_from": start_date,
+                "date_to": end_date,
+                "category_id": category_id,
+                "direction": direction,
+                "currency": currency.upper() if currency else None,
+                "account_number": account_number,
+            },
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+
+@router.get("/accounts")
+def get_accounts(db: Session = Depends(get_read_db)):
+    """Számlák listája (számlaszám, deviza, tételszám, időtartomány)"""
+    return balances.list_accounts(db)
+
+
+@router.get("/balance")
+def get_balance(
+    account_number: str,
+    interval: str = "day",
+    date_from: str = None,
+    date_to: str = None,
+    db: Session = Depends(get_read_db),
+):
+    """Számla futó egyenlege és nettó cash-flow-ja napi vagy havi bontásban"""
+    if interval not in balances.BALANCE_INTERVALS:
+        raise HTTPException(
+            400, f"interval must be one of {list(balances.BALANCE_INTERVALS)}"
+        )
+
+    start_date, end_date = parse_date_range(date_from, date_to)
+
+    return {
+        "account_number": account_number,
+        "interval": interval,
+        "series": balances.get_balance_series(
+            db, account_number, interval, start_date, end_date
+        ),
+    }
+
+
+@router.get("/recurring")
+def get_recurring(
+    direction: str = None,
+    period: str = None,
+    active_only: bool = False,
+    db: Session = Depends(get_read_db),
+):
+    """Felismert ismétlődő fizetések (előfizetések, rezsi) várható következő dátummal"""
+    if period is not None and period not in recurring.PERIODS:
+        raise HTTPException(400, f"period must be one of {list(recurring.PERIODS)}")
+
+    series = recurring.detector.series(db)
+    if direction:
+        series = [item for item in series if item["direction"] == direction]
+    if period:
+        series = [item for item in series if item["period"] == period]
+    if active_only:
+        series = [item for item in series if item["active"]]
+
+    names = dict(db.execute(select(Category.id, Category.name)).all())
+    series = [
+        {**item, "category_name": names.get(item["category_id"])}
+        for item in sorted(
+            series, key=lambda item: (item["expected_next_date"], item["partner"])
+        )
+    ]
+
+    return {"series": series, **recurring.detector.status()}
+
+
+@router.post("/recurring/refresh")
+def refresh_recurring(db: Session = Depends(get_write_db)):
+    """Ismétlődő fizetések teljes újraelemzése"""
+    recurring.detector.analyze(db)
+    return recurring.detector.status()
+
+
+@router.get("/anomalies")
+def get_anomalies(
+    date_from: str = None,
+    date_to: str = None,
+    category_id: int = None,
+    db: Session = Depends(get_read_db),
+):
+    """Szokatlan költések: kiugró kategória hónapok és partner szinten kiugró tételek"""
+    start_date, end_date = parse_date_range(date_from, date_to)
+    results = anomalies.store.results(db)
+
+    def in_range(day: date) -> bool:
+        return (not start_date or day >= start_date) and (
+            not end_date or day <= end_date
+        )
+
+    names = dict(db.execute(select(Category.id, Category.name)).all())
+    category_months = [
+        {**item, "category_name": names.get(item["category_id"])}
+        for item in results["category_months"]
+        if in_range(date(item["year"], item["month"], 1))
+        and (category_id is None or item["category_id"] == category_id)
+    ]
+    transactions = [
+        {**item, "category_name": names.get(item["category_id"])}
+        for item in results["transactions"]
+        if in_range(date.fromisoformat(item["transaction_date"]))
+        and (category_id is None or item["category_id"] == category_id)
+    ]
+
+    return {
+        **results,
+        "category_months": category_months,
+        "transactions": transactions,
+    }
+
+
+@router.get("/ledger-cache")
+def get_ledger_cache_status():
+    """Memóriabeli ledger cache állapota (sorok, memória, utolsó betöltés)"""
+    return ledger_cache.cache.status()
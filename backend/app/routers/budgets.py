@@ -0,0 +1,170 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from typing import Dict, Any, Optional
+from datetime import date, datetime
+from decimal import Decimal
+from app.database.database import get_read_db, get_write_db
+from app.database.models import Budget, Category
+from app.services import budgets as budget_service
+from app.services import reference_data
+
+# Router létrehozása
+router = APIRouter(prefix="/budgets", tags=["budgets"])
+
+
+# Segédfüggvény a Budget dict-té alakításához
+def budget_to_dict(budget: Budget) -> Dict[str, Any]:
+    return {
+        "id": budget.id,
+        "category_id": budget.category_id,
+        "period": budget.period,
+        "amount": float(budget.amount),
+        "created_at": budget.created_at.isoformat() if budget.created_at else None,
+        "updated_at": budget.updated_at.isoformat() if budget.updated_at else None,
+    }
+
+
+# Segédfüggvény a keret paraméterek validálásához
+def validate_budget(period: Optional[str], amount: Optional[float]) -> None:
+    if period is not None and period not in budget_service.BUDGET_PERIODS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"period lehetséges értékei: {list(budget_service.BUDGET_PERIODS)}",
+        )
+    if amount is not None and amount <= 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="amount pozitív szám kell legyen",
+        )
+
+
+# CREATE - Új keret létrehozása
+@router.post("/", status_code=status.HTTP_201_CREATED)
+def create_budget(
+    category_id: int,
+    amount: float,
+    period: str = "monthly",
+    db: Session = Depends(get_write_db),
+):
+    """Új költési keret kategóriára (havi vagy éves)"""
+    validate_budget(period, amount)
+
+    category = db.query(Category).filter(Category.id == category_id).first()
+    if not category:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Kategória nem található ID: {category_id}",
+        )
+    if category.type != "expense":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Keret csak kiadás (expense) kategóriához adható",
+        )
+
+    existing = (
+        db.query(Budget)
+        .filter(Budget.category_id == category_id, Budget.period == period)
+        .first()
+    )
+    if existing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Ehhez a kategóriához már van ilyen periódusú keret",
+        )
+
+    budget = Budget(category_id=category_id, period=period, amount=Decimal(str(amount)))
+    db.add(budget)
+    reference_data.bump_version(db, reference_data.BUDGETS)
+    db.commit()
+    db.refresh(budget)
+
+    return budget_to_dict(budget)
+
+
+# READ - Összes keret lekérése
+@router.get("/")
+def get_budgets(db: Session = Depends(get_read_db)):
+    """Összes keret"""
+    budgets = db.query(Budget).order_by(Budget.category_id, Budget.period).all()
+    return [budget_to_dict(b) for b in budgets]
+
+
+# EXTRA - Keretek állása (előszámolt havi összesítőkből)
+@router.get("/status")
+def get_budget_status(on_date: str = None, db: Session = Depends(get_read_db)):
+    """Elköltött, maradék és előrevetített túllépés keretenként"""
+    try:
+        day = datetime.fromisoformat(on_date).date() if on_date else date.today()
+    except ValueError:
+        raise HTTPException(400, "Érvénytelen dátum formátum")
+
+    return {
+        "on_date": day.isoformat(),
+        "budgets": budget_service.budget_status(db, day),
+    }
+
+
+# EXTRA - Havi összesítők újraépítése (bevezetéskor / árfolyam betöltés után)
+@router.post("/rebuild")
+def rebuild_budget_totals(db: Session = Depends(get_write_db)):
+    """Keret összesítő tábla teljes újraszámolása a tranzakciókból"""
+    row_count = budget_service.rebuild_totals(db)
+    reference_data.bump_version(db, reference_data.BUDGETS)
+    db.commit()
+    return {"rebuilt_rows": row_count}
+
+
+# UPDATE - Keret módosítása
+@router.put("/{budget_id}")
+def update_budget(
+    budget_id: int,
+    amount: Optional[float] = None,
+    period: Optional[str] = None,
+    db: Session = Depends(get_write_db),
+):
+    """Keret összegének / periódusának módosítása"""
+    validate_budget(period, amount)
+
+    budget = db.query(Budget).filter(Budget.id == budget_id).first()
+    if not budget:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Keret nem található ID: {budget_id}",
+        )
+
+    if period is not None and period != budget.period:
+        existing = (
+            db.query(Budget)
+            .filter(Budget.category_id == budget.category_id, Budget.period == period)
+            .first()
+        )
+        if existing:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Ehhez a kategóriához már van ilyen periódusú keret",
+            )
+        budget.period = period
+    if amount is not None:
+        budget.amount = Decimal(str(amount))
+
+    reference_data.bump_version(db, reference_data.BUDGETS)
+    db.commit()
+    db.refresh(budget)
+
+    return budget_to_dict(budget)
+
+
+# DELETE - Keret törlése
+@router.delete("/{budget_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_budget(budget_id: int, db: Session = Depends(get_write_db)):
+    """Keret törlése"""
+    budget = db.query(Budget).filter(Budget.id == budget_id).first()
+    if not budget:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Keret nem található ID: {budget_id}",
+        )
+
+    db.delete(budget)
+    reference_data.bump_version(db, reference_data.BUDGETS)
+    db.commit()
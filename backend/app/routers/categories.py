@@ -1,16 +1,50 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.database.database import get_db
-from app.database.models import Category, CategoryKeyword
+from sqlalchemy import func
+from sqlalchemy.orm import Session, selectinload
+from app.database.database import get_read_db, get_write_db
+from app.database.models import Budget, Category, CategoryKeyword, Transaction
+from app.services import archive, budgets, change_feed, ledger_events, reference_data
 from typing import List, Optional
 
 router = APIRouter(prefix="/categories", tags=["categories"])
 
+# IN lista mérete a duplikált kulcsszavak törlésénél (MSSQL: max 2100 paraméter)
+KEYWORD_CHUNK_SIZE = 1000
 
-@router.get("/")
-def get_categories(db: Session = Depends(get_db)):
-    """Összes kategória lekérése"""
-    categories = db.query(Category).order_by(Category.type, Category.name).all()
+
+def reassign_transactions(
+    db: Session, source_ids: List[int], target_id: Optional[int]
+) -> int:
+    """Tranzakciók átállítása egyetlen set-based UPDATE-tel (None = kategorizálatlan)"""
+    change_feed.record_category_reassignment(db, source_ids)
+    return (
+        db.query(Transaction)
+        .filter(Transaction.category_id.in_(source_ids))
+        .update({Transaction.category_id: target_id}, synchronize_session=False)
+    )
+
+
+def delete_categories(db: Session, category_ids: List[int]) -> None:
+    """Kategóriák, kulcsszavaik és kereteik törlése bulk DELETE-tel (ORM cascade nélkül)"""
+    db.query(Budget).filter(Budget.category_id.in_(category_ids)).delete(
+        synchronize_session=False
+    )
+    db.query(CategoryKeyword).filter(
+        CategoryKeyword.category_id.in_(category_ids)
+    ).delete(synchronize_session=False)
+    db.query(Category).filter(Category.id.in_(category_ids)).delete(
+        synchronize_session=False
+    )
+
+
+def load_category_list(db: Session) -> List[dict]:
+    """Kategóriák kulcsszavakkal (kulcsszavak egy IN lekérdezéssel, N+1 nélkül)"""
+    categories = (
+        db.query(Category)
+        .options(selectinload(Category.keywords))
+        .order_by(Category.type, Category.name)
+        .all()
+    )
     return [
         {
             "id": cat.id,
@@ -23,8 +57,14 @@ def get_categories(db: Session = Depends(get_db)):
     ]
 
 
+@router.get("/")
+def get_categories(db: Session = Depends(get_read_db)):
+    """Összes kategória lekérése (referencia cache-ből)"""
+    return reference_data.cache.get(db, "category_list", load_category_list)
+
+
 @router.get("/{category_id}")
-def get_category(category_id: int, db: Session = Depends(get_db)):
+def get_category(category_id: int, db: Session = Depends(get_read_db)):
     """Egy kategória lekérése ID alapján"""
     category = db.query(Category).filter(Category.id == category_id).first()
 
@@ -43,7 +83,10 @@ def get_category(category_id: int, db: Session = Depends(get_db)):
 
 @router.post("/")
 def create_category(
-    name: str, type: str, keywords: List[str] = None, db: Session = Depends(get_db)
+    name: str,
+    type: str,
+    keywords: List[str] = None,
+    db: Session = Depends(get_write_db),
 ):
     """Új kategória létrehozása"""
     if type not in ["income", "expense"]:
@@ -68,7 +111,7 @@ def create_category(
                 category.keywords.append(category_keyword)
 
     db.add(category)
-    db.commit()
+    reference_data.commit_change(db)
     db.refresh(category)
 
     return {
@@ -85,7 +128,7 @@ def update_category(
     name: Optional[str] = None,
     type: Optional[str] = None,
     keywords: Optional[List[str]] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_write_db),
 ):
     """Kategória módosítása"""
     category = db.query(Category).filter(Category.id == category_id).first()
@@ -131,7 +174,7 @@ def update_category(
                 f"Category '{category.name}' with type '{category.type}' already exists",
             )
 
-    db.commit()
+    reference_data.commit_change(db)
     db.refresh(category)
 
     return {
@@ -145,7 +188,7 @@ def update_category(
 
 @router.delete("/{category_id}")
 def delete_category(
-    category_id: int, reassign_to: int = None, db: Session = Depends(get_db)
+    category_id: int, reassign_to: int = None, db: Session = Depends(get_write_db)
 ):
     """Kategória törlése"""
     category = db.query(Category).filter(Category.id == category_id).first()
@@ -153,41 +196,54 @@ def delete_category(
     if not category:
         raise HTTPException(404, f"Category with id {category_id} not found")
 
-    # Ellenőrzés: van-e használatban (tranzakciókhoz rendelve)
-    transaction_count = len(category.transactions)
+    # Célkategória ellenőrzése a törlés előtt (a keret összesítők is oda kerülnek)
+    if reassign_to:
+        if reassign_to == category_id:
+            raise HTTPException(400, "Cannot reassign a category to itself")
+        new_category = db.query(Category).filter(Category.id == reassign_to).first()
+        if not new_category:
+            raise HTTPException(400, f"Target category with id {reassign_to} not found")
+
+        # Típus ellenőrzése (income kategóriát ne lehessen expense-re állítani)
+        if category.type != new_category.type:
+            raise HTTPException(
+                400,
+                f"Cannot reassign {category.type} category to {new_category.type} category",
+            )
+
+    # Ellenőrzés: van-e használatban (COUNT lekérdezés, tranzakciók betöltése nélkül;
+    # az archivált tételek is számítanak)
+    transaction_count = (
+        db.query(func.count(Transaction.id))
+        .filter(Transaction.category_id == category_id)
+        .scalar()
+    ) + archive.archived_category_counts([category_id]).get(category_id, 0)
     if transaction_count > 0:
         if reassign_to:
-            # Ellenőrzés: létezik-e a célkategória
-            new_category = db.query(Category).filter(Category.id == reassign_to).first()
-            if not new_category:
-                raise HTTPException(
-                    400, f"Target category with id {reassign_to} not found"
-                )
-
-            # Típus ellenőrzése (income kategóriát ne lehessen expense-re állítani)
-            if category.type != new_category.type:
-                raise HTTPException(
-                    400,
-                    f"Cannot reassign {category.type} category to {new_category.type} category",
-                )
-
-            # Tranzakciók átállítása
-            for transaction in category.transactions:
-                transaction.category_id = reassign_to
+            # Tranzakciók átállítása egyetlen UPDATE-tel
+            reassign_transactions(db, [category_id], reassign_to)
 
             message = f"Category '{category.name}' deleted. {transaction_count} transactions reassigned to '{new_category.name}'"
 
         else:
             # NULL-ra állítás (kategorizálatlan)
-            for transaction in category.transactions:
-                transaction.category_id = None
+            reassign_transactions(db, [category_id], None)
 
             message = f"Category '{category.name}' deleted. {transaction_count} transactions set to uncategorized"
     else:
         message = f"Category '{category.name}' deleted successfully (no transactions affected)"
 
-    db.delete(category)  # Keywords automatikusan törlődnek (cascade)
-    db.commit()
+    # Archivált tételek átszámozása a manifestben (hibás commitnál visszaáll)
+    with archive.category_remap(db, {category_id: reassign_to or None}):
+        # Keret összesítők a célkategóriához kerülnek (kategorizálatlannál törlődnek)
+        budgets.move_category_totals(db, [category_id], reassign_to or None)
+        delete_categories(db, [category_id])  # Keywords is törlődnek
+        reference_data.commit_change(db)
+
+    if transaction_count > 0:
+        ledger_events.transactions_changed(
+            db, reassigned_categories={category_id: reassign_to or None}
+        )
 
     return {
         "message": message,
@@ -195,3 +251,90 @@ def delete_category(
         "affected_transactions": transaction_count,
         "reassigned_to": reassign_to if reassign_to else None,
     }
+
+
+@router.post("/merge")
+def merge_categories(
+    source_ids: List[int], target_id: int, db: Session = Depends(get_write_db)
+):
+    """Több kategória összevonása egy célkategóriába (set-based UPDATE-ekkel)"""
+    source_ids = list(dict.fromkeys(source_ids))
+    if not source_ids:
+        raise HTTPException(400, "source_ids must not be empty")
+    if target_id in source_ids:
+        raise HTTPException(
+            400, "Target category cannot be one of the source categories"
+        )
+
+    target = db.query(Category).filter(Category.id == target_id).first()
+    if not target:
+        raise HTTPException(400, f"Target category with id {target_id} not found")
+
+    sources = db.query(Category).filter(Category.id.in_(source_ids)).all()
+    missing_ids = set(source_ids) - {cat.id for cat in sources}
+    if missing_ids:
+        raise HTTPException(404, f"Categories not found: {sorted(missing_ids)}")
+
+    # Típus ellenőrzése (income kategóriát ne lehessen expense-be olvasztani)
+    mismatched = [cat.name for cat in sources if cat.type != target.type]
+    if mismatched:
+        raise HTTPException(
+            400,
+            f"Cannot merge categories {mismatched} into {target.type} category '{target.name}'",
+        )
+
+    # Tranzakciók átállítása egyetlen UPDATE-tel (+ archivált tételek a manifestben)
+    affected_transactions = reassign_transactions(db, source_ids, target_id) + sum(
+        archive.archived_category_counts(source_ids).values()
+    )
+
+    # Kulcsszavak átmozgatása: a célkategóriánál már meglévő szabályokat és a
+    # forrás kategóriák közötti ismétlődéseket eldobjuk (szabály = kulcsszó +
+    # mező + egyezés típus, ismétlődésből a legnagyobb prioritású marad)
+    rule_key = (
+        CategoryKeyword.keyword,
+        CategoryKeyword.field,
+        CategoryKeyword.match_type,
+    )
+    seen_rules = set(
+        db.query(*rule_key).filter(CategoryKeyword.category_id == target_id).all()
+    )
+    duplicate_ids = []
+    for keyword_id, *rule in (
+        db.query(CategoryKeyword.id, *rule_key)
+        .filter(CategoryKeyword.category_id.in_(source_ids))
+        .order_by(CategoryKeyword.priority.desc(), CategoryKeyword.id)
+    ):
+        if tuple(rule) in seen_rules:
+            duplicate_ids.append(keyword_id)
+        else:
+            seen_rules.add(tuple(rule))
+    for start in range(0, len(duplicate_ids), KEYWORD_CHUNK_SIZE):
+        db.query(CategoryKeyword).filter(
+            CategoryKeyword.id.in_(duplicate_ids[start : start + KEYWORD_CHUNK_SIZE])
+        ).delete(synchronize_session=False)
+    moved_keywords = (
+        db.query(CategoryKeyword)
+        .filter(CategoryKeyword.category_id.in_(source_ids))
+        .update({CategoryKeyword.category_id: target_id}, synchronize_session=False)
+    )
+
+    with archive.category_remap(db, {source_id: target_id for source_id in source_ids}):
+        budgets.move_category_totals(db, source_ids, target_id)
+        delete_categories(db, source_ids)
+        reference_data.commit_change(db)
+
+    if affected_transactions:
+        ledger_events.transactions_changed(
+            db,
+            reassigned_categories={source_id: target_id for source_id in source_ids},
+        )
+
+    return {
+        "message": f"{len(source_ids)} categories merged into '{target.name}'",
+        "merged_ids": source_ids,
+        "target_id": target_id,
+        "affected_transactions": affected_transactions,
+        "moved_keywords": moved_keywords,
+        "dropped_duplicate_keywords": len(duplicate_ids),
+    }
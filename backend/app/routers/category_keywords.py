@@ -1,12 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from typing import List, Dict, Any, Optional
-from app.database.database import get_db
+from app.database.database import get_read_db, get_write_db
 from app.database.models import Category, CategoryKeyword
+from app.services import reference_data
+from app.services.rule_engine import normalize_pattern, validate_rule
 
 # Router létrehozása
 router = APIRouter(prefix="/category-keywords", tags=["category-keywords"])
 
+# Módosításkor a clear paraméterrel törölhető (null-ra állítható) szabály mezők
+CLEARABLE_FIELDS = ("direction", "min_amount", "max_amount")
+
 
 # Segédfüggvény a CategoryKeyword dict-té alakításához
 def keyword_to_dict(keyword: CategoryKeyword) -> Dict[str, Any]:
@@ -14,13 +19,42 @@ def keyword_to_dict(keyword: CategoryKeyword) -> Dict[str, Any]:
         "id": keyword.id,
         "category_id": keyword.category_id,
         "keyword": keyword.keyword,
+        "field": keyword.field,
+        "match_type": keyword.match_type,
+        "direction": keyword.direction,
+        "min_amount": (
+            float(keyword.min_amount) if keyword.min_amount is not None else None
+        ),
+        "max_amount": (
+            float(keyword.max_amount) if keyword.max_amount is not None else None
+        ),
+        "priority": keyword.priority,
     }
 
 
+# Segédfüggvény a szabály beállítások validálásához (400 hiba esetén)
+def validate_rule_or_400(keyword: str, **rule_options) -> None:
+    try:
+        validate_rule(pattern=keyword, **rule_options)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+
 # CREATE - Új CategoryKeyword létrehozása
 @router.post("/", status_code=status.HTTP_201_CREATED)
 def create_category_keyword(
-    category_id: int, keyword: str, db: Session = Depends(get_db)
+    category_id: int,
+    keyword: str,
+    field: str = "partner_name",
+    match_type: str = "substring",
+    direction: Optional[str] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    priority: int = 0,
+    db: Session = Depends(get_write_db),
 ):
     # Alapvető validálás
     if not keyword or not category_id:
@@ -42,6 +76,15 @@ def create_category_keyword(
             detail="keyword nem lehet üres és maximum 100 karakter lehet",
         )
 
+    validate_rule_or_400(
+        keyword,
+        field=field,
+        match_type=match_type,
+        direction=direction,
+        min_amount=min_amount,
+        max_amount=max_amount,
+    )
+
     # Ellenőrizzük, hogy létezik-e a kategória
     category = db.query(Category).filter(Category.id == category_id).first()
     if not category:
@@ -50,12 +93,17 @@ def create_category_keyword(
             detail=f"Kategória nem található ID: {category_id}",
         )
 
+    # Minta normalizálása (regex változatlan, egyébként nagybetűs)
+    pattern = normalize_pattern(field, match_type, keyword)
+
     # Ellenőrizzük, hogy már létezik-e ez a kulcsszó ehhez a kategóriához
     existing_keyword = (
         db.query(CategoryKeyword)
         .filter(
             CategoryKeyword.category_id == category_id,
-            CategoryKeyword.keyword == keyword,
+            CategoryKeyword.keyword == pattern,
+            CategoryKeyword.field == field,
+            CategoryKeyword.match_type == match_type,
         )
         .first()
     )
@@ -68,11 +116,18 @@ def create_category_keyword(
 
     # Új CategoryKeyword létrehozása
     db_keyword = CategoryKeyword(
-        category_id=category_id, keyword=keyword.strip().upper()
+        category_id=category_id,
+        keyword=pattern,
+        field=field,
+        match_type=match_type,
+        direction=direction,
+        min_amount=min_amount,
+        max_amount=max_amount,
+        priority=priority,
     )
 
     db.add(db_keyword)
-    db.commit()
+    reference_data.commit_change(db)
     db.refresh(db_keyword)
 
     return keyword_to_dict(db_keyword)
@@ -81,7 +136,7 @@ def create_category_keyword(
 # READ - Összes CategoryKeyword lekérése
 @router.get("/")
 def get_category_keywords(
-    skip: int = 0, limit: int = 100, db: Session = Depends(get_db)
+    skip: int = 0, limit: int = 100, db: Session = Depends(get_read_db)
 ):
     keywords = (
         db.query(CategoryKeyword)
@@ -95,7 +150,7 @@ def get_category_keywords(
 
 # READ - Egy CategoryKeyword lekérése ID alapján
 @router.get("/{keyword_id}")
-def get_category_keyword(keyword_id: int, db: Session = Depends(get_db)):
+def get_category_keyword(keyword_id: int, db: Session = Depends(get_read_db)):
     keyword = db.query(CategoryKeyword).filter(CategoryKeyword.id == keyword_id).first()
 
     if not keyword:
@@ -110,8 +165,36 @@ def get_category_keyword(keyword_id: int, db: Session = Depends(get_db)):
 # UPDATE - CategoryKeyword módosítása
 @router.put("/{keyword_id}")
 def update_category_keyword(
-    keyword_id: int, keyword: str, db: Session = Depends(get_db)
+    keyword_id: int,
+    keyword: str,
+    field: Optional[str] = None,
+    match_type: Optional[str] = None,
+    direction: Optional[str] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    priority: Optional[int] = None,
+    clear: List[str] = Query(default=[]),
+    db: Session = Depends(get_write_db),
 ):
+    """
+    Meg nem adott szabály beállítások maradnak a régiek; a clear paraméterben
+    felsorolt mezők törlődnek, pl. ?clear=direction&clear=max_amount.
+    """
+    unknown = set(clear) - set(CLEARABLE_FIELDS)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Nem törölhető mezők: {sorted(unknown)} "
+            f"(lehetséges: {list(CLEARABLE_FIELDS)})",
+        )
+    given = {"direction": direction, "min_amount": min_amount, "max_amount": max_amount}
+    conflicting = [name for name in clear if given[name] is not None]
+    if conflicting:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Egyszerre megadott és törölt mezők: {sorted(conflicting)}",
+        )
+
     existing = (
         db.query(CategoryKeyword).filter(CategoryKeyword.id == keyword_id).first()
     )
@@ -129,12 +212,34 @@ def update_category_keyword(
             detail="keyword nem lehet üres és maximum 100 karakter lehet",
         )
 
+    # Meg nem adott szabály beállítások maradnak a régiek, a clear-ben szereplők törlődnek
+    field = field if field is not None else existing.field
+    match_type = match_type if match_type is not None else existing.match_type
+    if direction is None and "direction" not in clear:
+        direction = existing.direction
+    if min_amount is None and "min_amount" not in clear:
+        min_amount = existing.min_amount
+    if max_amount is None and "max_amount" not in clear:
+        max_amount = existing.max_amount
+
+    validate_rule_or_400(
+        keyword,
+        field=field,
+        match_type=match_type,
+        direction=direction,
+        min_amount=min_amount,
+        max_amount=max_amount,
+    )
+    pattern = normalize_pattern(field, match_type, keyword)
+
     # Ellenőrizzük, hogy nem létezik-e már ez a kulcsszó ugyanahhoz a kategóriához
     existing_keyword = (
         db.query(CategoryKeyword)
         .filter(
             CategoryKeyword.category_id == existing.category_id,
-            CategoryKeyword.keyword == keyword.strip(),
+            CategoryKeyword.keyword == pattern,
+            CategoryKeyword.field == field,
+            CategoryKeyword.match_type == match_type,
             CategoryKeyword.id != keyword_id,  # Kivéve a jelenlegi rekordot
         )
         .first()
@@ -146,9 +251,16 @@ def update_category_keyword(
             detail="Ez a kulcsszó már létezik ehhez a kategóriához",
         )
 
-    existing.keyword = keyword.strip().upper()
+    existing.keyword = pattern
+    existing.field = field
+    existing.match_type = match_type
+    existing.direction = direction
+    existing.min_amount = min_amount
+    existing.max_amount = max_amount
+    if priority is not None:
+        existing.priority = priority
 
-    db.commit()
+    reference_data.commit_change(db)
     db.refresh(existing)
 
     return keyword_to_dict(existing)
@@ -156,7 +268,7 @@ def update_category_keyword(
 
 # DELETE - CategoryKeyword törlése
 @router.delete("/{keyword_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_category_keyword(keyword_id: int, db: Session = Depends(get_db)):
+def delete_category_keyword(keyword_id: int, db: Session = Depends(get_write_db)):
     keyword = db.query(CategoryKeyword).filter(CategoryKeyword.id == keyword_id).first()
 
     if not keyword:
@@ -166,12 +278,12 @@ def delete_category_keyword(keyword_id: int, db: Session = Depends(get_db)):
         )
 
     db.delete(keyword)
-    db.commit()
+    reference_data.commit_change(db)
 
 
 # EXTRA - Egy kategória összes kulcsszavának törlése
 @router.delete("/category/{category_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_keywords_by_category(category_id: int, db: Session = Depends(get_db)):
+def delete_keywords_by_category(category_id: int, db: Session = Depends(get_write_db)):
     # Ellenőrizzük, hogy létezik-e a kategória
     category = db.query(Category).filter(Category.id == category_id).first()
     if not category:
@@ -187,4 +299,4 @@ def delete_keywords_by_category(category_id: int, db: Session = Depends(get_db))
         .delete()
     )
 
-    db.commit()
+    reference_data.commit_change(db)
@@ -0,0 +1,76 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from typing import Any, Dict
+from app.database.database import get_read_db
+from app.database.models import Transaction
+from app.routers.transactions import transaction_to_dict
+from app.services import change_feed
+
+# Router létrehozása
+router = APIRouter(prefix="/changes", tags=["changes"])
+
+# IN lista mérete a tranzakciók betöltésénél (MSSQL: max 2100 paraméter)
+LOAD_CHUNK_SIZE = 1000
+
+
+# Segédfüggvény a változás dict-té alakításához
+def change_to_dict(change: Any, transaction: Any) -> Dict[str, Any]:
+    return {
+        "seq": change.seq,
+        "transaction_id": change.transaction_id,
+        "operation": change.operation,
+        "changed_at": change.changed_at.isoformat() if change.changed_at else None,
+        "transaction": (
+            transaction_to_dict(transaction) if transaction is not None else None
+        ),
+    }
+
+
+@router.get("/")
+def get_changes(
+    since: int = 0,
+    limit: int = change_feed.MAX_PAGE_SIZE,
+    db: Session = Depends(get_read_db),
+):
+    """
+    Delta szinkron: a since seq utáni változások (upsert a tranzakció aktuális
+    állapotával, delete / archive tombstone-ként). A következő lekérés since
+    értéke a next_since; reset=True esetén teljes újratöltés kell.
+    """
+    if since < 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A since nem lehet negatív",
+        )
+    if limit < 1 or limit > change_feed.MAX_PAGE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A limit 1 és {change_feed.MAX_PAGE_SIZE} között lehet",
+        )
+
+    feed = change_feed.changes_since(db, since, limit)
+
+    upserted_ids = [
+        change.transaction_id
+        for change in feed["changes"]
+        if change.operation == change_feed.UPSERT
+    ]
+    transactions = {}
+    for start in range(0, len(upserted_ids), LOAD_CHUNK_SIZE):
+        chunk = upserted_ids[start : start + LOAD_CHUNK_SIZE]
+        for transaction in db.scalars(
+            select(Transaction).where(Transaction.id.in_(chunk))
+        ):
+            transactions[transaction.id] = transaction
+
+    return {
+        "since": feed["since"],
+        "next_since": feed["next_since"],
+        "has_more": feed["has_more"],
+        "reset": feed["reset"],
+        "changes": [
+            change_to_dict(change, transactions.get(change.transaction_id))
+            for change in feed["changes"]
+        ],
+    }
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+
+from app.services import profiling
+
+router = APIRouter(prefix="/profiles", tags=["profiles"])
+
+
+@router.get("/")
+def get_profiles():
+    """Legutóbbi kérés profilok (X-Profile header vagy PROFILE_SAMPLE_RATE alapján)"""
+    return {
+        "enabled": profiling.PROFILING_ENABLED,
+        "sample_rate": profiling.PROFILE_SAMPLE_RATE,
+        "profiles": profiling.list_profiles(),
+    }
+
+
+@router.get("/{profile_id}")
+def download_profile(profile_id: str):
+    """Profil letöltése folded stack formátumban (flamegraph.pl, speedscope)"""
+    path = profiling.profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profil nem található")
+    return FileResponse(path, media_type="text/plain", filename=f"{profile_id}.folded")
@@ -1,14 +1,60 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional
+import csv
+import io
+import json
 from datetime import date, datetime
 from decimal import Decimal
-from app.database.database import get_db
+from app.database import database
+from app.database.database import get_read_db, get_write_db
 from app.database.models import Transaction, Category
+from app.services.deduplication import (
+    compute_fingerprint,
+    insert_transactions_skip_duplicates,
+    statement_fingerprint,
+)
+from app.services import (
+    archive,
+    budgets,
+    change_feed,
+    columnar,
+    ledger_events,
+    transaction_updates,
+)
+from app.services.sse import SSE_HEADERS, SSE_MEDIA_TYPE, sse_event
+from app.services.categorization import (
+    MAX_BATCH_SIZE,
+    RECATEGORIZE_SCOPES,
+    recategorize_transactions,
+)
 
 # Router létrehozása
 router = APIRouter(prefix="/transactions", tags=["transactions"])
 
+EXPORT_BATCH_SIZE = 1000
+BULK_STREAM_CHUNK_SIZE = 1000
+EXPORT_FORMATS = ("csv", "columnar")
+EXPORT_COLUMNS = [
+    "id",
+    "transaction_date",
+    "booking_date",
+    "transaction_type",
+    "direction",
+    "partner_name",
+    "partner_account",
+    "expense_category",
+    "description",
+    "account_name",
+    "account_number",
+    "amount",
+    "currency",
+    "category_id",
+]
+
 
 # Segédfüggvény a Transaction dict-té alakításához
 def transaction_to_dict(transaction: Transaction) -> Dict[str, Any]:
@@ -42,6 +88,101 @@ def transaction_to_dict(transaction: Transaction) -> Dict[str, Any]:
     }
 
 
+# Segédfüggvény az opcionális dátum paraméterek feldolgozásához
+def parse_optional_dates(date_from: Optional[str], date_to: Optional[str]):
+    try:
+        start_date = datetime.fromisoformat(date_from).date() if date_from else None
+        end_date = datetime.fromisoformat(date_to).date() if date_to else None
+    except ValueError:
+        raise HTTPException(400, "Érvénytelen dátum formátum")
+    return start_date, end_date
+
+
+# Segédfüggvény: hot (SQL) és archivált sorok összefésülése dátum, id szerint csökkenőben
+def merge_latest(
+    hot_rows: List[Dict[str, Any]], archived_rows: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    return sorted(
+        hot_rows + archived_rows,
+        key=lambda row: (row["transaction_date"], row["id"]),
+        reverse=True,
+    )
+
+
+# Segédfüggvények a választható (sor / oszlopos) válasz formátumhoz
+def check_response_format(format: str) -> None:
+    if format not in columnar.RESPONSE_FORMATS:
+        raise HTTPException(
+            400, f"format lehetséges értékei: {list(columnar.RESPONSE_FORMATS)}"
+        )
+
+
+def format_rows(rows: List[Dict[str, Any]], format: str) -> Any:
+    return columnar.to_columnar(rows) if format == "columnar" else rows
+
+
+# Segédfüggvény: upload preview sorok -> beszúrandó sorok (duplikátumok és hibás sorok nélkül)
+def build_bulk_rows(transactions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    rows_to_insert = []
+    # Előfordulási sorszámok a preview sorrendjében (duplikátumokkal együtt)
+    occurrences = {}
+
+    for trans_data in transactions:
+        try:
+            fingerprint = statement_fingerprint(
+                occurrences,
+                trans_data["transaction_date"],
+                trans_data.get("amount", 0),
+                trans_data.get("partner_name"),
+                trans_data.get("source_file"),
+            )
+        except Exception:
+            continue
+
+        # Csak a nem duplikált tranzakciókat mentjük
+        if trans_data.get("is_duplicate", False):
+            continue
+
+        try:
+            # Dátum konvertálás
+            trans_date = datetime.fromisoformat(trans_data["transaction_date"]).date()
+            book_date = None
+            if trans_data.get("booking_date"):
+                book_date = datetime.fromisoformat(trans_data["booking_date"]).date()
+
+            # Kategória ID kinyerése suggested_category-ből
+            category_id = None
+            if trans_data.get("suggested_category"):
+                category_id = trans_data["suggested_category"]["id"]
+
+            amount = Decimal(str(trans_data.get("amount", 0)))
+
+            rows_to_insert.append(
+                {
+                    "transaction_date": trans_date,
+                    "booking_date": book_date,
+                    "transaction_type": trans_data.get("transaction_type", ""),
+                    "direction": trans_data.get("direction", ""),
+                    "partner_name": trans_data.get("partner_name"),
+                    "partner_account": trans_data.get("partner_account"),
+                    "expense_category": trans_data.get("expense_category"),
+                    "description": trans_data.get("description"),
+                    "account_name": trans_data.get("account_name"),
+                    "account_number": trans_data.get("account_number"),
+                    "amount": amount,
+                    "currency": trans_data.get("currency", "HUF"),
+                    "category_id": category_id,
+                    "fingerprint": fingerprint,
+                }
+            )
+
+        except Exception as e:
+            # Hibás tranzakciót kihagyjuk
+            continue
+
+    return rows_to_insert
+
+
 # CREATE - Új Transaction létrehozása (upload-ból jövő adatokhoz)
 @router.post("/", status_code=status.HTTP_201_CREATED)
 def create_transaction(
@@ -58,9 +199,15 @@ def create_transaction(
     account_number: str = None,
     currency: str = "HUF",
     category_id: int = None,
-    db: Session = Depends(get_db),
+    occurrence: int = 1,
+    db: Session = Depends(get_write_db),
 ):
-    """Új tranzakció létrehozása"""
+    """
+    Új tranzakció létrehozása (occurrence: azonos napi, összegű és partnerű
+    tételek közül a hányadik - így egy második valódi tétel is rögzíthető)
+    """
+    if occurrence < 1:
+        raise HTTPException(400, "Az occurrence legalább 1")
 
     # Dátum konvertálás
     try:
@@ -71,6 +218,13 @@ def create_transaction(
     except ValueError:
         raise HTTPException(400, "Érvénytelen dátum formátum")
 
+    fingerprint = compute_fingerprint(trans_date, amount, partner_name, occurrence)
+    if archive.find_archived_fingerprints([(fingerprint, trans_date)]):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Ez a tranzakció már létezik (duplikátum, archivált)",
+        )
+
     # Új Transaction létrehozása
     db_transaction = Transaction(
         transaction_date=trans_date,
@@ -86,11 +240,23 @@ def create_transaction(
         amount=Decimal(str(amount)),
         currency=currency,
         category_id=category_id,
+        fingerprint=fingerprint,
     )
 
     db.add(db_transaction)
-    db.commit()
+    budgets.record_transactions(db, [db_transaction])
+    try:
+        db.flush()
+        change_feed.record(db, upserted_ids=[db_transaction.id])
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Ez a tranzakció már létezik (duplikátum)",
+        )
     db.refresh(db_transaction)
+    ledger_events.transactions_changed(db, upserted_ids=[db_transaction.id])
 
     return transaction_to_dict(db_transaction)
 
@@ -98,69 +264,117 @@ def create_transaction(
 # CREATE BULK - Több tranzakció egyszerre (upload-hoz)
 @router.post("/bulk", status_code=status.HTTP_201_CREATED)
 def create_transactions_bulk(
-    transactions: List[Dict[str, Any]], db: Session = Depends(get_db)
+    transactions: List[Dict[str, Any]], db: Session = Depends(get_write_db)
 ):
     """Több tranzakció egyszerre létrehozása (upload-ból)"""
 
-    created_transactions = []
-
-    for trans_data in transactions:
-        # Csak a nem duplikált tranzakciókat mentjük
-        if trans_data.get("is_duplicate", False):
-            continue
-
-        try:
-            # Dátum konvertálás
-            trans_date = datetime.fromisoformat(trans_data["transaction_date"]).date()
-            book_date = None
-            if trans_data.get("booking_date"):
-                book_date = datetime.fromisoformat(trans_data["booking_date"]).date()
-
-            # Kategória ID kinyerése suggested_category-ből
-            category_id = None
-            if trans_data.get("suggested_category"):
-                category_id = trans_data["suggested_category"]["id"]
-
-            # Transaction létrehozása
-            db_transaction = Transaction(
-                transaction_date=trans_date,
-                booking_date=book_date,
-                transaction_type=trans_data.get("transaction_type", ""),
-                direction=trans_data.get("direction", ""),
-                partner_name=trans_data.get("partner_name"),
-                partner_account=trans_data.get("partner_account"),
-                expense_category=trans_data.get("expense_category"),
-                description=trans_data.get("description"),
-                account_name=trans_data.get("account_name"),
-                account_number=trans_data.get("account_number"),
-                amount=Decimal(str(trans_data.get("amount", 0))),
-                currency=trans_data.get("currency", "HUF"),
-                category_id=category_id,
-            )
-
-            db.add(db_transaction)
-            created_transactions.append(db_transaction)
-
-        except Exception as e:
-            # Hibás tranzakciót kihagyjuk
-            continue
+    rows_to_insert = build_bulk_rows(transactions)
 
+    # Duplikáció-biztos beszúrás (MERGE / ON CONFLICT DO NOTHING)
+    created_ids = insert_transactions_skip_duplicates(db, rows_to_insert)
+    budgets.record_transactions(db, budgets.load_rows(db, created_ids))
+    change_feed.record(db, upserted_ids=created_ids)
     db.commit()
+    ledger_events.transactions_changed(db, upserted_ids=created_ids)
 
-    # Refresh minden létrehozott tranzakcióra
-    for trans in created_transactions:
-        db.refresh(trans)
+    created_transactions = []
+    for start in range(0, len(created_ids), 1000):
+        created_transactions.extend(
+            db.query(Transaction)
+            .filter(Transaction.id.in_(created_ids[start : start + 1000]))
+            .order_by(Transaction.id)
+            .all()
+        )
 
     return {
         "created_count": len(created_transactions),
+        "skipped_duplicates": len(rows_to_insert) - len(created_transactions),
         "transactions": [transaction_to_dict(t) for t in created_transactions],
     }
 
 
+# CREATE BULK STREAM - Bulk mentés Server-Sent Events progress stream-mel
+@router.post("/bulk/stream")
+def create_transactions_bulk_stream(transactions: List[Dict[str, Any]]):
+    """
+    Mint a /bulk, de chunk-onként progress eseményt küld (stage, progress,
+    done, error). A mentés egyetlen DB tranzakció: hiba esetén semmi nem kerül be.
+    """
+    rows_to_insert = build_bulk_rows(transactions)
+
+    def generate() -> Iterator[str]:
+        total = len(rows_to_insert)
+        yield sse_event("stage", {"stage": "inserting", "total": total})
+
+        created_ids = []
+        # Saját session: a stream a kérés dependency-jeinek lezárása után fut
+        with database.SessionLocal() as db:
+            try:
+                for start in range(0, total, BULK_STREAM_CHUNK_SIZE):
+                    chunk_ids = insert_transactions_skip_duplicates(
+                        db, rows_to_insert[start : start + BULK_STREAM_CHUNK_SIZE]
+                    )
+                    budgets.record_transactions(db, budgets.load_rows(db, chunk_ids))
+                    change_feed.record(db, upserted_ids=chunk_ids)
+                    created_ids.extend(chunk_ids)
+                    yield sse_event(
+                        "progress",
+                        {
+                            "stage": "inserting",
+                            "processed": min(start + BULK_STREAM_CHUNK_SIZE, total),
+                            "total": total,
+                            "created": len(created_ids),
+                        },
+                    )
+
+                yield sse_event("stage", {"stage": "committing"})
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                yield sse_event("error", {"message": f"Mentés sikertelen: {e}"})
+                return
+            ledger_events.transactions_changed(db, upserted_ids=created_ids)
+
+        yield sse_event(
+            "done",
+            {
+                "created_count": len(created_ids),
+                "skipped_duplicates": total - len(created_ids),
+                "created_ids": created_ids,
+            },
+        )
+
+    return StreamingResponse(generate(), media_type=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
+
+
 # READ - Összes Transaction lekérése
 @router.get("/")
-def get_transactions(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Tranzakciók lekérése"""
+def get_transactions(
+    skip: int = 0,
+    limit: int = 100,
+    include_archived: bool = False,
+    format: str = "rows",
+    db: Session = Depends(get_read_db),
+):
+    """
+    Tranzakciók lekérése (include_archived=true: az archivált sorokkal együtt,
+    format=columnar: oszlopos, dictionary kódolt válasz)
+    """
+    check_response_format(format)
+    if include_archived and archive.has_archive():
+        # Mindkét forrásból a legújabb skip + limit sor, majd összefésülés
+        hot_rows = (
+            db.query(Transaction)
+            .order_by(Transaction.transaction_date.desc(), Transaction.id.desc())
+            .limit(skip + limit)
+            .all()
+        )
+        merged = merge_latest(
+            [transaction_to_dict(t) for t in hot_rows],
+            archive.latest_archived(skip + limit),
+        )
+        return format_rows(merged[skip : skip + limit], format)
+
     transactions = (
         db.query(Transaction)
         .order_by(Transaction.transaction_date.desc())
@@ -168,12 +382,134 @@ def get_transactions(skip: int = 0, limit: int = 100, db: Session = Depends(get_
         .limit(limit)
         .all()
     )
-    return [transaction_to_dict(t) for t in transactions]
+    return format_rows([transaction_to_dict(t) for t in transactions], format)
+
+
+# EXTRA - Keresés partner névben / közleményben (hot + archivált adatok)
+@router.get("/search")
+def search_transactions(
+    q: str = None,
+    date_from: str = None,
+    date_to: str = None,
+    category_id: int = None,
+    include_archived: bool = True,
+    limit: int = 100,
+    db: Session = Depends(get_read_db),
+):
+    """Tranzakciók keresése; az archívumból csak a dátum tartományt érintő partíciók olvasódnak"""
+    start_date, end_date = parse_optional_dates(date_from, date_to)
+
+    query = db.query(Transaction)
+    if q:
+        pattern = f"%{q}%"
+        query = query.filter(
+            or_(
+                Transaction.partner_name.ilike(pattern),
+                Transaction.description.ilike(pattern),
+            )
+        )
+    if start_date:
+        query = query.filter(Transaction.transaction_date >= start_date)
+    if end_date:
+        query = query.filter(Transaction.transaction_date <= end_date)
+    if category_id is not None:
+        query = query.filter(Transaction.category_id == category_id)
+
+    hot_rows = [
+        transaction_to_dict(t)
+        for t in query.order_by(
+            Transaction.transaction_date.desc(), Transaction.id.desc()
+        )
+        .limit(limit)
+        .all()
+    ]
+    archived_rows = []
+    if include_archived and archive.has_archive():
+        archived_rows = archive.search_archived(
+            q, start_date, end_date, category_id, limit
+        )
+
+    return merge_latest(hot_rows, archived_rows)[:limit]
+
+
+# EXTRA - CSV / oszlopos export (hot + archivált adatok, streamelve)
+@router.get("/export")
+def export_transactions(
+    date_from: str = None,
+    date_to: str = None,
+    include_archived: bool = True,
+    format: str = "csv",
+):
+    """
+    Tranzakciók dátum szerint csökkenőben - először a hot tábla, majd az archívum.
+    format=csv: CSV fájl; format=columnar: NDJSON, soronként egy 1000 tételes
+    oszlopos (dictionary kódolt) blokk.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(400, f"format lehetséges értékei: {list(EXPORT_FORMATS)}")
+    start_date, end_date = parse_optional_dates(date_from, date_to)
+
+    def to_csv(rows: List[Dict[str, Any]]) -> str:
+        buffer = io.StringIO()
+        writer = csv.DictWriter(
+            buffer, fieldnames=EXPORT_COLUMNS, extrasaction="ignore"
+        )
+        writer.writerows(rows)
+        return buffer.getvalue()
+
+    def to_columnar_line(rows: List[Dict[str, Any]]) -> str:
+        table = columnar.to_columnar(rows, EXPORT_COLUMNS)
+        return json.dumps(table, ensure_ascii=False) + "\n"
+
+    def batches() -> Iterator[List[Dict[str, Any]]]:
+        # Saját (olvasó) session: a streamelés a kérés dependency-jeinek lezárása után fut
+        with database.read_session() as db:
+            query = db.query(Transaction)
+            if start_date:
+                query = query.filter(Transaction.transaction_date >= start_date)
+            if end_date:
+                query = query.filter(Transaction.transaction_date <= end_date)
+            query = query.order_by(
+                Transaction.transaction_date.desc(), Transaction.id.desc()
+            ).yield_per(EXPORT_BATCH_SIZE)
+
+            batch = []
+            for transaction in query:
+                batch.append(transaction_to_dict(transaction))
+                if len(batch) >= EXPORT_BATCH_SIZE:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+
+        if include_archived:
+            for frame in archive.iter_archived(start_date, end_date):
+                for start in range(0, len(frame), EXPORT_BATCH_SIZE):
+                    chunk = frame.iloc[start : start + EXPORT_BATCH_SIZE]
+                    yield [archive.row_to_dict(row) for row in chunk.to_dict("records")]
+
+    if format == "columnar":
+        return StreamingResponse(
+            (to_columnar_line(batch) for batch in batches()),
+            media_type="application/x-ndjson",
+            headers={"Content-Disposition": "attachment; filename=transactions.ndjson"},
+        )
+
+    def generate_csv() -> Iterator[str]:
+        yield ",".join(EXPORT_COLUMNS) + "\n"
+        for batch in batches():
+            yield to_csv(batch)
+
+    return StreamingResponse(
+        generate_csv(),
+        media_type="text/csv",
+        headers={"Content-Disposition": "attachment; filename=transactions.csv"},
+    )
 
 
 # READ - Egy Transaction lekérése ID alapján
 @router.get("/{transaction_id}")
-def get_transaction(transaction_id: int, db: Session = Depends(get_db)):
+def get_transaction(transaction_id: int, db: Session = Depends(get_read_db)):
     """Egy tranzakció lekérése"""
     transaction = db.query(Transaction).filter(Transaction.id == transaction_id).first()
 
@@ -194,7 +530,7 @@ def update_transaction(
     partner_name: str = None,
     description: str = None,
     expense_category: str = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_write_db),
 ):
     """Tranzakció módosítása (főleg kategória beállítás)"""
 
@@ -208,16 +544,29 @@ def update_transaction(
 
     # Módosítások alkalmazása
     if category_id is not None:
+        budgets.record_category_change(db, [transaction], category_id)
         transaction.category_id = category_id
     if partner_name is not None:
         transaction.partner_name = partner_name
+        transaction.fingerprint = compute_fingerprint(
+            transaction.transaction_date, transaction.amount, partner_name
+        )
     if description is not None:
         transaction.description = description
     if expense_category is not None:
         transaction.expense_category = expense_category
 
-    db.commit()
+    change_feed.record(db, upserted_ids=[transaction_id])
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Ugyanilyen dátumú, összegű és partnerű tranzakció már létezik",
+        )
     db.refresh(transaction)
+    ledger_events.transactions_changed(db, upserted_ids=[transaction_id])
 
     return transaction_to_dict(transaction)
 
@@ -225,24 +574,65 @@ def update_transaction(
 # UPDATE BULK - Több tranzakció kategória beállítása egyszerre
 @router.put("/bulk/category")
 def update_transactions_category(
-    transaction_ids: List[int], category_id: int, db: Session = Depends(get_db)
+    transaction_ids: List[int], category_id: int, db: Session = Depends(get_write_db)
 ):
     """Több tranzakció kategóriájának beállítása egyszerre"""
 
+    rows = budgets.load_rows(db, transaction_ids)
+    budgets.record_category_change(db, rows, category_id)
     updated_count = (
         db.query(Transaction)
         .filter(Transaction.id.in_(transaction_ids))
         .update({Transaction.category_id: category_id}, synchronize_session=False)
     )
+    change_feed.record(db, upserted_ids=[row.id for row in rows])
 
     db.commit()
+    ledger_events.transactions_changed(db, upserted_ids=transaction_ids)
 
     return {"updated_count": updated_count, "category_id": category_id}
 
 
+# UPDATE BATCH - Soronként eltérő módosítások egy kérésben
+@router.patch("/batch")
+def patch_transactions_batch(
+    changes: List[Dict[str, Any]], db: Session = Depends(get_write_db)
+):
+    """
+    Több tranzakció módosítása soronként eltérő értékekkel, pl.
+    [{"id": 1, "category_id": 3}, {"id": 2, "partner_name": "X", "description": null}].
+    Csak a megadott mezők változnak; a válasz a módosított sorokat tartalmazza.
+    """
+    try:
+        transaction_updates.validate_changes(db, changes)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    result = transaction_updates.apply_changes(db, changes)
+    change_feed.record(db, upserted_ids=[row.id for row in result["updated"]])
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Ugyanilyen dátumú, összegű és partnerű tranzakció már létezik",
+        )
+
+    updated_ids = [row.id for row in result["updated"]]
+    if updated_ids:
+        ledger_events.transactions_changed(db, upserted_ids=updated_ids)
+
+    return {
+        "updated_count": len(updated_ids),
+        "not_found": result["not_found"],
+        "transactions": [transaction_to_dict(row) for row in result["updated"]],
+    }
+
+
 # DELETE - Transaction törlése
 @router.delete("/{transaction_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_transaction(transaction_id: int, db: Session = Depends(get_db)):
+def delete_transaction(transaction_id: int, db: Session = Depends(get_write_db)):
     """Tranzakció törlése"""
 
     transaction = db.query(Transaction).filter(Transaction.id == transaction_id).first()
@@ -253,16 +643,23 @@ def delete_transaction(transaction_id: int, db: Session = Depends(get_db)):
             detail=f"Transaction nem található ID: {transaction_id}",
         )
 
+    budgets.record_transactions(db, [transaction], sign=-1)
     db.delete(transaction)
+    change_feed.record(db, deleted_ids=[transaction_id])
     db.commit()
+    ledger_events.transactions_changed(db, deleted_ids=[transaction_id])
 
 
 # EXTRA - Kategória nélküli tranzakciók lekérése
 @router.get("/uncategorized/")
 def get_uncategorized_transactions(
-    skip: int = 0, limit: int = 100, db: Session = Depends(get_db)
+    skip: int = 0,
+    limit: int = 100,
+    format: str = "rows",
+    db: Session = Depends(get_read_db),
 ):
-    """Kategória nélküli tranzakciók lekérése"""
+    """Kategória nélküli tranzakciók lekérése (format=columnar: oszlopos válasz)"""
+    check_response_format(format)
 
     transactions = (
         db.query(Transaction)
@@ -273,4 +670,50 @@ def get_uncategorized_transactions(
         .all()
     )
 
-    return [transaction_to_dict(t) for t in transactions]
+    return format_rows([transaction_to_dict(t) for t in transactions], format)
+
+
+# EXTRA - Meglévő tranzakciók újrakategorizálása a jelenlegi kulcsszavakkal
+@router.post("/recategorize")
+def recategorize(
+    scope: str = "uncategorized",
+    date_from: str = None,
+    date_to: str = None,
+    dry_run: bool = False,
+    batch_size: int = 1000,
+    db: Session = Depends(get_write_db),
+):
+    """Kulcsszó szabályok újra alkalmazása meglévő tranzakciókra (batch-enként)"""
+
+    if scope not in RECATEGORIZE_SCOPES:
+        raise HTTPException(
+            400, f"Érvénytelen scope, lehetséges értékek: {list(RECATEGORIZE_SCOPES)}"
+        )
+
+    if not 0 < batch_size <= MAX_BATCH_SIZE:
+        raise HTTPException(400, f"batch_size 1 és {MAX_BATCH_SIZE} között lehet")
+
+    try:
+        start_date = datetime.fromisoformat(date_from).date() if date_from else None
+        end_date = datetime.fromisoformat(date_to).date() if date_to else None
+    except ValueError:
+        raise HTTPException(400, "Érvénytelen dátum formátum")
+
+    if scope == "date_range" and not (start_date or end_date):
+        raise HTTPException(
+            400, "date_range scope esetén date_from vagy date_to kötelező"
+        )
+
+    result = recategorize_transactions(
+        db,
+        scope=scope,
+        date_from=start_date,
+        date_to=end_date,
+        dry_run=dry_run,
+        batch_size=batch_size,
+    )
+
+    if result["changed_count"] and not dry_run:
+        ledger_events.transactions_changed(db, full_refresh=True)
+
+    return result
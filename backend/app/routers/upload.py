@@ -1,14 +1,43 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 import pandas as pd
+import asyncio
 import io
+import os
+import zipfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Any
-from app.database.models import Category, CategoryKeyword, Transaction
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
 from sqlalchemy.orm import Session
-from app.database.database import get_db
+from app.database import database
+from app.database.database import get_write_db
+from app.services import archive, columnar, metrics, reference_data, spreadsheet
+from app.services.categorization import get_rule_engine
+from app.services.category_model import suggest_categories, train_model
+from app.services.fx import convert_frame
+from app.services.sse import SSE_HEADERS, SSE_MEDIA_TYPE, sse_event
+from app.services.deduplication import find_existing_fingerprints, statement_fingerprint
 
 router = APIRouter(prefix="/upload", tags=["upload"])
 
+MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB / fájl (ZIP-en belül is)
+MAX_BATCH_FILES = 100
+MAX_BATCH_TOTAL_SIZE = 100 * 1024 * 1024  # 100MB / batch (kibontott méret)
+EXCEL_EXTENSIONS = (".xlsx", ".xls")
+STREAM_CHUNK_SIZE = 500  # Progress stream: ennyi soronként küld kész preview sorokat
+
+# Fájl parse-olás process pool-ja (lustán indul, első batch upload-nál)
+_parse_pool = None
+
+
+def get_parse_pool() -> ProcessPoolExecutor:
+    global _parse_pool
+    if _parse_pool is None:
+        workers = int(os.getenv("UPLOAD_PARSE_WORKERS", "0")) or os.cpu_count() or 1
+        _parse_pool = ProcessPoolExecutor(max_workers=workers)
+    return _parse_pool
+
 
 class TransactionFileValidator:
     """Tranzakciós fájl validátor osztály"""
@@ -119,31 +148,60 @@ class TransactionFileValidator:
         return errors
 
 
+def check_response_format(format: str) -> None:
+    if format not in columnar.RESPONSE_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"format lehetséges értékei: {list(columnar.RESPONSE_FORMATS)}",
+        )
+
+
+def format_rows(rows: List[Dict], format: str) -> Any:
+    """Preview sorok a kért formátumban (sor-objektumok vagy oszlopos)"""
+    return columnar.to_columnar(rows) if format == "columnar" else rows
+
+
+def parse_statement(file_content: bytes) -> pd.DataFrame:
+    """
+    Excel tartalom (.xlsx / .xls) beolvasása DataFrame-be, üres sorok nélkül,
+    a leggyorsabb elérhető olvasóval (calamine / openpyxl / xlrd).
+    Modul szintű függvény, hogy process pool-ban is futtatható legyen.
+    """
+    return spreadsheet.read_statement(
+        file_content, TransactionFileValidator.REQUIRED_COLUMNS
+    )
+
+
 @router.post("/")
-async def upload_xlsx_file(file: UploadFile = File(...), db: Session = Depends(get_db)):
+async def upload_xlsx_file(
+    file: UploadFile = File(...),
+    format: str = "rows",
+    db: Session = Depends(get_write_db),
+):
     """
     Excel fájl feltöltése és adatok kinyerése
+    (format=columnar: a preview sorok oszlopos, dictionary kódolt formában)
     """
+    check_response_format(format)
 
     # 1. Fájl típus validálás
-    if not file.filename.lower().endswith((".xlsx", ".xls")):
+    if not file.filename.lower().endswith(EXCEL_EXTENSIONS):
         raise HTTPException(
             status_code=400, detail="Csak Excel fájlok (.xlsx, .xls) engedélyezettek"
         )
 
     # 2. Fájl méret ellenőrzés (10MB limit)
-    if file.size > 10 * 1024 * 1024:
+    if file.size > MAX_FILE_SIZE:
         raise HTTPException(status_code=400, detail="Fájl túl nagy (maximum 10MB)")
 
     try:
         # 3. Fájl beolvasása
         file_content = await file.read()
 
-        # 4. Pandas DataFrame létrehozása
-        df = pd.read_excel(io.BytesIO(file_content), engine="openpyxl")
-
-        # 5. Üres sorok eltávolítása
-        df = df.dropna(how="all")
+        # 4-5. Pandas DataFrame létrehozása, üres sorok eltávolítása
+        with metrics.UPLOAD_PARSE_SECONDS.time():
+            df = parse_statement(file_content)
+        metrics.UPLOAD_ROWS_PARSED.inc(len(df))
 
         if df.empty:
             raise HTTPException(status_code=400, detail="A fájl nem tartalmaz adatokat")
@@ -184,7 +242,7 @@ async def upload_xlsx_file(file: UploadFile = File(...), db: Session = Depends(g
         response = {
             "success": True,
             "message": f"Fájl feldolgozva: {len(df)} tranzakció, {transactions_data['duplicates']['count']} duplikátum",
-            "transactions": transactions_data["transactions"],
+            "transactions": format_rows(transactions_data["transactions"], format),
             "duplicates": transactions_data["duplicates"],
             "validation": {"warnings": validation_warnings, "is_valid": True},
         }
@@ -203,37 +261,156 @@ async def upload_xlsx_file(file: UploadFile = File(...), db: Session = Depends(g
         await file.close()
 
 
-async def process_transactions(df: pd.DataFrame, db: Session) -> Dict:
+@router.post("/stream")
+async def upload_xlsx_stream(file: UploadFile = File(...), format: str = "rows"):
+    """
+    Excel fájl feldolgozása Server-Sent Events progress stream-mel.
+    Események: stage (parsing / validating / categorizing), rows (kész preview
+    sorok chunk-onként), progress (feldolgozott / összes sor), done, error.
+    """
+    check_response_format(format)
+    if not file.filename.lower().endswith(EXCEL_EXTENSIONS):
+        raise HTTPException(
+            status_code=400, detail="Csak Excel fájlok (.xlsx, .xls) engedélyezettek"
+        )
+    if file.size > MAX_FILE_SIZE:
+        raise HTTPException(status_code=400, detail="Fájl túl nagy (maximum 10MB)")
+
+    try:
+        file_content = await file.read()
+    finally:
+        await file.close()
+
+    return StreamingResponse(
+        stream_upload(file.filename, file_content, format),
+        media_type=SSE_MEDIA_TYPE,
+        headers=SSE_HEADERS,
+    )
+
+
+async def stream_upload(
+    filename: str, file_content: bytes, format: str = "rows"
+) -> AsyncIterator[str]:
+    """Upload feldolgozás lépésenként, események a kliens felé"""
+    yield sse_event("stage", {"stage": "parsing", "filename": filename})
+    try:
+        # Parse-olás process pool-ban, hogy az event loop közben is kiszolgáljon
+        loop = asyncio.get_running_loop()
+        with metrics.UPLOAD_PARSE_SECONDS.time():
+            df = await loop.run_in_executor(
+                get_parse_pool(), parse_statement, file_content
+            )
+        metrics.UPLOAD_ROWS_PARSED.inc(len(df))
+    except Exception as e:
+        yield sse_event("error", {"message": f"Hiba a fájl feldolgozása során: {e}"})
+        return
+    if df.empty:
+        yield sse_event("error", {"message": "A fájl nem tartalmaz adatokat"})
+        return
+
+    total = len(df)
+    yield sse_event("stage", {"stage": "validating", "total": total})
+    column_errors = TransactionFileValidator.validate_columns(df)
+    if column_errors:
+        yield sse_event(
+            "error",
+            {
+                "message": "Fájlstruktúra hibás",
+                "errors": column_errors,
+                "available_columns": [str(col) for col in df.columns],
+            },
+        )
+        return
+    validation_warnings = TransactionFileValidator.validate_data_types(df)
+    yield sse_event("validation", {"warnings": validation_warnings, "is_valid": True})
+
+    yield sse_event("stage", {"stage": "categorizing", "total": total})
+    duplicate_count = 0
+    # Előfordulási sorszámok a chunk-okon át folytatódnak (mint a teljes fájlnál)
+    occurrences = {}
+    # Saját session: a stream a kérés dependency-jeinek lezárása után fut
+    with database.SessionLocal() as db:
+        try:
+            for start in range(0, total, STREAM_CHUNK_SIZE):
+                chunk = await process_transactions(
+                    df.iloc[start : start + STREAM_CHUNK_SIZE], db, occurrences
+                )
+                duplicate_count += chunk["duplicates"]["count"]
+                yield sse_event(
+                    "rows",
+                    {
+                        "offset": start,
+                        "transactions": format_rows(chunk["transactions"], format),
+                        "duplicates": chunk["duplicates"],
+                    },
+                )
+                yield sse_event(
+                    "progress",
+                    {
+                        "stage": "categorizing",
+                        "processed": min(start + STREAM_CHUNK_SIZE, total),
+                        "total": total,
+                        "duplicates": duplicate_count,
+                    },
+                )
+        except Exception as e:
+            yield sse_event(
+                "error", {"message": f"Hiba a fájl feldolgozása során: {e}"}
+            )
+            return
+
+    yield sse_event(
+        "done",
+        {
+            "success": True,
+            "message": f"Fájl feldolgozva: {total} tranzakció, {duplicate_count} duplikátum",
+            "total": total,
+            "duplicates": duplicate_count,
+        },
+    )
+
+
+async def process_transactions(
+    df: pd.DataFrame, db: Session, occurrences: Optional[Dict] = None
+) -> Dict:
     """
     Tranzakciók feldolgozása: kategorizálás + duplikáció ellenőrzés
+    (occurrences: előfordulási számláló, ha a fájl több részletben érkezik)
     """
 
     # 1. Kategorizálás
-    transactions = await categorize_transactions(df, db)
+    with metrics.UPLOAD_CATEGORIZE_SECONDS.time():
+        transactions = await categorize_transactions(df, db)
+    sources = Counter(
+        transaction.get("suggestion_source") or "none" for transaction in transactions
+    )
+    for source, count in sources.items():
+        metrics.UPLOAD_CATEGORIZED_ROWS.inc(count, source=source)
 
     # 2. Duplikáció ellenőrzés
-    duplicates = await check_duplicates(transactions, db)
+    with metrics.UPLOAD_DUPLICATE_CHECK_SECONDS.time():
+        duplicates = await check_duplicates(transactions, db, occurrences)
 
     return {"transactions": transactions, "duplicates": duplicates}
 
 
 async def categorize_transactions(df: pd.DataFrame, db: Session) -> List[Dict]:
     """
-    Tranzakciók kategorizálása Partner neve alapján keywords matching-gel
+    Tranzakciók kategorizálása szabályok alapján (partner, közlemény, számlaszám,
+    költési kategória; irány és összeg feltételekkel)
     """
 
-    # Összes kategória és kulcsszavak lekérése
-    categories_with_keywords = db.query(Category).join(CategoryKeyword).all()
-
-    # Keywords map építése (kulcsszó -> kategória)
-    keyword_to_category = {}
-    for category in categories_with_keywords:
-        for keyword_obj in category.keywords:
-            keyword_to_category[keyword_obj.keyword.upper()] = {
-                "id": category.id,
-                "name": category.name,
-                "type": category.type,
-            }
+    # Szabályok lefordítása egyetlen kiértékelőbe
+    rule_engine = get_rule_engine(db)
+
+    # HUF összegek vektorizáltan (memoizált árfolyamokkal)
+    amounts_huf = convert_frame(
+        db,
+        df,
+        amount_column="Összeg",
+        currency_column="Pénznem",
+        date_column="Tranzakció dátuma",
+    )
 
     transactions = []
 
@@ -273,49 +450,79 @@ async def categorize_transactions(df: pd.DataFrame, db: Session) -> List[Dict]:
             ),
             "amount": float(row["Összeg"]) if pd.notna(row["Összeg"]) else 0.0,
             "currency": str(row["Pénznem"]) if pd.notna(row["Pénznem"]) else "HUF",
+            "amount_huf": (
+                float(amounts_huf[index]) if pd.notna(amounts_huf[index]) else None
+            ),
             "suggested_category": None,
         }
-
-        # Kategória keresés Partner neve alapján
-        partner_name = transaction["partner_name"].upper()
-
-        if partner_name:
-            # Kulcsszó keresés a partner névben
-            found_category = None
-            for keyword, category_info in keyword_to_category.items():
-                if keyword in partner_name:
-                    found_category = category_info
-                    break
-
-            if found_category:
-                transaction["suggested_category"] = found_category
+        # Batch feltöltésnél a forrás fájl (az előfordulási sorszám fájlonkénti)
+        if "_source_file" in df.columns:
+            transaction["source_file"] = row["_source_file"]
+
+        # Kategória keresés a szabályok alapján (partner, közlemény, számlaszám, ...)
+        transaction["suggested_category"] = rule_engine.categorize(transaction)
+        transaction["suggestion_source"] = (
+            "rule" if transaction["suggested_category"] else None
+        )
 
         transactions.append(transaction)
 
+    # Szabállyal nem kategorizált sorok: tanult modell javaslata (egy batch-ben)
+    suggest_categories(db, transactions, reference_data.get_categories_by_id(db))
+
     return transactions
 
 
-async def check_duplicates(transactions: List[Dict], db: Session) -> Dict:
+@router.post("/suggester/train")
+def train_category_suggester(full: bool = False, db: Session = Depends(get_write_db)):
+    """
+    Kategória javasló modell tanítása a kategorizált tranzakciókon
+    (alapból inkrementálisan, full=true esetén nulláról)
+    """
+    model = train_model(db, full=full)
+    return {
+        "trained_rows": model.trained_rows,
+        "categories": len(model.category_ids),
+        "watermark_seq": model.watermark_seq,
+        "is_trained": model.is_trained,
+    }
+
+
+async def check_duplicates(
+    transactions: List[Dict], db: Session, occurrences: Optional[Dict] = None
+) -> Dict:
     """
     Duplikáció ellenőrzés meglévő tranzakciók alapján
-    Matching: transaction_date + amount + partner_name
+    Matching: transaction_date + amount + partner_name fingerprint (indexelt IN),
+    a fájlon belül ismétlődő tételek előfordulási sorszámmal (a mentéssel azonosan)
     """
 
     duplicate_info = {"count": 0, "transactions": []}
 
-    for transaction in transactions:
-        # Duplikáció keresés az adatbázisban
-        existing_transaction = (
-            db.query(Transaction)
-            .filter(
-                Transaction.transaction_date == transaction["transaction_date"],
-                Transaction.amount == transaction["amount"],
-                Transaction.partner_name == transaction["partner_name"],
-            )
-            .first()
+    occurrences = {} if occurrences is None else occurrences
+    fingerprints = [
+        statement_fingerprint(
+            occurrences,
+            transaction["transaction_date"],
+            transaction["amount"],
+            transaction["partner_name"],
+            transaction.get("source_file"),
+        )
+        for transaction in transactions
+    ]
+    existing_ids = find_existing_fingerprints(db, fingerprints)
+    existing_ids.update(
+        archive.find_archived_fingerprints(
+            (fingerprint, transaction["transaction_date"])
+            for transaction, fingerprint in zip(transactions, fingerprints)
+            if fingerprint not in existing_ids
         )
+    )
 
-        if existing_transaction:
+    for transaction, fingerprint in zip(transactions, fingerprints):
+        existing_id = existing_ids.get(fingerprint)
+
+        if existing_id:
             duplicate_info["count"] += 1
             duplicate_info["transactions"].append(
                 {
@@ -323,15 +530,247 @@ async def check_duplicates(transactions: List[Dict], db: Session) -> Dict:
                     "partner_name": transaction["partner_name"],
                     "amount": transaction["amount"],
                     "transaction_date": transaction["transaction_date"],
-                    "existing_id": existing_transaction.id,
+                    "existing_id": existing_id,
                     "is_duplicate": True,
                 }
             )
 
             # Eredeti tranzakcióhoz is jelöljük
             transaction["is_duplicate"] = True
-            transaction["existing_transaction_id"] = existing_transaction.id
+            transaction["existing_transaction_id"] = existing_id
         else:
             transaction["is_duplicate"] = False
 
     return duplicate_info
+
+
+def expand_upload(
+    filename: str,
+    content: bytes,
+    max_files: int = MAX_BATCH_FILES,
+    max_total_size: int = MAX_BATCH_TOTAL_SIZE,
+) -> List[Tuple[str, bytes, str]]:
+    """
+    Feltöltött fájl kibontása (név, tartalom, hiba) listára.
+    ZIP esetén az összes benne lévő Excel fájl, méret ellenőrzéssel. A fájlszám
+    és a kibontott összméret a ZIP fejlécéből (infolist) ellenőrződik, mielőtt
+    bármi beolvasásra kerülne; túllépésnél ValueError.
+    """
+    if filename.lower().endswith(EXCEL_EXTENSIONS):
+        if len(content) > MAX_FILE_SIZE:
+            return [(filename, b"", "Fájl túl nagy (maximum 10MB)")]
+        return [(filename, content, None)]
+
+    if not filename.lower().endswith(".zip"):
+        return [
+            (filename, b"", "Csak Excel (.xlsx, .xls) vagy ZIP fájlok engedélyezettek")
+        ]
+
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(content))
+    except zipfile.BadZipFile:
+        return [(filename, b"", "Hibás ZIP fájl")]
+
+    entries = []
+    with archive:
+        members = [
+            member
+            for member in archive.infolist()
+            if not member.is_dir()
+            and not member.filename.startswith("__MACOSX/")
+            and member.filename.lower().endswith(EXCEL_EXTENSIONS)
+        ]
+        if len(members) > max_files:
+            raise ValueError(f"Túl sok fájl (maximum {MAX_BATCH_FILES})")
+        # A deklarált méretnél többet a zipfile nem bont ki
+        total_size = sum(
+            member.file_size for member in members if member.file_size <= MAX_FILE_SIZE
+        )
+        if total_size > max_total_size:
+            raise ValueError(
+                f"Túl nagy batch (maximum {MAX_BATCH_TOTAL_SIZE // (1024 * 1024)}MB kibontva)"
+            )
+
+        for member in members:
+            display_name = f"{filename}/{member.filename}"
+            if member.file_size > MAX_FILE_SIZE:
+                entries.append((display_name, b"", "Fájl túl nagy (maximum 10MB)"))
+                continue
+            entries.append((display_name, archive.read(member), None))
+    return entries
+
+
+@router.post("/batch")
+async def upload_xlsx_batch(
+    files: List[UploadFile] = File(...),
+    format: str = "rows",
+    db: Session = Depends(get_write_db),
+):
+    """
+    Több Excel fájl (vagy ZIP archívum) feltöltése egyszerre.
+    A fájlok párhuzamosan, process pool-ban kerülnek beolvasásra; az eredmény
+    egyetlen preview, fájlok közötti és adatbázis szerinti duplikáció szűréssel.
+    """
+
+    check_response_format(format)
+
+    # 1. Fájlok beolvasása és ZIP-ek kibontása
+    entries = []
+    total_size = 0
+    try:
+        for file in files:
+            if len(entries) >= MAX_BATCH_FILES:
+                raise ValueError(f"Túl sok fájl (maximum {MAX_BATCH_FILES})")
+            if file.size is not None and file.size > MAX_BATCH_TOTAL_SIZE:
+                raise ValueError(
+                    f"Túl nagy batch (maximum {MAX_BATCH_TOTAL_SIZE // (1024 * 1024)}MB)"
+                )
+            new_entries = expand_upload(
+                file.filename,
+                await file.read(),
+                max_files=MAX_BATCH_FILES - len(entries),
+                max_total_size=MAX_BATCH_TOTAL_SIZE - total_size,
+            )
+            entries.extend(new_entries)
+            total_size += sum(len(content) for _, content, _ in new_entries)
+            if total_size > MAX_BATCH_TOTAL_SIZE:
+                raise ValueError(
+                    f"Túl nagy batch (maximum {MAX_BATCH_TOTAL_SIZE // (1024 * 1024)}MB)"
+                )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        for file in files:
+            await file.close()
+
+    if not entries:
+        raise HTTPException(status_code=400, detail="Nem található feldolgozható fájl")
+
+    # 2. Párhuzamos parse-olás process pool-ban
+    loop = asyncio.get_running_loop()
+    pool = get_parse_pool()
+    with metrics.UPLOAD_PARSE_SECONDS.time():
+        parse_results = await asyncio.gather(
+            *(
+                loop.run_in_executor(pool, parse_statement, content)
+                for _, content, error in entries
+                if error is None
+            ),
+            return_exceptions=True,
+        )
+    metrics.UPLOAD_ROWS_PARSED.inc(
+        sum(len(df) for df in parse_results if isinstance(df, pd.DataFrame))
+    )
+    parse_results = iter(parse_results)
+
+    # 3. Fájlonkénti validálás
+    file_statuses = []
+    frames = []
+    for filename, _, error in entries:
+        status = {
+            "filename": filename,
+            "status": "error",
+            "rows": 0,
+            "duplicates": 0,
+            "cross_file_duplicates": 0,
+            "errors": [],
+            "warnings": [],
+        }
+        file_statuses.append(status)
+
+        if error is not None:
+            status["errors"].append(error)
+            continue
+
+        df = next(parse_results)
+        if isinstance(df, Exception):
+            status["errors"].append(f"Hiba a fájl feldolgozása során: {str(df)}")
+            continue
+        if df.empty:
+            status["errors"].append("A fájl nem tartalmaz adatokat")
+            continue
+
+        column_errors = TransactionFileValidator.validate_columns(df)
+        if column_errors:
+            status["errors"].extend(column_errors)
+            continue
+
+        status["warnings"].extend(TransactionFileValidator.validate_data_types(df))
+        status["warnings"].extend(TransactionFileValidator.validate_required_data(df))
+        status["status"] = "ok"
+        status["rows"] = len(df)
+
+        df = df[TransactionFileValidator.REQUIRED_COLUMNS].copy()
+        df["_source_file"] = filename
+        df["_source_row"] = range(1, len(df) + 1)
+        frames.append(df)
+
+    if not frames:
+        return {
+            "success": False,
+            "message": "Egyik fájl sem dolgozható fel",
+            "transactions": [],
+            "duplicates": {"count": 0, "transactions": []},
+            "files": file_statuses,
+        }
+
+    # 4. Egyesített kategorizálás és DB duplikáció ellenőrzés
+    merged = pd.concat(frames, ignore_index=True)
+    transactions_data = await process_transactions(merged, db)
+    transactions = transactions_data["transactions"]
+
+    status_by_file = {status["filename"]: status for status in file_statuses}
+    first_seen = {}
+    occurrences = {}
+
+    for transaction, source_file, source_row in zip(
+        transactions, merged["_source_file"], merged["_source_row"]
+    ):
+        transaction["source_file"] = source_file
+        transaction["row_number"] = int(source_row)
+        status = status_by_file[source_file]
+        # Fájlonkénti előfordulási sorszámmal (a DB ellenőrzéssel azonosan)
+        fingerprint = statement_fingerprint(
+            occurrences,
+            transaction["transaction_date"],
+            transaction["amount"],
+            transaction["partner_name"],
+            source_file,
+        )
+
+        if transaction["is_duplicate"]:
+            status["duplicates"] += 1
+            continue
+
+        # 5. Fájlok közötti duplikáció (ugyanaz a tétel több kivonatban)
+        original = first_seen.setdefault(fingerprint, transaction)
+        if original is not transaction and original["source_file"] != source_file:
+            transaction["is_duplicate"] = True
+            transaction["duplicate_of"] = {
+                "source_file": original["source_file"],
+                "row_number": original["row_number"],
+            }
+            status["cross_file_duplicates"] += 1
+
+    # DB duplikátumok sorszáma a forrás fájlon belüli sorszámra
+    for duplicate in transactions_data["duplicates"]["transactions"]:
+        source = transactions[duplicate["row_number"] - 1]
+        duplicate["row_number"] = source["row_number"]
+        duplicate["source_file"] = source["source_file"]
+
+    cross_file_count = sum(s["cross_file_duplicates"] for s in file_statuses)
+    ok_files = sum(1 for s in file_statuses if s["status"] == "ok")
+
+    return {
+        "success": True,
+        "message": (
+            f"{ok_files}/{len(file_statuses)} fájl feldolgozva: "
+            f"{len(transactions)} tranzakció, "
+            f"{transactions_data['duplicates']['count']} duplikátum, "
+            f"{cross_file_count} fájlok közötti duplikátum"
+        ),
+        "transactions": format_rows(transactions, format),
+        "duplicates": transactions_data["duplicates"],
+        "cross_file_duplicates": cross_file_count,
+        "files": file_statuses,
+    }
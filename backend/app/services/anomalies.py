@@ -0,0 +1,275 @@
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import extract, func, select
+from sqlalchemy.orm import Session
+
+from app.database import database
+from app.database.models import Transaction
+from app.services import ledger_events
+from app.services.fx import amount_in_base_currency
+from app.services.recurring import normalize_partners
+
+logger = logging.getLogger(__name__)
+
+LOAD_CHUNK_SIZE = 50000
+
+# Kategória havi költés: gördülő alapvonal az előző hónapokból
+BASELINE_MONTHS = 6
+MIN_BASELINE_MONTHS = 3
+CATEGORY_Z_THRESHOLD = 2.5
+# Legalább ekkora relatív eltérés kell (kis szórású kategóriák zajának szűrése)
+CATEGORY_MIN_DEVIATION = 0.3
+
+# Partner: robusztus z-score (medián / MAD) a partner szokásos összegeihez képest
+MIN_PARTNER_TRANSACTIONS = 5
+PARTNER_Z_THRESHOLD = 4.0
+PARTNER_MIN_RATIO = 2.0  # legalább kétszeres / feleakkora összeg
+MAD_SCALE = 1.4826  # MAD -> szórás normál eloszlásnál
+
+
+def _month_totals(db: Session) -> pd.DataFrame:
+    """Kategóriánkénti havi kiadás HUF-ban (SQL GROUP BY, kategória x hónap sor)"""
+    ledger = (
+        select(
+            Transaction.category_id,
+            Transaction.transaction_date,
+            amount_in_base_currency().label("amount_huf"),
+        )
+        .where(Transaction.direction == "Kimenő", Transaction.category_id.isnot(None))
+        .subquery()
+    )
+    year = extract("year", ledger.c.transaction_date)
+    month = extract("month", ledger.c.transaction_date)
+    rows = db.execute(
+        select(
+            ledger.c.category_id,
+            year.label("year"),
+            month.label("month"),
+            func.sum(func.abs(ledger.c.amount_huf)).label("total"),
+        ).group_by(ledger.c.category_id, year, month)
+    ).all()
+    return pd.DataFrame(rows, columns=["category_id", "year", "month", "total"])
+
+
+def detect_category_months(totals: pd.DataFrame) -> pd.DataFrame:
+    """
+    Havi kategória összeg vs. az előző BASELINE_MONTHS hónap gördülő átlaga / szórása.
+    A hiányzó hónapok 0 költéssel számítanak (teljes hónap rács kategóriánként).
+    """
+    if totals.empty:
+        return pd.DataFrame()
+
+    totals = totals.astype({"category_id": int, "year": int, "month": int})
+    totals["period"] = totals["year"] * 12 + totals["month"] - 1
+    totals["total"] = totals["total"].astype(float)
+
+    # Kategória x hónap rács (első költéstől az utolsó ismert hónapig)
+    last_period = totals["period"].max()
+    first_periods = totals.groupby("category_id")["period"].min()
+    lengths = (last_period - first_periods + 1).to_numpy()
+    grid = pd.DataFrame(
+        {
+            "category_id": np.repeat(first_periods.index.to_numpy(), lengths),
+            "period": np.concatenate(
+                [np.arange(start, last_period + 1) for start in first_periods]
+            ),
+        }
+    )
+    grid = grid.merge(
+        totals[["category_id", "period", "total"]],
+        on=["category_id", "period"],
+        how="left",
+    ).fillna({"total": 0.0})
+
+    # Az adott hónap nélküli gördülő statisztika (shift 1)
+    previous = grid.groupby("category_id")["total"].shift(1)
+    rolling = previous.groupby(grid["category_id"]).rolling(
+        BASELINE_MONTHS, min_periods=MIN_BASELINE_MONTHS
+    )
+    grid["baseline"] = rolling.mean().reset_index(level=0, drop=True)
+    std = rolling.std().reset_index(level=0, drop=True)
+    # Szórás alsó korlát: konstans költésnél is értelmes z-score
+    grid["baseline_std"] = np.maximum(std.fillna(0), grid["baseline"] * 0.1)
+
+    grid["z_score"] = (grid["total"] - grid["baseline"]) / grid["baseline_std"]
+    deviation = (grid["total"] - grid["baseline"]).abs() / grid["baseline"]
+
+    flagged = grid[
+        (grid["baseline"] > 0)
+        & (grid["z_score"].abs() >= CATEGORY_Z_THRESHOLD)
+        & (deviation >= CATEGORY_MIN_DEVIATION)
+    ].copy()
+    flagged["year"] = flagged["period"] // 12
+    flagged["month"] = flagged["period"] % 12 + 1
+    return flagged
+
+
+def _partner_rows(db: Session) -> pd.DataFrame:
+    query = select(
+        Transaction.id,
+        Transaction.transaction_date,
+        Transaction.partner_name,
+        Transaction.direction,
+        Transaction.currency,
+        Transaction.amount,
+        Transaction.category_id,
+    ).where(Transaction.partner_name.isnot(None))
+    frames = [
+        pd.DataFrame(partition, columns=list(query.selected_columns.keys()))
+        for partition in db.execute(
+            query.execution_options(yield_per=LOAD_CHUNK_SIZE)
+        ).partitions()
+    ]
+    if not frames:
+        return pd.DataFrame(columns=list(query.selected_columns.keys()))
+    return pd.concat(frames, ignore_index=True)
+
+
+def detect_partner_outliers(rows: pd.DataFrame) -> pd.DataFrame:
+    """
+    Tranzakciók, amelyek összege messze esik a partner szokásos összegétől:
+    partner + irány + deviza csoportonként medián és MAD (vektorizált transform).
+    """
+    if rows.empty:
+        return pd.DataFrame()
+
+    rows = rows.copy()
+    rows["partner_key"] = normalize_partners(rows["partner_name"])
+    rows = rows[rows["partner_key"] != ""]
+    rows["amount"] = rows["amount"].astype(float).abs()
+
+    groups = rows.groupby(["partner_key", "direction", "currency"])["amount"]
+    rows["partner_count"] = groups.transform("size")
+    rows["partner_median"] = groups.transform("median")
+    absolute_deviation = (rows["amount"] - rows["partner_median"]).abs()
+    mad = absolute_deviation.groupby(
+        [rows["partner_key"], rows["direction"], rows["currency"]]
+    ).transform("median")
+    # MAD alsó korlát: mindig azonos összegű partnernél is legyen skála
+    scale = np.maximum(mad * MAD_SCALE, rows["partner_median"] * 0.05)
+    rows["z_score"] = absolute_deviation / scale.replace(0, np.nan)
+
+    ratio = rows["amount"] / rows["partner_median"].replace(0, np.nan)
+    flagged = rows[
+        (rows["partner_count"] >= MIN_PARTNER_TRANSACTIONS)
+        & (rows["z_score"] >= PARTNER_Z_THRESHOLD)
+        & ((ratio >= PARTNER_MIN_RATIO) | (ratio <= 1 / PARTNER_MIN_RATIO))
+    ]
+    return flagged
+
+
+class AnomalyStore:
+    """
+    Előszámolt anomáliák: írások (import, bulk, törlés) után háttérszálon
+    újraszámolódnak, a dashboard olvasás csak a kész listát adja vissza.
+    """
+
+    def __init__(self):
+        self.category_months: List[Dict[str, Any]] = []
+        self.transactions: List[Dict[str, Any]] = []
+        self.computed_at: Optional[datetime] = None
+        self.computed_version: Optional[int] = None
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._rerun = False
+
+    def compute(self, db: Session) -> None:
+        """Teljes batch számítás (kategória hónapok + partner outlierek)"""
+        version = ledger_events.data_version(db)
+
+        months = detect_category_months(_month_totals(db))
+        category_months = [
+            {
+                "category_id": int(row["category_id"]),
+                "year": int(row["year"]),
+                "month": int(row["month"]),
+                "total": float(row["total"]),
+                "baseline": round(float(row["baseline"]), 2),
+                "z_score": round(float(row["z_score"]), 2),
+            }
+            for row in (months.to_dict("records") if not months.empty else [])
+        ]
+
+        outliers = detect_partner_outliers(_partner_rows(db))
+        transactions = [
+            {
+                "transaction_id": int(row["id"]),
+                "transaction_date": row["transaction_date"].isoformat(),
+                "partner_name": row["partner_name"],
+                "direction": row["direction"],
+                "currency": row["currency"],
+                "amount": float(row["amount"]),
+                "partner_median": float(row["partner_median"]),
+                "partner_count": int(row["partner_count"]),
+                "z_score": round(float(row["z_score"]), 2),
+                "category_id": (
+                    int(row["category_id"]) if pd.notna(row["category_id"]) else None
+                ),
+            }
+            for row in (outliers.to_dict("records") if not outliers.empty else [])
+        ]
+
+        with self._lock:
+            self.category_months = category_months
+            self.transactions = transactions
+            self.computed_at = datetime.now()
+            self.computed_version = version
+
+    def _run(self) -> None:
+        while True:
+            try:
+                with database.SessionLocal() as db:
+                    self.compute(db)
+            except Exception:
+                logger.exception("Anomaly computation failed")
+            with self._lock:
+                if not self._rerun:
+                    self._worker = None
+                    return
+                self._rerun = False
+
+    def schedule(self) -> None:
+        """Háttér újraszámolás; futás közbeni újabb írásnál még egyszer lefut"""
+        with self._lock:
+            if self._worker is not None:
+                self._rerun = True
+                return
+            self._worker = threading.Thread(
+                target=self._run, name="anomaly-detection", daemon=True
+            )
+            self._worker.start()
+
+    def on_change(self, db: Session, change: ledger_events.LedgerChange) -> None:
+        if self.computed_at is not None:
+            self.schedule()
+
+    def results(self, db: Session) -> Dict[str, Any]:
+        if self.computed_at is None:
+            # A megosztott eredmény a primary-ről számolódik (a replika késhet)
+            if database.is_replica(db):
+                with database.SessionLocal() as primary:
+                    self.compute(primary)
+            else:
+                self.compute(db)
+        elif self._worker is None and self.computed_version != (
+            ledger_events.data_version(db)
+        ):
+            # Más folyamat írása (pl. CLI restore / archiválás) - nincs on_change
+            self.schedule()
+        with self._lock:
+            return {
+                "computed_at": self.computed_at.isoformat(),
+                "data_version": self.computed_version,
+                "pending": self._worker is not None,
+                "category_months": self.category_months,
+                "transactions": self.transactions,
+            }
+
+
+store = AnomalyStore()
+ledger_events.subscribe(store.on_change)
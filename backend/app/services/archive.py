@@ -0,0 +1,557 @@
+import json
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from sqlalchemy import and_, delete, or_, select
+from sqlalchemy.orm import Session
+
+from app.database.models import Transaction
+from app.services import change_feed, reference_data
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "data/archive")
+MANIFEST_NAME = "manifest.json"
+COMPRESSION = "zstd"
+
+ARCHIVE_BATCH_SIZE = 50000
+DELETE_CHUNK_SIZE = 1000
+
+# Archív fájlok sémája: a transactions tábla összes oszlopa
+ARCHIVE_SCHEMA = pa.schema(
+    [
+        ("id", pa.int64()),
+        ("transaction_date", pa.date32()),
+        ("booking_date", pa.date32()),
+        ("transaction_type", pa.string()),
+        ("direction", pa.string()),
+        ("partner_name", pa.string()),
+        ("partner_account", pa.string()),
+        ("expense_category", pa.string()),
+        ("description", pa.string()),
+        ("account_name", pa.string()),
+        ("account_number", pa.string()),
+        ("amount", pa.decimal128(15, 2)),
+        ("currency", pa.string()),
+        ("category_id", pa.int64()),
+        ("fingerprint", pa.string()),
+        ("created_at", pa.timestamp("us")),
+        ("updated_at", pa.timestamp("us")),
+    ]
+)
+ARCHIVE_COLUMNS = ARCHIVE_SCHEMA.names
+
+_manifest_cache: Dict[str, Any] = {"mtime": None, "manifest": None}
+_manifest_lock = threading.Lock()
+
+
+# --- Manifest ---
+
+
+def manifest_path() -> str:
+    return os.path.join(ARCHIVE_DIR, MANIFEST_NAME)
+
+
+def load_manifest() -> Dict[str, Any]:
+    """Manifest (fájl mtime szerint cache-elve; más processz archiválása után újraolvas)"""
+    path = manifest_path()
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return {"files": []}
+
+    with _manifest_lock:
+        if _manifest_cache["mtime"] != mtime:
+            with open(path, encoding="utf-8") as f:
+                _manifest_cache["manifest"] = json.load(f)
+            _manifest_cache["mtime"] = mtime
+        return _manifest_cache["manifest"]
+
+
+def save_manifest(manifest: Dict[str, Any]) -> None:
+    """Atomikus mentés (ideiglenes fájl + átnevezés), új revision számmal"""
+    manifest = {**manifest, "revision": manifest_revision() + 1}
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    tmp_path = f"{manifest_path()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, manifest_path())
+
+
+def has_archive() -> bool:
+    return bool(load_manifest()["files"])
+
+
+def manifest_revision() -> int:
+    """Minden manifest mentéskor nő (cache kulcsokhoz: új fájl, kategória átszámozás)"""
+    return load_manifest().get("revision", 0)
+
+
+def _to_date(value: Any) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.fromisoformat(str(value).strip()).date()
+
+
+def archived_files(
+    date_from: Optional[date] = None, date_to: Optional[date] = None
+) -> List[Dict[str, Any]]:
+    """Partíció pruning: csak a dátum tartományt metsző fájlok (legújabb elöl)"""
+    files = []
+    for entry in load_manifest()["files"]:
+        if date_from and entry["max_date"] < date_from.isoformat():
+            continue
+        if date_to and entry["min_date"] > date_to.isoformat():
+            continue
+        files.append(entry)
+    return sorted(files, key=lambda e: (e["max_date"], e["max_id"]), reverse=True)
+
+
+# --- Olvasás ---
+
+
+def _entry_remap(entry: Dict[str, Any]) -> Dict[int, Optional[int]]:
+    """Fájl kategória átszámozása: eredeti category_id -> aktuális (None = nincs)"""
+    return {int(source): target for source, target in entry.get("category_remap", [])}
+
+
+def _apply_remap(frame: pd.DataFrame, remap: Dict[int, Optional[int]]) -> pd.DataFrame:
+    if not remap or frame.empty or "category_id" not in frame:
+        return frame
+    original = frame["category_id"].to_numpy()
+    values = original.astype("float64")
+    for source, target in remap.items():
+        values[original == source] = np.nan if target is None else target
+    if not np.isnan(values).any():
+        values = values.astype("int64")
+    return frame.assign(category_id=values)
+
+
+def read_archived(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    columns: Optional[List[str]] = None,
+    category_id: Optional[int] = None,
+    files: Optional[List[Dict[str, Any]]] = None,
+) -> pd.DataFrame:
+    """
+    Archivált tranzakciók a dátum tartományban (partíció + row group pruning,
+    csak a kért oszlopok beolvasásával). A category_id a manifestben tárolt
+    átszámozás (kategória törlés / összevonás) után értendő.
+    """
+    if files is None:
+        files = archived_files(date_from, date_to)
+    columns = columns or ARCHIVE_COLUMNS
+
+    # Azonos átszámozású fájlok egy dataset-ként olvasva
+    groups: Dict[Tuple, List[Dict[str, Any]]] = {}
+    for entry in files:
+        key = tuple(sorted(_entry_remap(entry).items(), key=lambda item: item[0]))
+        groups.setdefault(key, []).append(entry)
+
+    frames = []
+    for key, group in groups.items():
+        remap = dict(key)
+        if category_id is None:
+            category_filter = None
+        else:
+            # Az aktuális category_id-re leképeződő eredeti értékek
+            sources = [source for source, target in key if target == category_id]
+            if category_id not in remap:
+                sources.append(category_id)
+            if not sources:
+                continue
+            category_filter = ds.field("category_id").isin(sources)
+
+        dataset = ds.dataset(
+            [os.path.join(ARCHIVE_DIR, entry["path"]) for entry in group],
+            schema=ARCHIVE_SCHEMA,
+            format="parquet",
+        )
+        condition = None
+        for expression in (
+            ds.field("transaction_date") >= date_from if date_from else None,
+            ds.field("transaction_date") <= date_to if date_to else None,
+            category_filter,
+        ):
+            if expression is not None:
+                condition = expression if condition is None else condition & expression
+
+        frames.append(
+            _apply_remap(
+                dataset.to_table(columns=columns, filter=condition).to_pandas(), remap
+            )
+        )
+
+    if not frames:
+        return (
+            pa.Table.from_pylist([], schema=ARCHIVE_SCHEMA).select(columns).to_pandas()
+        )
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames, ignore_index=True)
+
+
+def iter_archived(
+    date_from: Optional[date] = None, date_to: Optional[date] = None
+) -> Iterator[pd.DataFrame]:
+    """Archív fájlok egyenként (legújabb elöl) - export / lapozás memóriakímélően"""
+    for entry in archived_files(date_from, date_to):
+        frame = read_archived(date_from, date_to, files=[entry])
+        if not frame.empty:
+            yield frame.sort_values(
+                ["transaction_date", "id"], ascending=False, kind="stable"
+            )
+
+
+def row_to_dict(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Archivált sor a transaction_to_dict-tel azonos alakban (+ archived jelző)"""
+
+    def iso(value):
+        return value.isoformat() if value is not None and not pd.isna(value) else None
+
+    def text(value):
+        return value if isinstance(value, str) else None
+
+    return {
+        "id": int(row["id"]),
+        "transaction_date": iso(row["transaction_date"]),
+        "booking_date": iso(row["booking_date"]),
+        "transaction_type": text(row["transaction_type"]),
+        "direction": text(row["direction"]),
+        "partner_name": text(row["partner_name"]),
+        "partner_account": text(row["partner_account"]),
+        "expense_category": text(row["expense_category"]),
+        "description": text(row["description"]),
+        "account_name": text(row["account_name"]),
+        "account_number": text(row["account_number"]),
+        "amount": float(row["amount"]) if row["amount"] is not None else 0.0,
+        "currency": text(row["currency"]),
+        "category_id": (
+            int(row["category_id"]) if not pd.isna(row["category_id"]) else None
+        ),
+        "created_at": iso(row["created_at"]),
+        "updated_at": iso(row["updated_at"]),
+        "archived": True,
+    }
+
+
+def latest_archived(limit: int) -> List[Dict[str, Any]]:
+    """A legújabb limit darab archivált tranzakció (dátum, id szerint csökkenő)"""
+    rows = []
+    for frame in iter_archived():
+        rows.extend(frame.head(limit - len(rows)).to_dict("records"))
+        if len(rows) >= limit:
+            break
+    return [row_to_dict(row) for row in rows]
+
+
+def search_archived(
+    query: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    category_id: Optional[int] = None,
+    limit: int = 100,
+) -> List[Dict[str, Any]]:
+    """Keresés partner névben / közleményben (kis-nagybetű független részstring)"""
+    frame = read_archived(date_from, date_to, category_id=category_id)
+    if query:
+        needle = query.upper()
+        mask = frame["partner_name"].fillna("").str.upper().str.contains(
+            needle, regex=False
+        ) | frame["description"].fillna("").str.upper().str.contains(
+            needle, regex=False
+        )
+        frame = frame[mask]
+    frame = frame.sort_values(
+        ["transaction_date", "id"], ascending=False, kind="stable"
+    ).head(limit)
+    return [row_to_dict(row) for row in frame.to_dict("records")]
+
+
+def archived_net_by_currency(
+    account_number: str, before: Optional[date] = None
+) -> Dict[str, float]:
+    """Számla archivált tételeinek előjeles összege devizánként (nyitó egyenleghez)"""
+    if not has_archive():
+        return {}
+    frame = read_archived(
+        date_to=before - timedelta(days=1) if before else None,
+        columns=["account_number", "direction", "amount", "currency"],
+    )
+    frame = frame[frame["account_number"] == account_number]
+    if frame.empty:
+        return {}
+    absolute = frame["amount"].astype(float).abs()
+    signed = absolute.where(frame["direction"] == "Bejövő", -absolute)
+    return {
+        currency: float(total)
+        for currency, total in signed.groupby(frame["currency"]).sum().items()
+    }
+
+
+def archived_category_counts(category_ids: Iterable[int]) -> Dict[int, int]:
+    """Archivált tranzakciók száma kategóriánként (csak a nem nulla darabszámúak)"""
+    category_ids = set(category_ids)
+    if not category_ids or not has_archive():
+        return {}
+    counts = read_archived(columns=["category_id"])["category_id"].value_counts()
+    return {
+        int(category_id): int(count)
+        for category_id, count in counts.items()
+        if category_id in category_ids
+    }
+
+
+@contextmanager
+def category_remap(db: Session, mapping: Dict[int, Optional[int]]) -> Iterator[None]:
+    """
+    Kategória törlés / összevonás az archivált sorokra (old_id -> new_id, None =
+    kategorizálatlan). A Parquet fájlok nem íródnak újra: az érintett fájlok
+    manifest bejegyzése kapja az átszámozást, amit a read_archived alkalmaz; a
+    később archivált fájlokat (esetleg újra kiosztott id-vel) nem érinti.
+    A blokkon belül kell commitolni; hiba esetén a manifest visszaáll.
+    """
+    old_manifest = load_manifest()
+    files = []
+    changed = False
+    for entry in old_manifest["files"]:
+        present = set(
+            read_archived(columns=["category_id"], files=[entry])["category_id"]
+            .dropna()
+            .astype(int)
+        )
+        if not present & set(mapping):
+            files.append(entry)
+            continue
+
+        remap = _entry_remap(entry)
+        for old_id, new_id in mapping.items():
+            for source, target in remap.items():
+                if target == old_id:
+                    remap[source] = new_id
+            remap.setdefault(old_id, new_id)
+        files.append(
+            {**entry, "category_remap": [[s, t] for s, t in sorted(remap.items())]}
+        )
+        changed = True
+
+    if not changed:
+        yield
+        return
+
+    # Más processzek cache-ei is érvényüket vesztik (archivált sorok változtak)
+    reference_data.bump_version(db, reference_data.TRANSACTIONS)
+    save_manifest({**old_manifest, "files": files})
+    try:
+        yield
+    except Exception:
+        save_manifest(old_manifest)
+        raise
+
+
+def find_archived_fingerprints(
+    fingerprint_dates: Iterable[Tuple[str, Any]],
+) -> Dict[str, int]:
+    """
+    Archivált tranzakciók fingerprint alapján (duplikáció szűréshez).
+    Csak a keresett dátumok hónapjait tartalmazó fájlokat olvassa.
+    """
+    if not has_archive():
+        return {}
+
+    fingerprints = set()
+    months = set()
+    for fingerprint, transaction_date in fingerprint_dates:
+        fingerprints.add(fingerprint)
+        day = _to_date(transaction_date)
+        months.add((day.year, day.month))
+
+    files = [e for e in load_manifest()["files"] if (e["year"], e["month"]) in months]
+    if not files:
+        return {}
+
+    dataset = ds.dataset(
+        [os.path.join(ARCHIVE_DIR, entry["path"]) for entry in files],
+        schema=ARCHIVE_SCHEMA,
+        format="parquet",
+    )
+    table = dataset.to_table(
+        columns=["fingerprint", "id"],
+        filter=ds.field("fingerprint").isin(list(fingerprints)),
+    )
+    return dict(zip(table["fingerprint"].to_pylist(), table["id"].to_pylist()))
+
+
+# --- Archiválás ---
+
+
+def _batch_frame(rows: List[Any]) -> pa.Table:
+    frame = pd.DataFrame(rows, columns=ARCHIVE_COLUMNS)
+    return pa.Table.from_pandas(frame, schema=ARCHIVE_SCHEMA, preserve_index=False)
+
+
+def archive_transactions(
+    db: Session,
+    cutoff: date,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    dry_run: bool = False,
+) -> Dict[str, Any]:
+    """
+    A cutoff előtti tranzakciók áthelyezése havi partíciójú, zstd tömörített
+    Parquet fájlokba. Folyamat:
+    1. batch-enként olvasás (dátum, id keyset), havonta egy új part fájl
+    2. a kiírt id-k törlése a transactions táblából (még commit nélkül)
+    3. manifest frissítése, majd commit - hiba esetén a fájlok és a manifest
+       visszaállnak, a DB tranzakció rollback-el.
+    """
+    columns = [getattr(Transaction, name) for name in ARCHIVE_COLUMNS]
+    old_manifest = load_manifest()
+    run_id = f"{datetime.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}"
+
+    new_files: List[Dict[str, Any]] = []
+    archived_ids: List[int] = []
+    writer = None
+    current: Optional[Dict[str, Any]] = None
+
+    def close_current():
+        nonlocal writer, current
+        if writer is not None:
+            writer.close()
+            new_files.append(current)
+        writer = None
+        current = None
+
+    try:
+        last_key = None
+        while True:
+            query = (
+                select(*columns)
+                .where(Transaction.transaction_date < cutoff)
+                .order_by(Transaction.transaction_date, Transaction.id)
+                .limit(batch_size)
+            )
+            if last_key is not None:
+                query = query.where(
+                    or_(
+                        Transaction.transaction_date > last_key[0],
+                        and_(
+                            Transaction.transaction_date == last_key[0],
+                            Transaction.id > last_key[1],
+                        ),
+                    )
+                )
+            rows = db.execute(query).all()
+            if not rows:
+                break
+            last_key = (rows[-1].transaction_date, rows[-1].id)
+            archived_ids.extend(row.id for row in rows)
+            if dry_run:
+                continue
+
+            table = _batch_frame(rows)
+            frame = table.select(["transaction_date", "id"]).to_pandas()
+            months = pd.to_datetime(frame["transaction_date"]).dt.to_period("M")
+
+            # Dátum szerint rendezett: egy batch néhány egymást követő hónapot fed le
+            for month in months.unique():
+                mask = (months == month).to_numpy()
+                part = table.filter(pa.array(mask))
+                part_dates = frame.loc[mask, "transaction_date"]
+                part_ids = frame.loc[mask, "id"]
+
+                if current is None or (current["year"], current["month"]) != (
+                    month.year,
+                    month.month,
+                ):
+                    close_current()
+                    relative_path = os.path.join(
+                        "transactions",
+                        f"year={month.year}",
+                        f"month={month.month:02d}",
+                        f"part-{run_id}.parquet",
+                    )
+                    full_path = os.path.join(ARCHIVE_DIR, relative_path)
+                    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                    writer = pq.ParquetWriter(
+                        full_path, ARCHIVE_SCHEMA, compression=COMPRESSION
+                    )
+                    current = {
+                        "path": relative_path,
+                        "year": int(month.year),
+                        "month": int(month.month),
+                        "rows": 0,
+                        "min_date": part_dates.min().isoformat(),
+                        "max_date": part_dates.max().isoformat(),
+                        "min_id": int(part_ids.min()),
+                        "max_id": int(part_ids.max()),
+                        "created_at": datetime.now().isoformat(timespec="seconds"),
+                    }
+
+                writer.write_table(part)
+                current["rows"] += part.num_rows
+                current["min_date"] = min(
+                    current["min_date"], part_dates.min().isoformat()
+                )
+                current["max_date"] = max(
+                    current["max_date"], part_dates.max().isoformat()
+                )
+                current["min_id"] = min(current["min_id"], int(part_ids.min()))
+                current["max_id"] = max(current["max_id"], int(part_ids.max()))
+        close_current()
+
+        result = {
+            "cutoff": cutoff.isoformat(),
+            "dry_run": dry_run,
+            "archived_count": len(archived_ids),
+            "files": [entry["path"] for entry in new_files],
+        }
+        if dry_run or not archived_ids:
+            return result
+
+        for start in range(0, len(archived_ids), DELETE_CHUNK_SIZE):
+            db.execute(
+                delete(Transaction)
+                .where(
+                    Transaction.id.in_(archived_ids[start : start + DELETE_CHUNK_SIZE])
+                )
+                .execution_options(synchronize_session=False)
+            )
+        change_feed.record(db, archived_ids=archived_ids)
+
+        save_manifest(
+            {
+                "version": 1,
+                "archived_before": max(
+                    old_manifest.get("archived_before") or "", cutoff.isoformat()
+                ),
+                "files": old_manifest["files"] + new_files,
+            }
+        )
+        try:
+            db.commit()
+        except Exception:
+            save_manifest(old_manifest)
+            raise
+        return result
+
+    except Exception:
+        db.rollback()
+        if writer is not None:
+            writer.close()
+            new_files.append(current)
+        for entry in new_files:
+            try:
+                os.remove(os.path.join(ARCHIVE_DIR, entry["path"]))
+            except OSError:
+                pass
+        raise
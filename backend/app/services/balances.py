@@ -0,0 +1,264 @@
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+from sqlalchemy import case, extract, func, select
+from sqlalchemy.orm import Session
+
+from app.database import database
+from app.database.models import Transaction
+from app.services import archive, ledger_events
+
+BALANCE_INTERVALS = ("day", "month")
+
+# LRU: (számla, bontás, időszak, adatverzió, archív manifest) -> kész idősor
+BALANCE_CACHE_SIZE = 128
+
+_cache: "OrderedDict[Tuple, List[Dict[str, Any]]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def signed_amount():
+    """Előjeles összeg az irány alapján (a bank export előjele nem mindig megbízható)"""
+    return case(
+        (Transaction.direction == "Bejövő", func.abs(Transaction.amount)),
+        else_=-func.abs(Transaction.amount),
+    )
+
+
+def opening_balances(
+    db: Session, account_number: str, before: date
+) -> Dict[str, float]:
+    """Devizánkénti nyitó egyenleg: a before előtti tételek összege"""
+    rows = db.execute(
+        select(Transaction.currency, func.sum(signed_amount()))
+        .where(
+            Transaction.account_number == account_number,
+            Transaction.transaction_date < before,
+        )
+        .group_by(Transaction.currency)
+    ).all()
+    return {currency: float(total or 0) for currency, total in rows}
+
+
+def archived_flows(
+    account_number: str,
+    interval: str,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+) -> Dict[Tuple, Dict[str, float]]:
+    """Archivált tételek időszakonként és devizánként: (időszak, deviza) -> összegek"""
+    if not archive.has_archive():
+        return {}
+    frame = archive.read_archived(
+        date_from,
+        date_to,
+        columns=[
+            "transaction_date",
+            "account_number",
+            "direction",
+            "amount",
+            "currency",
+        ],
+    )
+    frame = frame[frame["account_number"] == account_number]
+    if frame.empty:
+        return {}
+
+    absolute = frame["amount"].astype(float).abs()
+    incoming = frame["direction"] == "Bejövő"
+    if interval == "month":
+        dates = pd.to_datetime(frame["transaction_date"])
+        periods = [
+            (int(year), int(month))
+            for year, month in zip(dates.dt.year, dates.dt.month)
+        ]
+    else:
+        periods = [(day,) for day in frame["transaction_date"]]
+    work = pd.DataFrame(
+        {
+            "period": periods,
+            "currency": frame["currency"].fillna(""),
+            "inflow": absolute.where(incoming, 0.0),
+            "outflow": absolute.where(frame["direction"] == "Kimenő", 0.0),
+            "net": absolute.where(incoming, -absolute),
+            "transaction_count": 1,
+        }
+    )
+    grouped = work.groupby(["period", "currency"], sort=False).sum()
+    return {
+        (period, currency or None): row
+        for (period, currency), row in grouped.to_dict("index").items()
+    }
+
+
+def compute_balance_series(
+    db: Session,
+    account_number: str,
+    interval: str = "day",
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Időszakonkénti be- / kifizetés és futó egyenleg egyetlen lekérdezéssel:
+    GROUP BY időszak + SUM(SUM(...)) OVER (PARTITION BY deviza ORDER BY időszak).
+    Az egyenleg az első rögzített tételtől számolt összeg; az archivált tételek
+    a tartomány előtt a nyitó egyenlegben, a tartományon belül az idősorban
+    szerepelnek (ilyenkor a futó egyenleg Pythonban számolódik újra).
+    """
+    inflow = func.sum(
+        case((Transaction.direction == "Bejövő", func.abs(Transaction.amount)), else_=0)
+    )
+    outflow = func.sum(
+        case((Transaction.direction == "Kimenő", func.abs(Transaction.amount)), else_=0)
+    )
+    net = func.sum(signed_amount())
+
+    if interval == "month":
+        year = extract("year", Transaction.transaction_date)
+        month = extract("month", Transaction.transaction_date)
+        period_columns = [year.label("year"), month.label("month")]
+        group_columns = [year, month]
+    else:
+        period_columns = [Transaction.transaction_date.label("date")]
+        group_columns = [Transaction.transaction_date]
+
+    running = func.sum(net).over(
+        partition_by=Transaction.currency, order_by=group_columns
+    )
+
+    query = (
+        select(
+            *period_columns,
+            Transaction.currency,
+            inflow.label("inflow"),
+            outflow.label("outflow"),
+            net.label("net"),
+            running.label("running_net"),
+            func.count().label("transaction_count"),
+        )
+        .where(Transaction.account_number == account_number)
+        .group_by(*group_columns, Transaction.currency)
+        .order_by(Transaction.currency, *group_columns)
+    )
+    if date_from:
+        query = query.where(Transaction.transaction_date >= date_from)
+    if date_to:
+        query = query.where(Transaction.transaction_date <= date_to)
+
+    # Szűrt időszaknál a korábbi tételek összege a kiinduló egyenleg
+    openings = opening_balances(db, account_number, date_from) if date_from else {}
+    # Archivált (régi) tételek: a tartomány előttiek a nyitó egyenlegbe kerülnek
+    if date_from:
+        for currency, total in archive.archived_net_by_currency(
+            account_number, date_from
+        ).items():
+            openings[currency] = openings.get(currency, 0.0) + total
+    archived = archived_flows(account_number, interval, date_from, date_to)
+
+    rows = {}
+    for row in db.execute(query).mappings():
+        if interval == "month":
+            period = (int(row["year"]), int(row["month"]))
+        else:
+            period = (row["date"],)
+        rows[(period, row["currency"])] = {
+            "transaction_count": int(row["transaction_count"]),
+            "inflow": float(row["inflow"] or 0),
+            "outflow": float(row["outflow"] or 0),
+            "net": float(row["net"] or 0),
+            "balance": openings.get(row["currency"], 0.0)
+            + float(row["running_net"] or 0),
+        }
+
+    if archived:
+        for key, flows in archived.items():
+            row = rows.setdefault(
+                key,
+                {"transaction_count": 0, "inflow": 0.0, "outflow": 0.0, "net": 0.0},
+            )
+            row["transaction_count"] += int(flows["transaction_count"])
+            for name in ("inflow", "outflow", "net"):
+                row[name] += float(flows[name])
+        # Futó egyenleg újraszámolása az összefésült időszakokra
+        rows = dict(
+            sorted(rows.items(), key=lambda item: (item[0][1] or "", item[0][0]))
+        )
+        balances = dict(openings)
+        for (period, currency), row in rows.items():
+            balances[currency] = balances.get(currency, 0.0) + row["net"]
+            row["balance"] = balances[currency]
+
+    series = []
+    for (period, currency), row in rows.items():
+        if interval == "month":
+            period_fields = {"year": period[0], "month": period[1]}
+        else:
+            period_fields = {"date": period[0].isoformat()}
+        series.append({**period_fields, "currency": currency, **row})
+    return series
+
+
+def get_balance_series(
+    db: Session,
+    account_number: str,
+    interval: str = "day",
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+) -> List[Dict[str, Any]]:
+    """Futó egyenleg idősor LRU cache-ből; adatváltozáskor (új adatverzió) újraszámol"""
+    key = (
+        account_number,
+        interval,
+        date_from,
+        date_to,
+        ledger_events.data_version(db),
+        archive.manifest_revision(),
+    )
+
+    with _cache_lock:
+        series = _cache.get(key)
+        if series is not None:
+            _cache.move_to_end(key)
+            return series
+
+    series = compute_balance_series(db, account_number, interval, date_from, date_to)
+    if database.is_replica(db):
+        return series
+
+    with _cache_lock:
+        _cache[key] = series
+        _cache.move_to_end(key)
+        while len(_cache) > BALANCE_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return series
+
+
+def list_accounts(db: Session) -> List[Dict[str, Any]]:
+    """Számlák tételszámmal és időtartománnyal (egyenleg lekérdezéshez)"""
+    rows = db.execute(
+        select(
+            Transaction.account_number,
+            func.max(Transaction.account_name).label("account_name"),
+            Transaction.currency,
+            func.count().label("transaction_count"),
+            func.min(Transaction.transaction_date).label("first_date"),
+            func.max(Transaction.transaction_date).label("last_date"),
+        )
+        .where(Transaction.account_number.isnot(None))
+        .group_by(Transaction.account_number, Transaction.currency)
+        .order_by(Transaction.account_number, Transaction.currency)
+    ).mappings()
+    return [
+        {
+            "account_number": row["account_number"],
+            "account_name": row["account_name"],
+            "currency": row["currency"],
+            "transaction_count": int(row["transaction_count"]),
+            "first_date": row["first_date"].isoformat(),
+            "last_date": row["last_date"].isoformat(),
+        }
+        for row in rows
+    ]
@@ -0,0 +1,284 @@
+import calendar
+from datetime import date
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+from sqlalchemy import case, delete, extract, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.database.models import Budget, BudgetTotal, Category, Transaction
+from app.services import archive, ledger_cache
+from app.services.fx import amount_in_base_currency, get_rate
+from app.services.upserts import upsert_increment
+
+BUDGET_PERIODS = ("monthly", "yearly")
+
+ID_CHUNK_SIZE = 1000
+
+# Havi összeg változások: (category_id, év, hónap) -> (költés delta HUF, darab delta)
+Deltas = Dict[Tuple[int, int, int], Tuple[Decimal, int]]
+
+
+def spent_amount(
+    db: Session,
+    direction: str,
+    currency: Optional[str],
+    amount: Decimal,
+    on_date: date,
+) -> Optional[Decimal]:
+    """Költés HUF-ban: kimenő tétel növeli, bejövő (pl. visszatérítés) csökkenti"""
+    rate = get_rate(db, currency or "HUF", on_date)
+    if rate is None:
+        return None
+    value = abs(Decimal(amount)) * Decimal(rate)
+    return value if direction == "Kimenő" else -value
+
+
+def load_rows(db: Session, transaction_ids: List[int]) -> List[Any]:
+    """Keret számításhoz szükséges oszlopok id lista alapján (chunk-olva)"""
+    rows = []
+    for start in range(0, len(transaction_ids), ID_CHUNK_SIZE):
+        rows.extend(
+            db.execute(
+                select(
+                    Transaction.id,
+                    Transaction.category_id,
+                    Transaction.transaction_date,
+                    Transaction.direction,
+                    Transaction.currency,
+                    Transaction.amount,
+                ).where(
+                    Transaction.id.in_(transaction_ids[start : start + ID_CHUNK_SIZE])
+                )
+            ).all()
+        )
+    return rows
+
+
+def _collect(
+    db: Session,
+    deltas: Deltas,
+    rows: Iterable[Any],
+    sign: int,
+    category_id: Optional[int] = None,
+    override: bool = False,
+) -> None:
+    for row in rows:
+        target_id = category_id if override else row.category_id
+        if target_id is None:
+            continue
+        value = spent_amount(
+            db, row.direction, row.currency, row.amount, row.transaction_date
+        )
+        key = (
+            target_id,
+            row.transaction_date.year,
+            row.transaction_date.month,
+        )
+        spent, count = deltas.get(key, (Decimal(0), 0))
+        deltas[key] = (spent + sign * (value or 0), count + sign)
+
+
+def _apply(db: Session, deltas: Deltas) -> None:
+    """Delták írása atomi upsert-tel: spent = spent + delta, nem létező sornál INSERT"""
+    for (category_id, year, month), (spent, count) in deltas.items():
+        if not spent and not count:
+            continue
+        upsert_increment(
+            db,
+            BudgetTotal.__table__,
+            keys={"category_id": category_id, "year": year, "month": month},
+            increments={"spent": spent, "transaction_count": count},
+        )
+
+
+def record_transactions(db: Session, rows: Iterable[Any], sign: int = 1) -> None:
+    """
+    Új (sign=1) vagy törölt (sign=-1) tranzakciók hozzáadása a havi összesítőkhöz.
+    Commit előtt hívandó, így a tranzakció írással azonos DB tranzakcióban fut.
+    """
+    deltas: Deltas = {}
+    _collect(db, deltas, rows, sign)
+    _apply(db, deltas)
+
+
+def record_category_change(
+    db: Session, rows: Iterable[Any], new_category_id: Optional[int]
+) -> None:
+    """Átkategorizált tranzakciók: régi kategóriából levonás, újhoz hozzáadás"""
+    rows = [row for row in rows if row.category_id != new_category_id]
+    deltas: Deltas = {}
+    _collect(db, deltas, rows, -1)
+    _collect(db, deltas, rows, 1, category_id=new_category_id, override=True)
+    _apply(db, deltas)
+
+
+def move_category_totals(
+    db: Session, source_ids: List[int], target_id: Optional[int]
+) -> None:
+    """Kategória törlés / összevonás: a forrás kategóriák összesítői a célhoz kerülnek"""
+    if target_id is not None:
+        rows = db.execute(
+            select(
+                BudgetTotal.year,
+                BudgetTotal.month,
+                func.sum(BudgetTotal.spent),
+                func.sum(BudgetTotal.transaction_count),
+            )
+            .where(BudgetTotal.category_id.in_(source_ids))
+            .group_by(BudgetTotal.year, BudgetTotal.month)
+        ).all()
+        _apply(
+            db,
+            {
+                (target_id, year, month): (Decimal(spent or 0), int(count or 0))
+                for year, month, spent, count in rows
+            },
+        )
+    db.execute(delete(BudgetTotal).where(BudgetTotal.category_id.in_(source_ids)))
+
+
+def rebuild_totals(db: Session) -> int:
+    """
+    Összesítő tábla teljes újraépítése egy INSERT ... SELECT GROUP BY-jal
+    (első bevezetés vagy árfolyam betöltés után), az archivált hónapokkal együtt.
+    Commit a hívó feladata.
+    """
+    ledger = (
+        select(
+            Transaction.category_id,
+            Transaction.transaction_date,
+            case(
+                (
+                    Transaction.direction == "Kimenő",
+                    func.abs(amount_in_base_currency()),
+                ),
+                else_=-func.abs(amount_in_base_currency()),
+            ).label("spent"),
+        )
+        .where(Transaction.category_id.isnot(None))
+        .subquery()
+    )
+    year = extract("year", ledger.c.transaction_date)
+    month = extract("month", ledger.c.transaction_date)
+
+    db.execute(delete(BudgetTotal))
+    db.execute(
+        insert(BudgetTotal).from_select(
+            ["category_id", "year", "month", "spent", "transaction_count"],
+            select(
+                ledger.c.category_id,
+                year,
+                month,
+                func.coalesce(func.sum(ledger.c.spent), 0),
+                func.count(),
+            ).group_by(ledger.c.category_id, year, month),
+        )
+    )
+    _apply(db, _archived_deltas(db))
+    return db.execute(select(func.count()).select_from(BudgetTotal)).scalar()
+
+
+def _archived_deltas(db: Session) -> Deltas:
+    """Archivált tranzakciók havi összegei (az archiválás nem törli a keret történetet)"""
+    if not archive.has_archive():
+        return {}
+    frame = archive.read_archived(
+        columns=[column.key for column in ledger_cache.LOAD_COLUMNS]
+    )
+    frame = frame[frame["category_id"].notna()]
+    if frame.empty:
+        return {}
+
+    compact = ledger_cache.compact_frame(db, frame)
+    absolute = compact["amount_huf"].abs().fillna(0.0)
+    dates = pd.to_datetime(frame["transaction_date"].to_numpy())
+    work = pd.DataFrame(
+        {
+            "category_id": compact["category_id"].to_numpy(),
+            "year": dates.year,
+            "month": dates.month,
+            "spent": absolute.where(compact["direction"] == "Kimenő", -absolute),
+        }
+    )
+    grouped = work.groupby(["category_id", "year", "month"])["spent"].agg(
+        ["sum", "size"]
+    )
+    return {
+        (int(category_id), int(year), int(month)): (
+            Decimal(str(round(spent, 2))),
+            int(count),
+        )
+        for (category_id, year, month), (spent, count) in grouped.iterrows()
+    }
+
+
+def period_bounds(period: str, on_date: date) -> Tuple[date, date]:
+    if period == "monthly":
+        last_day = calendar.monthrange(on_date.year, on_date.month)[1]
+        return on_date.replace(day=1), on_date.replace(day=last_day)
+    return date(on_date.year, 1, 1), date(on_date.year, 12, 31)
+
+
+def budget_status(db: Session, on_date: date) -> List[Dict[str, Any]]:
+    """
+    Keretek állása az on_date-et tartalmazó időszakra.
+    Csak az előszámolt havi összesítőket olvassa (kategóriánként max. 12 sor).
+    """
+    budgets = db.execute(
+        select(Budget, Category.name)
+        .join(Category, Budget.category_id == Category.id)
+        .order_by(Category.name, Budget.period)
+    ).all()
+    if not budgets:
+        return []
+
+    totals = db.execute(
+        select(
+            BudgetTotal.category_id,
+            BudgetTotal.month,
+            BudgetTotal.spent,
+            BudgetTotal.transaction_count,
+        ).where(
+            BudgetTotal.year == on_date.year,
+            BudgetTotal.category_id.in_({budget.category_id for budget, _ in budgets}),
+        )
+    ).all()
+
+    results = []
+    for budget, category_name in budgets:
+        start, end = period_bounds(budget.period, on_date)
+        spent = Decimal(0)
+        count = 0
+        for category_id, month, month_spent, month_count in totals:
+            if category_id == budget.category_id and (
+                budget.period == "yearly" or month == on_date.month
+            ):
+                spent += Decimal(month_spent or 0)
+                count += month_count or 0
+
+        limit = Decimal(budget.amount)
+        elapsed_days = (min(on_date, end) - start).days + 1
+        total_days = (end - start).days + 1
+        # Lineáris előrevetítés az időszak végére az eddigi költési ütem alapján
+        projected = spent * total_days / elapsed_days
+
+        results.append(
+            {
+                "budget_id": budget.id,
+                "category_id": budget.category_id,
+                "category_name": category_name,
+                "period": budget.period,
+                "period_start": start.isoformat(),
+                "period_end": end.isoformat(),
+                "amount": float(limit),
+                "spent": float(spent),
+                "remaining": float(limit - spent),
+                "used_percent": round(float(spent / limit * 100), 1) if limit else None,
+                "transaction_count": count,
+                "projected": round(float(projected), 2),
+                "projected_overshoot": round(float(max(projected - limit, 0)), 2),
+            }
+        )
+    return results
@@ -0,0 +1,155 @@
+from datetime import date
+from typing import Any, Dict, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.database.models import Category, CategoryKeyword, Transaction
+from app.services import budgets, change_feed, reference_data
+from app.services.rule_engine import (
+    RULE_FIELDS,
+    Rule,
+    RuleEngine,
+    normalize_pattern,
+)
+
+# MSSQL legfeljebb 2100 paramétert enged egy utasításban
+MAX_BATCH_SIZE = 2000
+
+RECATEGORIZE_SCOPES = ("uncategorized", "date_range", "all")
+
+
+def load_rule_engine(db: Session) -> RuleEngine:
+    """Összes kategorizáló szabály betöltése egyetlen JOIN lekérdezéssel és lefordítása"""
+    rows = db.execute(
+        select(CategoryKeyword, Category.name, Category.type)
+        .join(Category, CategoryKeyword.category_id == Category.id)
+        .order_by(CategoryKeyword.id)
+    ).all()
+
+    return RuleEngine(
+        Rule(
+            id=keyword.id,
+            category={
+                "id": keyword.category_id,
+                "name": name,
+                "type": category_type,
+            },
+            pattern=normalize_pattern(
+                keyword.field or "partner_name",
+                keyword.match_type or "substring",
+                keyword.keyword,
+            ),
+            field=keyword.field or "partner_name",
+            match_type=keyword.match_type or "substring",
+            direction=keyword.direction,
+            min_amount=keyword.min_amount,
+            max_amount=keyword.max_amount,
+            priority=keyword.priority or 0,
+        )
+        for keyword, name, category_type in rows
+    )
+
+
+def get_rule_engine(db: Session) -> RuleEngine:
+    """Lefordított szabálymotor a referencia cache-ből (csak szabályváltozáskor épül újra)"""
+    return reference_data.cache.get(db, "rule_engine", load_rule_engine)
+
+
+def recategorize_transactions(
+    db: Session,
+    scope: str = "uncategorized",
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    dry_run: bool = False,
+    batch_size: int = 1000,
+) -> Dict[str, Any]:
+    """
+    Meglévő tranzakciók újrakategorizálása az aktuális szabályokkal.
+    Keyset pagination (id szerint) - a tábla sosem kerül egyszerre memóriába,
+    batch-enként kategóriánként egy UPDATE fut. Csak találat esetén ír felül,
+    a szabállyal nem egyező tranzakciók kategóriája változatlan marad.
+    """
+    rule_engine = get_rule_engine(db)
+    category_names = {
+        category_id: category["name"]
+        for category_id, category in reference_data.get_categories_by_id(db).items()
+    }
+
+    base_query = select(
+        Transaction.id,
+        Transaction.category_id,
+        Transaction.transaction_date,
+        Transaction.direction,
+        Transaction.currency,
+        Transaction.amount,
+        *(getattr(Transaction, field) for field in RULE_FIELDS),
+    ).order_by(Transaction.id)
+
+    if scope == "uncategorized":
+        base_query = base_query.where(Transaction.category_id.is_(None))
+    if date_from:
+        base_query = base_query.where(Transaction.transaction_date >= date_from)
+    if date_to:
+        base_query = base_query.where(Transaction.transaction_date <= date_to)
+
+    scanned = 0
+    matched = 0
+    changes_per_category: Dict[int, int] = {}
+    last_id = 0
+
+    while True:
+        rows = db.execute(
+            base_query.where(Transaction.id > last_id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        last_id = rows[-1].id
+        scanned += len(rows)
+
+        # Batch-en belüli változások kategóriánként csoportosítva
+        batch_changes: Dict[int, list] = {}
+        for row in rows:
+            found_category = rule_engine.categorize(row._mapping)
+            if not found_category:
+                continue
+            matched += 1
+            if found_category["id"] != row.category_id:
+                batch_changes.setdefault(found_category["id"], []).append(row)
+
+        for category_id, changed_rows in batch_changes.items():
+            changes_per_category[category_id] = changes_per_category.get(
+                category_id, 0
+            ) + len(changed_rows)
+            if not dry_run:
+                ids = [row.id for row in changed_rows]
+                # Keret összesítők ugyanabban a DB tranzakcióban
+                budgets.record_category_change(db, changed_rows, category_id)
+                change_feed.record(db, upserted_ids=ids)
+                db.execute(
+                    update(Transaction)
+                    .where(Transaction.id.in_(ids))
+                    .values(category_id=category_id)
+                    .execution_options(synchronize_session=False)
+                )
+
+        if not dry_run:
+            # Batch-enkénti commit, hogy a hosszú futás ne tartson zárolásokat
+            db.commit()
+
+    return {
+        "scope": scope,
+        "dry_run": dry_run,
+        "scanned_count": scanned,
+        "matched_count": matched,
+        "changed_count": sum(changes_per_category.values()),
+        "categories": [
+            {
+                "category_id": category_id,
+                "category_name": category_names.get(category_id),
+                "count": count,
+            }
+            for category_id, count in sorted(changes_per_category.items())
+        ],
+    }
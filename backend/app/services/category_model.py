@@ -0,0 +1,433 @@
+import logging
+import os
+import tempfile
+import threading
+import zlib
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.database import database
+from app.database.models import Transaction
+from app.services import change_feed, ledger_events
+
+MODEL_PATH = os.getenv("CATEGORY_MODEL_PATH", "data/models/category_model.npz")
+
+# Hash-elt karakter n-gram feature tér (2^16 oszlop, float32 -> ~256KB / kategória)
+N_FEATURES = 2**16
+NGRAM_SIZE = 3
+ALPHA = 0.1  # Laplace simítás
+
+# Ez alatti bizonyosságnál nem javasolunk kategóriát
+MIN_CONFIDENCE = float(os.getenv("CATEGORY_MODEL_MIN_CONFIDENCE", "0.6"))
+
+TRAIN_BATCH_SIZE = 5000
+# IN lista mérete a változott tranzakciók betöltésénél (MSSQL: max 2100 paraméter)
+LOAD_CHUNK_SIZE = 1000
+
+DIRECTION_TYPES = {"Bejövő": "income", "Kimenő": "expense"}
+
+logger = logging.getLogger(__name__)
+
+
+def extract_features(
+    partner_name: Optional[str], description: Optional[str]
+) -> List[int]:
+    """Partner név + közlemény karakter 3-gramjai hash-elve (0. feature: bias)"""
+    text = f" {(partner_name or '').strip().upper()} | {(description or '').strip().upper()} "
+    features = [0]
+    for start in range(len(text) - NGRAM_SIZE + 1):
+        ngram = text[start : start + NGRAM_SIZE]
+        features.append(zlib.crc32(ngram.encode("utf-8")) & (N_FEATURES - 1))
+    return features
+
+
+class NaiveBayesSuggester:
+    """Multinomial naive Bayes hash-elt n-gramokon, inkrementálisan tanítható"""
+
+    def __init__(self):
+        self.category_ids = np.zeros(0, dtype=np.int64)
+        self.feature_counts = np.zeros((0, N_FEATURES), dtype=np.float32)
+        self.class_counts = np.zeros(0, dtype=np.float64)
+        # Inkrementális tanítás vízjele: a change feed utoljára feldolgozott seq-je
+        # (None: még nem volt teljes tanítás, pl. régi formátumú modell fájl)
+        self.watermark_seq: Optional[int] = None
+        self.trained_rows = 0
+        self._log_probs = None
+
+    def copy(self) -> "NaiveBayesSuggester":
+        """Másolat tanításhoz (a kiszolgált modell közben változatlan marad)"""
+        model = NaiveBayesSuggester()
+        model.category_ids = self.category_ids.copy()
+        model.feature_counts = self.feature_counts.copy()
+        model.class_counts = self.class_counts.copy()
+        model.watermark_seq = self.watermark_seq
+        model.trained_rows = self.trained_rows
+        return model
+
+    @property
+    def is_trained(self) -> bool:
+        return len(self.category_ids) > 1 and self.trained_rows > 0
+
+    def _class_indexes(self, category_ids: Sequence[int]) -> np.ndarray:
+        new_ids = sorted(set(category_ids) - set(self.category_ids.tolist()))
+        if new_ids:
+            self.category_ids = np.concatenate(
+                [self.category_ids, np.array(new_ids, dtype=np.int64)]
+            )
+            self.feature_counts = np.vstack(
+                [
+                    self.feature_counts,
+                    np.zeros((len(new_ids), N_FEATURES), dtype=np.float32),
+                ]
+            )
+            self.class_counts = np.concatenate(
+                [self.class_counts, np.zeros(len(new_ids))]
+            )
+        lookup = {cid: i for i, cid in enumerate(self.category_ids.tolist())}
+        return np.array([lookup[cid] for cid in category_ids], dtype=np.int64)
+
+    def partial_fit(
+        self, category_ids: Sequence[int], feature_lists: Sequence[List[int]]
+    ) -> None:
+        """Számlálók növelése egy batch címkézett soron (vektorizált bincount)"""
+        if not category_ids:
+            return
+        class_indexes = self._class_indexes(category_ids)
+        lengths = np.fromiter((len(f) for f in feature_lists), dtype=np.int64)
+        flat_features = np.fromiter(
+            (f for features in feature_lists for f in features),
+            dtype=np.int64,
+            count=int(lengths.sum()),
+        )
+        flat_cells = np.repeat(class_indexes, lengths) * N_FEATURES + flat_features
+        self.feature_counts += np.bincount(
+            flat_cells, minlength=self.feature_counts.size
+        ).reshape(self.feature_counts.shape)
+        self.class_counts += np.bincount(
+            class_indexes, minlength=len(self.class_counts)
+        )
+        self.trained_rows += len(category_ids)
+        self._log_probs = None
+
+    def _model_log_probs(self) -> Tuple[np.ndarray, np.ndarray]:
+        if self._log_probs is None:
+            smoothed = self.feature_counts + ALPHA
+            feature_log_probs = np.log(smoothed) - np.log(
+                smoothed.sum(axis=1, keepdims=True)
+            )
+            class_log_priors = np.log(self.class_counts + 1) - np.log(
+                self.class_counts.sum() + len(self.class_counts)
+            )
+            self._log_probs = (feature_log_probs.astype(np.float32), class_log_priors)
+        return self._log_probs
+
+    def predict(
+        self,
+        feature_lists: Sequence[List[int]],
+        allowed: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Egész batch pontozása egy vektorizált hívással:
+        gather (osztály x összes feature) + np.add.reduceat soronként.
+        allowed: opcionális (sorok x osztályok) bool maszk a megengedett kategóriákra.
+        Visszatérés: (kategória id-k, bizonyosság 0-1) soronként.
+        """
+        if not feature_lists or not self.is_trained:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+
+        feature_log_probs, class_log_priors = self._model_log_probs()
+
+        lengths = np.fromiter((len(f) for f in feature_lists), dtype=np.int64)
+        offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        flat_features = np.fromiter(
+            (f for features in feature_lists for f in features),
+            dtype=np.int64,
+            count=int(lengths.sum()),
+        )
+
+        scores = np.add.reduceat(feature_log_probs[:, flat_features], offsets, axis=1)
+        scores = scores.T + class_log_priors  # (sorok x osztályok)
+        if allowed is not None:
+            scores = np.where(allowed, scores, -np.inf)
+
+        # Softmax -> bizonyosság
+        row_max = scores.max(axis=1, keepdims=True)
+        probabilities = np.exp(scores - np.where(np.isfinite(row_max), row_max, 0))
+        totals = probabilities.sum(axis=1, keepdims=True)
+        probabilities = np.divide(
+            probabilities, totals, out=np.zeros_like(probabilities), where=totals > 0
+        )
+
+        best = probabilities.argmax(axis=1)
+        return self.category_ids[best], probabilities[np.arange(len(best)), best]
+
+    def save(self, path: str = MODEL_PATH) -> None:
+        """Atomikus mentés (egyedi ideiglenes fájl ugyanabban a könyvtárban + átnevezés)"""
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            dir=directory, suffix=".tmp.npz", delete=False
+        ) as tmp_file:
+            try:
+                np.savez_compressed(
+                    tmp_file,
+                    category_ids=self.category_ids,
+                    feature_counts=self.feature_counts,
+                    class_counts=self.class_counts,
+                    watermark_seq=np.array(
+                        -1 if self.watermark_seq is None else self.watermark_seq
+                    ),
+                    trained_rows=np.array(self.trained_rows),
+                )
+            except Exception:
+                tmp_file.close()
+                os.remove(tmp_file.name)
+                raise
+        os.replace(tmp_file.name, path)
+
+    @classmethod
+    def load(cls, path: str = MODEL_PATH) -> "NaiveBayesSuggester":
+        model = cls()
+        if not os.path.exists(path):
+            return model
+        with np.load(path) as data:
+            model.category_ids = data["category_ids"]
+            model.feature_counts = data["feature_counts"]
+            model.class_counts = data["class_counts"]
+            if "watermark_seq" in data and int(data["watermark_seq"]) >= 0:
+                model.watermark_seq = int(data["watermark_seq"])
+            model.trained_rows = int(data["trained_rows"])
+        return model
+
+
+# Kiszolgált modell: csak kész (betanított) példány cserélődik be, a tanítás
+# másolaton fut; a _model_lock a tanításokat sorosítja
+_model: Optional[NaiveBayesSuggester] = None
+_model_lock = threading.Lock()
+
+# Háttér tanítás állapota
+_worker: Optional[threading.Thread] = None
+_rerun: Optional[bool] = None  # None: nincs várakozó futás, különben full
+_schedule_lock = threading.Lock()
+
+
+def _train_full(db: Session) -> NaiveBayesSuggester:
+    """Tanítás nulláról az összes kategorizált tranzakción (id keyset, batch-enként)"""
+    model = NaiveBayesSuggester()
+    # A kurzor a beolvasás előtti letisztult pozíció: a közben történt változások
+    # az inkrementális tanításban jönnek (a settle ablakban változott sorok így
+    # egyszer kétszer is számolódhatnak - kisebb torzítás, mint a kimaradás)
+    model.watermark_seq = change_feed.settled_seq(db)
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(
+                Transaction.id,
+                Transaction.category_id,
+                Transaction.partner_name,
+                Transaction.description,
+            )
+            .where(Transaction.category_id.isnot(None), Transaction.id > last_id)
+            .order_by(Transaction.id)
+            .limit(TRAIN_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        model.partial_fit(
+            [row.category_id for row in rows],
+            [extract_features(row.partner_name, row.description) for row in rows],
+        )
+        last_id = rows[-1].id
+    return model
+
+
+def _train_incremental(db: Session, model: NaiveBayesSuggester) -> Optional[bool]:
+    """
+    A vízjel óta létrehozott / módosított tranzakciók címkéinek tanulása a change
+    feed alapján (seq hézag és settle szabály a feed szerint, így később
+    commitolt kisebb seq sem marad ki). Visszatérés: tanult-e; None, ha a feed
+    reset-et jelez (restore vagy a napló már nem ér vissza a vízjelig).
+    """
+    learned = False
+    while True:
+        feed = change_feed.changes_since(db, model.watermark_seq)
+        if feed["reset"]:
+            return None
+        ids = [
+            change.transaction_id
+            for change in feed["changes"]
+            if change.operation == change_feed.UPSERT
+        ]
+        for start in range(0, len(ids), LOAD_CHUNK_SIZE):
+            rows = db.execute(
+                select(
+                    Transaction.category_id,
+                    Transaction.partner_name,
+                    Transaction.description,
+                ).where(
+                    Transaction.id.in_(ids[start : start + LOAD_CHUNK_SIZE]),
+                    Transaction.category_id.isnot(None),
+                )
+            ).all()
+            if rows:
+                model.partial_fit(
+                    [row.category_id for row in rows],
+                    [
+                        extract_features(row.partner_name, row.description)
+                        for row in rows
+                    ],
+                )
+                learned = True
+
+        advanced = feed["next_since"] != model.watermark_seq
+        model.watermark_seq = feed["next_since"]
+        if not feed["has_more"] or not advanced:
+            return learned
+
+
+def train_model(db: Session, full: bool = False) -> NaiveBayesSuggester:
+    """
+    Tanítás a már kategorizált tranzakciókon. Inkrementális módban csak a change
+    feed vízjele óta létrehozott / módosított címkéket tanulja (friss seq
+    hézagnál a következő tanítás folytatja); átkategorizált soroknál a régi
+    címke száma megmarad, ezt a teljes újratanítás (full=True) takarítja el.
+    """
+    global _model
+
+    with _model_lock:
+        model = None
+        changed = True
+        if not full:
+            model = (_model or NaiveBayesSuggester.load()).copy()
+            if model.watermark_seq is None:
+                model = None
+            else:
+                changed = _train_incremental(db, model)
+                if changed is None:
+                    model = None
+        if model is None:
+            model = _train_full(db)
+            changed = True
+
+        if changed:
+            model.save()
+        with _schedule_lock:
+            _model = model
+        return model
+
+
+def _run_training(full: bool) -> None:
+    global _worker, _rerun
+    while True:
+        try:
+            with database.SessionLocal() as db:
+                train_model(db, full=full)
+        except Exception:
+            logger.exception("Category model training failed")
+        with _schedule_lock:
+            if _rerun is None:
+                _worker = None
+                return
+            full, _rerun = _rerun, None
+
+
+def schedule_training(full: bool = False) -> None:
+    """Háttér tanítás; futás közbeni újabb kérésnél még egyszer lefut"""
+    global _worker, _rerun
+    with _schedule_lock:
+        if _worker is not None:
+            _rerun = bool(_rerun) or full
+            return
+        _worker = threading.Thread(
+            target=_run_training,
+            args=(full,),
+            name="category-model-training",
+            daemon=True,
+        )
+        _worker.start()
+
+
+def get_model() -> NaiveBayesSuggester:
+    """
+    Kiszolgált modell memóriából (első híváskor lemezről) - a kérés nem tanít
+    és nem ír fájlt; a lemaradt címkéket a háttér tanítás pótolja.
+    """
+    global _model
+
+    model = _model
+    if model is None:
+        model = NaiveBayesSuggester.load()
+        with _schedule_lock:
+            if _model is None:
+                _model = model
+            model = _model
+        schedule_training()
+    return model
+
+
+def on_change(db: Session, change: ledger_events.LedgerChange) -> None:
+    """
+    Kategória változás után háttér tanítás: új / módosított címkék
+    inkrementálisan, kategória átsorolás (törlés / összevonás) és
+    újrakategorizálás után nulláról (a régi címkék számlálói is törlődnek)
+    """
+    if change.reassigned_categories or change.full_refresh:
+        schedule_training(full=True)
+    elif change.upserted_ids:
+        schedule_training()
+
+
+def suggest_categories(
+    db: Session,
+    transactions: List[Dict[str, Any]],
+    categories_by_id: Dict[int, Dict[str, Any]],
+) -> None:
+    """
+    Modell alapú javaslat azokra a sorokra, ahol a szabályok nem találtak kategóriát.
+    Egy vektorizált predict hívás az egész batch-re; a javaslat a
+    suggested_category mezőbe kerül confidence értékkel.
+    """
+    pending = [t for t in transactions if not t.get("suggested_category")]
+    if not pending:
+        return
+
+    model = get_model()
+    if not model.is_trained:
+        return
+
+    # Irány szerint csak a megfelelő típusú kategória javasolható
+    class_types = np.array(
+        [
+            categories_by_id.get(cid, {}).get("type")
+            for cid in model.category_ids.tolist()
+        ]
+    )
+    expected_types = np.array(
+        [DIRECTION_TYPES.get(t.get("direction")) for t in pending], dtype=object
+    )
+    allowed = (class_types[None, :] == expected_types[:, None]) | (
+        expected_types[:, None] == None  # noqa: E711  (ismeretlen irány)
+    )
+    allowed &= class_types[None, :] != None  # noqa: E711  (törölt kategória)
+
+    predicted_ids, confidences = model.predict(
+        [extract_features(t["partner_name"], t["description"]) for t in pending],
+        allowed=allowed,
+    )
+
+    for transaction, category_id, confidence in zip(
+        pending, predicted_ids.tolist(), confidences.tolist()
+    ):
+        category = categories_by_id.get(category_id)
+        if category and confidence >= MIN_CONFIDENCE:
+            transaction["suggested_category"] = {
+                **category,
+                "confidence": round(confidence, 4),
+            }
+            transaction["suggestion_source"] = "model"
+
+
+ledger_events.subscribe(on_change)
@@ -0,0 +1,197 @@
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import DateTime, String, event, func, insert, literal, select, update
+from sqlalchemy.orm import Session
+
+from app.database.models import Transaction, TransactionChange
+from app.services import reference_data
+
+# Változás típusok: upsert (létrehozás / módosítás), delete (tombstone),
+# archive (a hot táblából az archívumba került), reset (restore - teljes újraszinkron)
+UPSERT = "upsert"
+DELETE = "delete"
+ARCHIVE = "archive"
+RESET = "reset"
+
+MAX_PAGE_SIZE = 5000
+INSERT_CHUNK_SIZE = 1000
+
+# A seq a commit előtt kerül kiosztásra: egy friss hézag mögött még commitolatlan
+# változás lehet, ezért a feed ennyi ideig nem lép át rajta
+SETTLE_SECONDS = float(os.getenv("CHANGE_FEED_SETTLE_SECONDS", "5"))
+
+_PENDING_KEY = "pending_changes"
+
+# Közvetlenül (INSERT ... SELECT) írt change log sorok ideiglenes changed_at
+# értéke; commit előtt a tényleges időpontra frissül, így a settle szabály a
+# commit idejét látja, nem a (hosszú) tranzakció elejét
+_UNSETTLED_AT = datetime(9999, 12, 31)
+_WRITTEN_AFTER_KEY = "changes_written_after_seq"
+
+
+def record(
+    db: Session,
+    upserted_ids: Iterable[int] = (),
+    deleted_ids: Iterable[int] = (),
+    archived_ids: Iterable[int] = (),
+) -> None:
+    """
+    Változások regisztrálása a session DB tranzakciójához; a change log sorok a
+    commit előtt, ugyanabban a tranzakcióban íródnak (rollback esetén elvesznek).
+    """
+    pending = db.info.setdefault(_PENDING_KEY, [])
+    for operation, ids in (
+        (UPSERT, upserted_ids),
+        (DELETE, deleted_ids),
+        (ARCHIVE, archived_ids),
+    ):
+        pending.extend((int(transaction_id), operation) for transaction_id in ids)
+
+
+def record_category_reassignment(db: Session, category_ids: List[int]) -> None:
+    """
+    Az átállítandó kategóriák tranzakciói upsert-ként, egyetlen INSERT ... SELECT
+    utasítással (az id-k nem kerülnek a Pythonba). Az UPDATE előtt hívandó.
+    """
+    written_after = db.scalar(select(func.coalesce(func.max(TransactionChange.seq), 0)))
+    db.execute(
+        insert(TransactionChange).from_select(
+            ["transaction_id", "operation", "changed_at"],
+            select(
+                Transaction.id,
+                literal(UPSERT, String),
+                literal(_UNSETTLED_AT, DateTime),
+            ).where(Transaction.category_id.in_(category_ids)),
+        )
+    )
+    previous = db.info.get(_WRITTEN_AFTER_KEY)
+    db.info[_WRITTEN_AFTER_KEY] = (
+        written_after if previous is None else min(previous, written_after)
+    )
+
+
+def record_reset(db: Session) -> None:
+    """Teljes adatcsere (snapshot restore) - a kliensek újra szinkronizálnak"""
+    db.info.setdefault(_PENDING_KEY, []).append((None, RESET))
+
+
+@event.listens_for(Session, "before_commit")
+def _write_pending(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    written_after = session.info.pop(_WRITTEN_AFTER_KEY, None)
+    if not pending and written_after is None:
+        return
+    changed_at = datetime.now()
+    if written_after is not None:
+        session.execute(
+            update(TransactionChange)
+            .where(
+                TransactionChange.seq > written_after,
+                TransactionChange.changed_at == _UNSETTLED_AT,
+            )
+            .values(changed_at=changed_at)
+            .execution_options(synchronize_session=False)
+        )
+    rows = [
+        {
+            "transaction_id": transaction_id,
+            "operation": operation,
+            "changed_at": changed_at,
+        }
+        for transaction_id, operation in pending or []
+    ]
+    for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+        session.execute(
+            insert(TransactionChange), rows[start : start + INSERT_CHUNK_SIZE]
+        )
+    # Ledger verzió ugyanabban a tranzakcióban: a verzióra kulcsolt cache-ek
+    # minden folyamatban érvénytelenné válnak
+    reference_data.bump_version(session, reference_data.TRANSACTIONS)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_pending(session: Session, transaction) -> None:
+    # Rollback / close: a nem commitolt változások elvesznek (savepoint-nál nem)
+    if transaction.parent is None:
+        session.info.pop(_PENDING_KEY, None)
+        session.info.pop(_WRITTEN_AFTER_KEY, None)
+
+
+def settled_seq(db: Session) -> int:
+    """
+    A napló azon pozíciója, ameddig minden seq letisztult (a legelső friss sor
+    előtt; friss sor híján a legnagyobb seq) - teljes újraolvasás utáni kurzor.
+    """
+    settled_before = datetime.now() - timedelta(seconds=SETTLE_SECONDS)
+    fresh = db.scalar(
+        select(func.min(TransactionChange.seq)).where(
+            TransactionChange.changed_at > settled_before
+        )
+    )
+    if fresh is not None:
+        return fresh - 1
+    return db.scalar(select(func.coalesce(func.max(TransactionChange.seq), 0)))
+
+
+def changes_since(
+    db: Session, since: int, limit: int = MAX_PAGE_SIZE
+) -> Dict[str, Any]:
+    """
+    A since utáni változások seq sorrendben, tranzakciónként csak a legutolsó.
+    next_since: a következő lekérés since értéke; reset=True esetén (restore, vagy
+    a since-nél újabb sorok már nincsenek meg) a kliensnek teljes újratöltés kell.
+    """
+    oldest = db.scalar(select(func.min(TransactionChange.seq)))
+    rows = db.execute(
+        select(
+            TransactionChange.seq,
+            TransactionChange.transaction_id,
+            TransactionChange.operation,
+            TransactionChange.changed_at,
+        )
+        .where(TransactionChange.seq > since)
+        .order_by(TransactionChange.seq)
+        .limit(limit + 1)
+    ).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    # Friss hézagnál megállunk (a kimaradt seq tranzakciója még commitolhat)
+    settled_before = datetime.now() - timedelta(seconds=SETTLE_SECONDS)
+    if since > 0:
+        expected = since + 1
+    else:
+        # Kezdeti szinkron: a napló eleje az első letisztult seq (előtte friss,
+        # még commitolatlan seq is lehet); ha még nincs ilyen, az 1-estől várunk
+        expected = (
+            db.scalar(
+                select(func.min(TransactionChange.seq)).where(
+                    TransactionChange.changed_at <= settled_before
+                )
+            )
+            or 1
+        )
+    accepted = []
+    for row in rows:
+        if row.seq != expected:
+            if row.changed_at > settled_before:
+                has_more = True
+                break
+        accepted.append(row)
+        expected = row.seq + 1
+
+    latest: Dict[Optional[int], Any] = {}
+    for row in accepted:
+        latest.pop(row.transaction_id, None)
+        latest[row.transaction_id] = row
+
+    return {
+        "since": since,
+        "next_since": accepted[-1].seq if accepted else since,
+        "has_more": has_more,
+        "reset": (since > 0 and oldest is not None and since < oldest - 1)
+        or any(row.operation == RESET for row in accepted),
+        "changes": sorted(latest.values(), key=lambda row: row.seq),
+    }
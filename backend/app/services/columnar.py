@@ -0,0 +1,94 @@
+import json
+from typing import Any, Dict, Iterable, List, Optional
+
+RESPONSE_FORMATS = ("rows", "columnar")
+
+# Dictionary kódolás, ha a különböző értékek aránya legfeljebb ennyi
+DICTIONARY_MAX_RATIO = 0.5
+
+
+def _dictionary_key(value: Any) -> Any:
+    return (
+        json.dumps(value, sort_keys=True, default=str)
+        if isinstance(value, dict)
+        else value
+    )
+
+
+def encode_column(values: List[Any]) -> Optional[Dict[str, Any]]:
+    """
+    Ismétlődő string / objektum értékek dictionary kódolása:
+    {"dictionary": [egyedi értékek], "codes": [index vagy null]}.
+    None, ha nem éri meg (vegyes típus vagy túl sok különböző érték).
+    """
+    dictionary = []
+    positions: Dict[Any, int] = {}
+    codes = []
+    for value in values:
+        if value is None:
+            codes.append(None)
+            continue
+        if not isinstance(value, (str, dict)):
+            return None
+        key = _dictionary_key(value)
+        code = positions.get(key)
+        if code is None:
+            code = positions[key] = len(dictionary)
+            dictionary.append(value)
+            if len(dictionary) > len(values) * DICTIONARY_MAX_RATIO:
+                return None
+        codes.append(code)
+    if not dictionary:
+        return None
+    return {"dictionary": dictionary, "codes": codes}
+
+
+def to_columnar(
+    rows: Iterable[Dict[str, Any]], columns: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    Sor-objektumok oszlopos formára: az oszlopnevek egyszer, az értékek párhuzamos
+    tömbökben, ismétlődő stringek (deviza, irány, számla, partner) dictionary kódolva.
+    Visszaalakítás: row[i] = {col: dictionaries[col][values[col][i]] vagy values[col][i]}.
+    """
+    rows = list(rows)
+    if columns is None:
+        columns = list(dict.fromkeys(key for row in rows for key in row))
+
+    values = {}
+    dictionaries = {}
+    for column in columns:
+        column_values = [row.get(column) for row in rows]
+        encoded = encode_column(column_values)
+        if encoded is None:
+            values[column] = column_values
+        else:
+            values[column] = encoded["codes"]
+            dictionaries[column] = encoded["dictionary"]
+
+    return {
+        "format": "columnar",
+        "row_count": len(rows),
+        "columns": columns,
+        "values": values,
+        "dictionaries": dictionaries,
+    }
+
+
+def from_columnar(table: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Oszlopos forma visszaalakítása sor-objektumokká (kliens oldali referencia)"""
+    columns = table["columns"]
+    dictionaries = table["dictionaries"]
+    decoded = {}
+    for column in columns:
+        column_values = table["values"][column]
+        if column in dictionaries:
+            dictionary = dictionaries[column]
+            column_values = [
+                dictionary[code] if code is not None else None for code in column_values
+            ]
+        decoded[column] = column_values
+    return [
+        {column: decoded[column][index] for column in columns}
+        for index in range(table["row_count"])
+    ]
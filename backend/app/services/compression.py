@@ -0,0 +1,70 @@
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipResponder, IdentityResponder
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# Opcionális függőség: brotli nélkül csak gzip tömörítés történik
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+# Ennél kisebb válaszokat nem érdemes tömöríteni
+MINIMUM_SIZE = 1000
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # Gyors tömörítés, nagy JSON-nál is ms nagyságrend
+
+
+class BrotliResponder(IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app: ASGIApp, minimum_size: int, quality: int) -> None:
+        super().__init__(app, minimum_size)
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        compressed = self.compressor.process(body)
+        # Streamelt válasznál (CSV export) a chunk azonnal menjen ki
+        return compressed + (
+            self.compressor.flush() if more_body else self.compressor.finish()
+        )
+
+
+class CompressionMiddleware:
+    """
+    Válasz tömörítés az Accept-Encoding alapján: br (ha a brotli csomag elérhető),
+    különben gzip. Az SSE stream-ek (text/event-stream) tömörítetlenek maradnak.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = MINIMUM_SIZE,
+        gzip_level: int = GZIP_LEVEL,
+        brotli_quality: int = BROTLI_QUALITY,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accepted = {
+            encoding.split(";")[0].strip()
+            for encoding in Headers(scope=scope).get("Accept-Encoding", "").split(",")
+        }
+        if "br" in accepted and brotli is not None:
+            responder = BrotliResponder(
+                self.app, self.minimum_size, self.brotli_quality
+            )
+        elif "gzip" in accepted:
+            responder = GZipResponder(
+                self.app, self.minimum_size, compresslevel=self.gzip_level
+            )
+        else:
+            responder = IdentityResponder(self.app, self.minimum_size)
+
+        await responder(scope, receive, send)
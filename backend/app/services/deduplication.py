@@ -0,0 +1,205 @@
+import hashlib
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, insert, select, text
+from sqlalchemy.orm import Session
+
+from app.database.models import Transaction
+from app.services import archive, metrics
+
+# IN listák és multi-row INSERT-ek mérete (MSSQL: max 2100 paraméter / utasítás)
+LOOKUP_CHUNK_SIZE = 1000
+INSERT_CHUNK_SIZE = 100
+
+# A bulk insert által írt oszlopok (id, created_at, updated_at a DB-ből jön)
+INSERT_COLUMNS = [
+    "transaction_date",
+    "booking_date",
+    "transaction_type",
+    "direction",
+    "partner_name",
+    "partner_account",
+    "expense_category",
+    "description",
+    "account_name",
+    "account_number",
+    "amount",
+    "currency",
+    "category_id",
+    "fingerprint",
+]
+
+
+def _normalize_date(value: Any) -> str:
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return datetime.fromisoformat(str(value).strip()).date().isoformat()
+
+
+def compute_fingerprint(
+    transaction_date: Any,
+    amount: Any,
+    partner_name: Optional[str],
+    occurrence: int = 1,
+) -> str:
+    """
+    Tranzakció fingerprint: a duplikáció szűrés mezőinek (dátum + összeg + partner)
+    normalizált SHA-256 hash-e. Upload és mentés ugyanazt a függvényt használja.
+    occurrence: az azonos tétel hányadik előfordulása a kivonaton belül (az első
+    előfordulás hash-e sorszám nélküli, így a korábban mentett fingerprint-ek
+    érvényesek maradnak).
+    """
+    parts = [
+        _normalize_date(transaction_date),
+        str(Decimal(str(amount or 0)).quantize(Decimal("0.01"))),
+        (partner_name or "").strip().upper(),
+    ]
+    if occurrence > 1:
+        parts.append(str(occurrence))
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+def statement_fingerprint(
+    occurrences: Dict[Tuple[Optional[str], str], int],
+    transaction_date: Any,
+    amount: Any,
+    partner_name: Optional[str],
+    source: Optional[str] = None,
+) -> str:
+    """
+    Kivonat sorának fingerprint-je előfordulási sorszámmal: az azonos (dátum,
+    összeg, partner) tételek forrás fájlonként 1, 2, ... sorszámot kapnak.
+    Két valódi, azonos napi vásárlás így nem duplikátum, ugyanazon kivonat
+    újra feltöltése viszont igen. Az occurrences számlálót a hívó tartja
+    (sorrendben, a duplikátumnak jelölt sorokat is beleértve), hogy a preview
+    és a mentés ugyanazt a sorszámozást kapja.
+    """
+    base = compute_fingerprint(transaction_date, amount, partner_name)
+    key = (source, base)
+    occurrences[key] = occurrences.get(key, 0) + 1
+    if occurrences[key] == 1:
+        return base
+    return compute_fingerprint(transaction_date, amount, partner_name, occurrences[key])
+
+
+def _chunks(items: List[Any], size: int) -> Iterable[List[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def find_existing_fingerprints(
+    db: Session, fingerprints: Iterable[str]
+) -> Dict[str, int]:
+    """Meglévő tranzakciók keresése fingerprint alapján (indexelt IN lekérdezés)"""
+    unique_fingerprints = list(dict.fromkeys(fingerprints))
+    existing = {}
+    for chunk in _chunks(unique_fingerprints, LOOKUP_CHUNK_SIZE):
+        rows = db.execute(
+            select(Transaction.fingerprint, Transaction.id).where(
+                Transaction.fingerprint.in_(chunk)
+            )
+        ).all()
+        existing.update({fingerprint: id for fingerprint, id in rows})
+    return existing
+
+
+def insert_transactions_skip_duplicates(
+    db: Session, rows: List[Dict[str, Any]]
+) -> List[int]:
+    """
+    Tranzakciók beszúrása duplikáció-biztosan, chunk-onként egyetlen utasítással
+    (MSSQL: MERGE, SQLite/PostgreSQL: INSERT ... ON CONFLICT DO NOTHING).
+    A már létező fingerprint-ű sorokat kihagyja, a létrehozott id-kat adja vissza.
+    """
+    started = time.perf_counter()
+
+    # Archivált (már nem a hot táblában lévő) tranzakciók sem szúrhatók be újra
+    archived = archive.find_archived_fingerprints(
+        (row["fingerprint"], row["transaction_date"]) for row in rows
+    )
+
+    # Payload-on belüli ismétlődések kiszűrése (a unique index úgyis elutasítaná)
+    seen = set(archived)
+    unique_rows = []
+    for row in rows:
+        if row["fingerprint"] not in seen:
+            seen.add(row["fingerprint"])
+            unique_rows.append(row)
+
+    dialect = db.get_bind().dialect.name
+    created_ids = []
+
+    for chunk in _chunks(unique_rows, INSERT_CHUNK_SIZE):
+        if dialect == "mssql":
+            created_ids.extend(_merge_mssql(db, chunk))
+        elif dialect in ("sqlite", "postgresql"):
+            if dialect == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert as dialect_insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert as dialect_insert
+
+            statement = (
+                dialect_insert(Transaction)
+                .values(chunk)
+                .on_conflict_do_nothing(
+                    index_elements=["fingerprint"],
+                    index_where=Transaction.fingerprint.isnot(None),
+                )
+                .returning(Transaction.id)
+            )
+            created_ids.extend(db.execute(statement).scalars().all())
+        else:
+            # Egyéb backend: előszűrés fingerprint alapján, majd sima INSERT
+            existing = find_existing_fingerprints(
+                db, [row["fingerprint"] for row in chunk]
+            )
+            new_rows = [row for row in chunk if row["fingerprint"] not in existing]
+            for row in new_rows:
+                result = db.execute(insert(Transaction).values(row))
+                created_ids.append(result.inserted_primary_key[0])
+
+    metrics.BULK_INSERT_SECONDS.observe(time.perf_counter() - started)
+    metrics.BULK_INSERT_ROWS.inc(len(created_ids), result="created")
+    metrics.BULK_INSERT_ROWS.inc(len(rows) - len(created_ids), result="skipped")
+    return created_ids
+
+
+def _merge_mssql(db: Session, rows: List[Dict[str, Any]]) -> List[int]:
+    """MERGE ... USING (VALUES ...) ON fingerprint - egy round trip chunk-onként"""
+    table = Transaction.__table__
+    dialect = db.get_bind().dialect
+    column_list = ", ".join(INSERT_COLUMNS)
+
+    value_rows = []
+    params = []
+    for row_index, row in enumerate(rows):
+        placeholders = []
+        for column_name in INSERT_COLUMNS:
+            name = f"p{row_index}_{column_name}"
+            column_type = table.c[column_name].type
+            # Explicit CAST, hogy a NULL értékek típusa is egyértelmű legyen
+            placeholders.append(
+                f"CAST(:{name} AS {column_type.compile(dialect=dialect)})"
+            )
+            params.append(
+                bindparam(name, value=row.get(column_name), type_=column_type)
+            )
+        value_rows.append(f"({', '.join(placeholders)})")
+
+    statement = text(f"""
+        MERGE INTO {table.name} WITH (HOLDLOCK) AS target
+        USING (VALUES {', '.join(value_rows)}) AS source ({column_list})
+        ON target.fingerprint = source.fingerprint
+        WHEN NOT MATCHED THEN
+            INSERT ({column_list}, created_at, updated_at)
+            VALUES ({', '.join(f'source.{c}' for c in INSERT_COLUMNS)},
+                    GETDATE(), GETDATE())
+        OUTPUT inserted.id;
+        """).bindparams(*params)
+
+    return list(db.execute(statement).scalars().all())
@@ -0,0 +1,125 @@
+import threading
+from collections import OrderedDict
+from datetime import date
+from decimal import Decimal
+from typing import Optional, Tuple
+
+import pandas as pd
+from sqlalchemy import and_, case, select
+from sqlalchemy.orm import Session
+
+from app.database import database
+from app.database.models import FxRate, Transaction
+from app.services import reference_data
+
+BASE_CURRENCY = "HUF"
+
+RATE_CACHE_SIZE = 50000
+
+# Memoizált árfolyamok (currency, dátum) -> HUF árfolyam, LRU; a data_versions
+# 'fx_rates' verziójára kulcsolva (betöltés után minden worker eldobja)
+_rate_cache: "OrderedDict[Tuple[str, date], Decimal]" = OrderedDict()
+_rate_cache_version: Optional[int] = None
+_rate_cache_lock = threading.Lock()
+
+
+def get_rate(db: Session, currency: str, on_date: date) -> Optional[Decimal]:
+    """
+    HUF árfolyam a megadott napra: a legutóbbi ismert árfolyam <= on_date.
+    (currency, dátum) szerint memoizált, amíg az árfolyam verzió nem változik;
+    hiányzó árfolyamot nem cache-elünk.
+    """
+    global _rate_cache_version
+
+    currency = currency.upper()
+    if currency == BASE_CURRENCY:
+        return Decimal(1)
+
+    version = reference_data.cache.current_version(db, reference_data.FX_RATES)
+    # Replikáról olvasott árfolyam nem kerül cache-be (késhet a verzióhoz képest)
+    shared = not database.is_replica(db)
+    key = (currency, on_date)
+    with _rate_cache_lock:
+        if version != _rate_cache_version and shared:
+            _rate_cache.clear()
+            _rate_cache_version = version
+        rate = _rate_cache.get(key) if version == _rate_cache_version else None
+        if rate is not None:
+            _rate_cache.move_to_end(key)
+            return rate
+
+    rate = db.execute(
+        select(FxRate.rate_to_huf)
+        .where(FxRate.currency == currency, FxRate.rate_date <= on_date)
+        .order_by(FxRate.rate_date.desc())
+        .limit(1)
+    ).scalar()
+
+    if rate is not None:
+        with _rate_cache_lock:
+            if shared and version == _rate_cache_version:
+                _rate_cache[key] = rate
+                while len(_rate_cache) > RATE_CACHE_SIZE:
+                    _rate_cache.popitem(last=False)
+    return rate
+
+
+def rate_subquery():
+    """Korrelált skalár subquery: a tranzakció napjára érvényes HUF árfolyam"""
+    return (
+        select(FxRate.rate_to_huf)
+        .where(
+            and_(
+                FxRate.currency == Transaction.currency,
+                FxRate.rate_date <= Transaction.transaction_date,
+            )
+        )
+        .order_by(FxRate.rate_date.desc())
+        .limit(1)
+        .correlate(Transaction)
+        .scalar_subquery()
+    )
+
+
+def amount_in_base_currency():
+    """
+    Összeg HUF-ban SQL kifejezésként (aggregációkhoz).
+    HUF tranzakciónál maga az összeg, egyébként összeg * árfolyam;
+    ismeretlen árfolyam esetén NULL (SUM kihagyja, külön számolható).
+    """
+    return case(
+        (Transaction.currency == BASE_CURRENCY, Transaction.amount),
+        else_=Transaction.amount * rate_subquery(),
+    )
+
+
+def convert_frame(
+    db: Session,
+    df: pd.DataFrame,
+    amount_column: str = "amount",
+    currency_column: str = "currency",
+    date_column: str = "transaction_date",
+) -> pd.Series:
+    """
+    Vektorizált átváltás DataFrame-re: egyedi (currency, dátum) párokra
+    memoizált árfolyam keresés, majd egyetlen szorzás az egész oszlopon.
+    Ismeretlen árfolyamnál NaN.
+    """
+    currencies = df[currency_column].fillna(BASE_CURRENCY).astype(str).str.upper()
+    dates = pd.to_datetime(df[date_column], errors="coerce")
+    amounts = pd.to_numeric(df[amount_column], errors="coerce")
+
+    is_foreign = currencies != BASE_CURRENCY
+    rates = pd.Series(1.0, index=df.index)
+    rates[is_foreign] = float("nan")
+
+    lookup_mask = is_foreign & dates.notna()
+    if lookup_mask.any():
+        pairs = list(zip(currencies[lookup_mask], dates[lookup_mask].dt.date))
+        lookup = {}
+        for key in set(pairs):
+            rate = get_rate(db, *key)
+            lookup[key] = float(rate) if rate is not None else float("nan")
+        rates[lookup_mask] = [lookup[key] for key in pairs]
+
+    return amounts * rates
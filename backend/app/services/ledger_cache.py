@@ -0,0 +1,256 @@
+import os
+import threading
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.database import database
+from app.database.models import Transaction
+from app.services import archive, ledger_events, metrics
+from app.services.fx import convert_frame
+
+# Opcionális: LEDGER_CACHE=True esetén az analytics memóriából válaszol
+ENABLED = os.getenv("LEDGER_CACHE") == "True"
+
+LOAD_CHUNK_SIZE = 50000
+ID_CHUNK_SIZE = 1000
+
+# date.toordinal() értéke 1970-01-01-re (datetime64 konverzióhoz)
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+LOAD_COLUMNS = (
+    Transaction.id,
+    Transaction.transaction_date,
+    Transaction.amount,
+    Transaction.currency,
+    Transaction.direction,
+    Transaction.category_id,
+    Transaction.partner_name,
+    Transaction.account_number,
+)
+
+# Dictionary-encoded (pandas categorical) oszlopok
+CATEGORICAL_COLUMNS = ("direction", "currency", "partner_name", "account_number")
+
+
+def compact_frame(db: Session, rows: Any) -> pd.DataFrame:
+    """DB sorok / archív frame -> kompakt frame (int32 dátum, categorical stringek)"""
+    raw = pd.DataFrame(rows, columns=[column.key for column in LOAD_COLUMNS])
+
+    frame = pd.DataFrame(index=pd.Index(raw["id"].astype(np.int64), name="id"))
+    frame["date"] = np.fromiter(
+        (d.toordinal() for d in raw["transaction_date"]),
+        dtype=np.int32,
+        count=len(raw),
+    )
+    frame["amount"] = raw["amount"].astype(float).to_numpy()
+    frame["amount_huf"] = convert_frame(db, raw).to_numpy()
+    frame["category_id"] = raw["category_id"].fillna(-1).astype(np.int32).to_numpy()
+    for column in CATEGORICAL_COLUMNS:
+        frame[column] = pd.Categorical(raw[column].fillna("").to_numpy())
+    return frame
+
+
+def _concat(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """Frame-ek összefűzése a categorical kódolás megtartásával"""
+    frames = [frame for frame in frames if not frame.empty] or frames[:1]
+    if len(frames) == 1:
+        return frames[0]
+
+    frames = [frame.copy() for frame in frames]
+    for column in CATEGORICAL_COLUMNS:
+        categories = frames[0][column].cat.categories
+        for frame in frames[1:]:
+            categories = categories.union(frame[column].cat.categories)
+        for frame in frames:
+            frame[column] = frame[column].cat.set_categories(categories)
+    return pd.concat(frames)
+
+
+def aggregate_frame(
+    frame: pd.DataFrame,
+    group_by: str,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    category_id: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Vektorizált bevétel / kiadás aggregálás HUF-ban (compact_frame formájú adaton).
+    group_by: month / day / category / currency
+    """
+    mask = np.ones(len(frame), dtype=bool)
+    if date_from:
+        mask &= frame["date"].to_numpy() >= date_from.toordinal()
+    if date_to:
+        mask &= frame["date"].to_numpy() <= date_to.toordinal()
+    if category_id is not None:
+        mask &= frame["category_id"].to_numpy() == category_id
+    frame = frame[mask]
+
+    amount_huf = frame["amount_huf"].to_numpy()
+    absolute = np.abs(amount_huf)
+    direction = frame["direction"]
+    work = pd.DataFrame(
+        {
+            "income": np.where(direction == "Bejövő", absolute, 0.0),
+            "expense": np.where(direction == "Kimenő", absolute, 0.0),
+            "missing_rate_count": np.isnan(amount_huf).astype(np.int64),
+        },
+        index=frame.index,
+    )
+    # NaN (ismeretlen árfolyam) ne rontsa el az összegeket (SQL SUM szemantika)
+    work[["income", "expense"]] = work[["income", "expense"]].fillna(0.0)
+
+    if group_by in ("month", "day"):
+        dates = pd.to_datetime(
+            frame["date"].to_numpy().astype(np.int64) - EPOCH_ORDINAL, unit="D"
+        )
+        if group_by == "month":
+            keys = {"year": dates.year, "month": dates.month}
+        else:
+            keys = {"date": dates.date}
+    elif group_by == "category":
+        keys = {"category_id": frame["category_id"].to_numpy()}
+    else:
+        keys = {"currency": frame["currency"].astype(str).to_numpy()}
+
+    for name, values in keys.items():
+        work[name] = values
+
+    grouped = work.groupby(list(keys), sort=True).agg(
+        income=("income", "sum"),
+        expense=("expense", "sum"),
+        transaction_count=("income", "size"),
+        missing_rate_count=("missing_rate_count", "sum"),
+    )
+    return grouped.reset_index()
+
+
+class LedgerCache:
+    """
+    Tranzakció tábla oszlopos snapshot-ja memóriában.
+    Egy bulk lekérdezéssel töltődik, írások után inkrementálisan frissül
+    (ledger_events), teljes újratöltés ismeretlen változásnál, vagy ha a DB
+    adatverzió más folyamat írása miatt (pl. CLI restore) továbblépett.
+    """
+
+    def __init__(self):
+        self._frame: Optional[pd.DataFrame] = None
+        self._stale = False
+        self.version: Optional[int] = None
+        self._lock = threading.RLock()
+        self.loaded_at: Optional[datetime] = None
+        self.incremental_updates = 0
+
+    def load(self, db: Session) -> pd.DataFrame:
+        # Betöltés előtt olvasva: közbeni írásnál a következő kérés újratölt
+        version = ledger_events.data_version(db)
+        chunks = []
+        result = db.execute(
+            select(*LOAD_COLUMNS).execution_options(yield_per=LOAD_CHUNK_SIZE)
+        )
+        for partition in result.partitions():
+            chunks.append(compact_frame(db, partition))
+        # Archivált (Parquet) tranzakciók: az összesítésekben ugyanúgy szerepelnek
+        for archived in archive.iter_archived():
+            chunks.append(
+                compact_frame(db, archived[[column.key for column in LOAD_COLUMNS]])
+            )
+        frame = _concat(chunks) if chunks else compact_frame(db, [])
+
+        with self._lock:
+            self._frame = frame.sort_index()
+            self._stale = False
+            self.version = version
+            self.loaded_at = datetime.now()
+        return self._frame
+
+    def frame(self, db: Session) -> pd.DataFrame:
+        version = ledger_events.data_version(db)
+        with self._lock:
+            if self._frame is not None and not self._stale and self.version == version:
+                metrics.CACHE_REQUESTS.inc(cache="ledger", result="hit")
+                return self._frame
+        metrics.CACHE_REQUESTS.inc(cache="ledger", result="miss")
+        # A megosztott frame mindig a primary-ről töltődik (a replika késhet)
+        if database.is_replica(db):
+            with database.SessionLocal() as primary:
+                return self.load(primary)
+        return self.load(db)
+
+    def on_change(self, db: Session, change: ledger_events.LedgerChange) -> None:
+        with self._lock:
+            if self._frame is None:
+                return
+            # Csak a saját commit léptette a verziót: inkrementális frissítés
+            version = ledger_events.data_version(db)
+            if change.full_refresh or version != (self.version or 0) + 1:
+                self._stale = True
+                return
+
+            frame = self._frame
+
+            if change.reassigned_categories:
+                category_ids = frame["category_id"].to_numpy().copy()
+                for old_id, new_id in change.reassigned_categories.items():
+                    category_ids[category_ids == old_id] = (
+                        -1 if new_id is None else new_id
+                    )
+                frame = frame.assign(category_id=category_ids)
+
+            changed_ids = list(change.deleted_ids) + list(change.upserted_ids)
+            if changed_ids:
+                frame = frame.drop(index=changed_ids, errors="ignore")
+
+            new_frames = []
+            for start in range(0, len(change.upserted_ids), ID_CHUNK_SIZE):
+                ids = change.upserted_ids[start : start + ID_CHUNK_SIZE]
+                rows = db.execute(
+                    select(*LOAD_COLUMNS).where(Transaction.id.in_(ids))
+                ).all()
+                new_frames.append(compact_frame(db, rows))
+
+            if new_frames:
+                frame = _concat([frame] + new_frames).sort_index()
+
+            self._frame = frame
+            self.version = version
+            self.incremental_updates += 1
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            frame = self._frame
+            return {
+                "enabled": ENABLED,
+                "loaded": frame is not None,
+                "stale": self._stale,
+                "rows": len(frame) if frame is not None else 0,
+                "memory_bytes": (
+                    int(frame.memory_usage(deep=True).sum()) if frame is not None else 0
+                ),
+                "loaded_at": self.loaded_at.isoformat() if self.loaded_at else None,
+                "incremental_updates": self.incremental_updates,
+                "data_version": self.version,
+            }
+
+    def aggregate(
+        self,
+        db: Session,
+        group_by: str,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        category_id: Optional[int] = None,
+    ) -> pd.DataFrame:
+        return aggregate_frame(
+            self.frame(db), group_by, date_from, date_to, category_id
+        )
+
+
+cache = LedgerCache()
+
+if ENABLED:
+    ledger_events.subscribe(cache.on_change)
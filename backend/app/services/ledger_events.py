@@ -0,0 +1,61 @@
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.services import reference_data
+
+
+@dataclass
+class LedgerChange:
+    """Egy commitolt írás leírása a tranzakció táblán"""
+
+    upserted_ids: List[int] = field(default_factory=list)
+    deleted_ids: List[int] = field(default_factory=list)
+    # Kategória átállítás (törlés / összevonás): régi id -> új id (None = kategorizálatlan)
+    reassigned_categories: Dict[int, Optional[int]] = field(default_factory=dict)
+    # Ismeretlen sorok változtak (pl. újrakategorizálás) - teljes frissítés kell
+    full_refresh: bool = False
+
+
+logger = logging.getLogger(__name__)
+
+_listeners: List[Callable[[Session, LedgerChange], None]] = []
+
+
+def subscribe(listener: Callable[[Session, LedgerChange], None]) -> None:
+    """Feliratkozás a tranzakció tábla változásaira (cache-ek, előszámolt eredmények)"""
+    _listeners.append(listener)
+
+
+def data_version(db: Session) -> int:
+    """
+    Ledger adatverzió a data_versions táblából: minden commitolt tranzakció
+    írásnál nő, bármely folyamatból (API worker, CLI script)
+    """
+    return reference_data.cache.current_version(db, reference_data.TRANSACTIONS)
+
+
+def transactions_changed(
+    db: Session,
+    upserted_ids: Optional[List[int]] = None,
+    deleted_ids: Optional[List[int]] = None,
+    reassigned_categories: Optional[Dict[int, Optional[int]]] = None,
+    full_refresh: bool = False,
+) -> None:
+    """Commit után hívandó: a feliratkozók értesítése (a verziót a commit növelte)"""
+    reference_data.cache.invalidate(reference_data.TRANSACTIONS)
+
+    change = LedgerChange(
+        upserted_ids=list(upserted_ids or []),
+        deleted_ids=list(deleted_ids or []),
+        reassigned_categories=dict(reassigned_categories or {}),
+        full_refresh=full_refresh,
+    )
+    for listener in _listeners:
+        # Az írás már commitolva van - egy hibás cache frissítés nem buktathatja el
+        try:
+            listener(db, change)
+        except Exception:
+            logger.exception("Ledger listener failed: %r", listener)
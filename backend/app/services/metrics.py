@@ -0,0 +1,248 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Prometheus text formátumú metrikák (GET /metrics), külső függőség nélkül.
+# A rate / arány jellegű értékek (sor/mp, találati arány) PromQL-ben számolandók
+# a számlálókból, pl. rate(upload_rows_parsed_total[5m]).
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+Sample = Tuple[Dict[str, str], float]
+
+_metrics: List["Metric"] = []
+_collectors: List[Callable[[], List[Tuple[str, str, str, List[Sample]]]]] = []
+
+
+def _format_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    pairs = []
+    for name, value in labels.items():
+        value = (
+            str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        )
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: címkék: {list(self.labelnames)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            return [
+                (self.name, dict(zip(self.labelnames, key)), value)
+                for key, value in self._values.items()
+            ]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [bucket számlálók (nem kumulatív), összeg, darab]
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][index] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        result = []
+        with self._lock:
+            for key, (bucket_counts, total, count) in self._values.items():
+                labels = dict(zip(self.labelnames, key))
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    cumulative += bucket_count
+                    result.append(
+                        (
+                            f"{self.name}_bucket",
+                            {**labels, "le": str(bound)},
+                            cumulative,
+                        )
+                    )
+                result.append((f"{self.name}_bucket", {**labels, "le": "+Inf"}, count))
+                result.append((f"{self.name}_sum", labels, total))
+                result.append((f"{self.name}_count", labels, count))
+        return result
+
+
+def register_collector(
+    collector: Callable[[], List[Tuple[str, str, str, List[Sample]]]],
+) -> None:
+    """Lekéréskor számolt metrikák (pl. DB pool, cache számlálók): (név, típus, leírás, minták)"""
+    _collectors.append(collector)
+
+
+def render() -> str:
+    lines = []
+    for metric in _metrics:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in metric.samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    for collector in _collectors:
+        for name, kind, documentation, samples in collector():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# HTTP
+REQUESTS = Counter(
+    "http_requests_total", "Kérések száma", ("method", "route", "status")
+)
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Kérés időtartama a teljes válasz elküldéséig",
+    ("method", "route"),
+)
+REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "Folyamatban lévő kérések")
+
+# Upload pipeline
+UPLOAD_ROWS_PARSED = Counter(
+    "upload_rows_parsed_total", "Excel fájlokból beolvasott sorok"
+)
+UPLOAD_PARSE_SECONDS = Histogram(
+    "upload_parse_seconds", "Excel beolvasás ideje (fájlonként / batch-enként)"
+)
+UPLOAD_CATEGORIZE_SECONDS = Histogram(
+    "upload_categorize_seconds", "Upload sorok kategorizálási ideje (hívásonként)"
+)
+UPLOAD_DUPLICATE_CHECK_SECONDS = Histogram(
+    "upload_duplicate_check_seconds", "Upload duplikáció ellenőrzés ideje"
+)
+UPLOAD_CATEGORIZED_ROWS = Counter(
+    "upload_categorized_rows_total",
+    "Upload sorok a kategória javaslat forrása szerint (rule / model / none)",
+    ("source",),
+)
+BULK_INSERT_ROWS = Counter(
+    "bulk_insert_rows_total",
+    "Bulk mentésre küldött sorok (created / skipped duplikátum)",
+    ("result",),
+)
+BULK_INSERT_SECONDS = Histogram(
+    "bulk_insert_seconds", "Duplikáció-biztos bulk INSERT ideje (hívásonként)"
+)
+
+# Cache-ek: reference (kategóriák, szabálymotor), ledger, reports
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "Cache lekérések (hit / miss)", ("cache", "result")
+)
+
+
+class MetricsMiddleware:
+    """
+    Kérésenkénti latencia (route sablon szerint, pl. /api/transactions/{transaction_id})
+    és folyamatban lévő kérések. Route nélküli (404) kérések: route="unmatched".
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=route_path,
+            )
+            REQUESTS.inc(method=scope["method"], route=route_path, status=status)
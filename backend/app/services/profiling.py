@@ -0,0 +1,223 @@
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Kérésenkénti profilozás: csak PROFILING_ENABLED=True esetén van middleware,
+# és csak a kiváltott kérésekre indul mintavételező szál (különben nincs költsége)
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED") == "True"
+PROFILE_DIR = os.getenv("PROFILE_DIR", "data/profiles")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+
+# Kiváltó header (pl. X-Profile: 1), a válaszban X-Profile-Id a profil azonosítója
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+PROFILE_ID_PATTERN = re.compile(r"^[0-9]{8}-[0-9]{6}-[0-9a-f]{8}$")
+
+# Várakozó szálak legfelső frame-je: ezek a minták nem a kérés munkáját mérik
+_IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+}
+
+# Futó mintavételező szálak (egymást ne mintázzák)
+_sampler_threads: Set[int] = set()
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    path = code.co_filename
+    for prefix in sys.path:
+        if prefix and path.startswith(prefix):
+            path = path[len(prefix) :].lstrip(os.sep)
+            break
+    return f"{code.co_name} ({path}:{code.co_firstlineno})".replace(";", ":")
+
+
+class StackSampler:
+    """
+    Statisztikus profiler: háttérszál, amely intervallumonként lementi a folyamat
+    szálainak call stack-jét (sys._current_frames), a várakozó szálak nélkül.
+    Eredmény: összevont stack -> minta szám (flame graph "folded" formátum).
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="request-profiler", daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        _sampler_threads.add(threading.get_ident())
+        names = {}
+        try:
+            while not self._stop.wait(self.interval):
+                self.samples += 1
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id in _sampler_threads:
+                        continue
+                    code = frame.f_code
+                    if (
+                        os.path.basename(code.co_filename),
+                        code.co_name,
+                    ) in _IDLE_FRAMES:
+                        continue
+                    if thread_id not in names:
+                        names.update(
+                            (thread.ident, thread.name)
+                            for thread in threading.enumerate()
+                        )
+                    labels = []
+                    while frame is not None:
+                        labels.append(_frame_label(frame))
+                        frame = frame.f_back
+                    labels.append(
+                        names.get(thread_id, str(thread_id)).replace(";", ":")
+                    )
+                    self.stacks[";".join(reversed(labels))] += 1
+        finally:
+            _sampler_threads.discard(threading.get_ident())
+
+
+def _prune() -> None:
+    """Csak a legutóbbi PROFILE_KEEP profil marad meg"""
+    for entry in list_profiles()[PROFILE_KEEP:]:
+        for suffix in (".folded", ".json"):
+            path = os.path.join(PROFILE_DIR, entry["id"] + suffix)
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def new_profile_id() -> str:
+    return f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}"
+
+
+def save_profile(
+    sampler: StackSampler,
+    profile_id: str,
+    method: str,
+    path: str,
+    status: int,
+    duration: float,
+) -> None:
+    """Profil mentése: <id>.folded (flamegraph.pl / speedscope) + <id>.json metaadat"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+
+    with open(os.path.join(PROFILE_DIR, profile_id + ".folded"), "w") as f:
+        for stack, count in sampler.stacks.most_common():
+            f.write(f"{stack} {count}\n")
+
+    metadata = {
+        "id": profile_id,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "method": method,
+        "path": path,
+        "status": status,
+        "duration_ms": round(duration * 1000, 1),
+        "interval_ms": PROFILE_INTERVAL_MS,
+        "samples": sampler.samples,
+    }
+    with open(os.path.join(PROFILE_DIR, profile_id + ".json"), "w") as f:
+        json.dump(metadata, f)
+
+    _prune()
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    """Mentett profilok metaadatai, legújabb elöl"""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for name in os.listdir(PROFILE_DIR):
+        if not name.endswith(".json") or not PROFILE_ID_PATTERN.match(name[:-5]):
+            continue
+        with open(os.path.join(PROFILE_DIR, name)) as f:
+            profiles.append(json.load(f))
+    return sorted(profiles, key=lambda profile: profile["id"], reverse=True)
+
+
+def profile_path(profile_id: str) -> Optional[str]:
+    """A .folded fájl útvonala, ha létezik (az id formátuma ellenőrzött)"""
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    path = os.path.join(PROFILE_DIR, profile_id + ".folded")
+    return path if os.path.exists(path) else None
+
+
+class ProfilingMiddleware:
+    """
+    Kérés profilozása, ha a kérésben X-Profile: 1 header van, vagy a
+    PROFILE_SAMPLE_RATE szerinti véletlen mintába esik. A mintavétel a teljes
+    válasz elküldéséig tart (streamelt válaszoknál is); párhuzamos kéréseknél
+    a többi kérés szálai is bekerülhetnek a profilba.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        sample_rate: float = PROFILE_SAMPLE_RATE,
+        interval_ms: float = PROFILE_INTERVAL_MS,
+    ) -> None:
+        self.app = app
+        self.sample_rate = sample_rate
+        self.interval = interval_ms / 1000
+
+    def triggered(self, scope: Scope) -> bool:
+        if Headers(scope=scope).get(PROFILE_HEADER, "").lower() in ("1", "true"):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.triggered(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = new_profile_id()
+        status = 500
+
+        async def send_with_id(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message)[PROFILE_ID_HEADER] = profile_id
+            await send(message)
+
+        sampler = StackSampler(self.interval)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            sampler.stop()
+            save_profile(
+                sampler,
+                profile_id,
+                scope["method"],
+                scope["path"],
+                status,
+                time.perf_counter() - started,
+            )
@@ -0,0 +1,107 @@
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.requests import cookie_parser
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Read-your-writes kliensenként: írás után a válasz cookie-ban viszi a commitolt
+# data_versions verziókat (commit token, pl. "categories:12|transactions:345").
+# Amíg a replika ezeknél régebbi verziót lát, a kliens olvasásai a primary-re
+# mennek; amint utolérte, a cookie törlődik.
+COOKIE_NAME = "commit_token"
+
+_request_state: ContextVar[Optional[Dict[str, Any]]] = ContextVar(
+    "read_your_writes", default=None
+)
+
+
+def parse_token(value: Optional[str]) -> Dict[str, int]:
+    versions = {}
+    for part in (value or "").split("|"):
+        name, _, version = part.partition(":")
+        if name and version.isdigit():
+            versions[name] = int(version)
+    return versions
+
+
+def format_token(versions: Dict[str, int]) -> str:
+    return "|".join(f"{name}:{version}" for name, version in sorted(versions.items()))
+
+
+def _merged(state: Dict[str, Any]) -> Dict[str, int]:
+    versions = dict(state["token"])
+    for name, version in state["written"].items():
+        versions[name] = max(version, versions.get(name, 0))
+    return versions
+
+
+def client_versions() -> Dict[str, int]:
+    """Az aktuális kérés kliensének legutóbb commitolt verziói (cookie + ez a kérés)"""
+    state = _request_state.get()
+    return _merged(state) if state is not None else {}
+
+
+def remember_commit(versions: Dict[str, int]) -> None:
+    """Író session commitja után: a verziók a válasz commit tokenjébe kerülnek"""
+    state = _request_state.get()
+    if state is None:
+        return
+    for name, version in versions.items():
+        state["written"][name] = max(version, state["written"].get(name, 0))
+
+
+def mark_caught_up() -> None:
+    """A replika elérte a kliens tokenjét - a cookie törölhető"""
+    state = _request_state.get()
+    if state is not None:
+        state["caught_up"] = True
+
+
+class ReadYourWritesMiddleware:
+    """
+    Kérésenkénti állapot (contextvar) a commit token olvasásához és írásához.
+    A token a válasz fejlécébe kerül, így a válasz elküldése után (pl. SSE
+    stream végén) commitolt írás csak a következő írás tokenjében jelenik meg.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        cookies = {}
+        for name, value in scope["headers"]:
+            if name == b"cookie":
+                cookies = cookie_parser(value.decode("latin-1"))
+                break
+        state = {
+            "token": parse_token(cookies.get(COOKIE_NAME)),
+            "written": {},
+            "caught_up": False,
+        }
+
+        async def send_with_token(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                if state["written"]:
+                    headers.append(
+                        "set-cookie",
+                        f"{COOKIE_NAME}={format_token(_merged(state))}; "
+                        "Path=/; HttpOnly; SameSite=Lax",
+                    )
+                elif state["caught_up"] and state["token"]:
+                    headers.append(
+                        "set-cookie",
+                        f"{COOKIE_NAME}=; Path=/; Max-Age=0; HttpOnly; SameSite=Lax",
+                    )
+            await send(message)
+
+        reset = _request_state.set(state)
+        try:
+            await self.app(scope, receive, send_with_token)
+        finally:
+            _request_state.reset(reset)
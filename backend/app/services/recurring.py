@@ -0,0 +1,317 @@
+import threading
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.database import database
+from app.database.models import Transaction
+from app.services import ledger_events
+
+LOAD_CHUNK_SIZE = 50000
+ID_CHUNK_SIZE = 1000
+
+# Periódus -> (névleges napok, megengedett eltérés napban)
+PERIODS = {
+    "weekly": (7, 2),
+    "monthly": (30, 5),
+    "yearly": (365, 15),
+}
+
+# Legalább ennyi előfordulás kell (évesnél kevesebb is elég)
+MIN_OCCURRENCES = {"weekly": 4, "monthly": 3, "yearly": 2}
+
+# Összeg sáv: egymást követő (rendezett) összegek max. relatív eltérése
+AMOUNT_TOLERANCE = 0.2
+
+# Az intervallumok legalább ekkora hányada essen a periódus tűrésén belül
+MIN_REGULARITY = 0.75
+
+LOAD_COLUMNS = (
+    Transaction.id,
+    Transaction.transaction_date,
+    Transaction.amount,
+    Transaction.currency,
+    Transaction.direction,
+    Transaction.partner_name,
+    Transaction.category_id,
+)
+
+GROUP_KEYS = ["partner_key", "direction", "currency"]
+
+
+def normalize_partners(partner_names: pd.Series) -> pd.Series:
+    """
+    Partner név normalizálása csoportosításhoz (vektorizált):
+    nagybetű, számok / írásjelek (kártyaszám, dátum, referencia) nélkül.
+    """
+    return (
+        partner_names.fillna("")
+        .str.upper()
+        .str.replace(r"[\d\W_]+", " ", regex=True)
+        .str.strip()
+    )
+
+
+def _compact_frame(rows: List[Any]) -> pd.DataFrame:
+    raw = pd.DataFrame(rows, columns=[column.key for column in LOAD_COLUMNS])
+    frame = pd.DataFrame(index=pd.Index(raw["id"].astype(np.int64), name="id"))
+    frame["date"] = pd.to_datetime(raw["transaction_date"]).to_numpy()
+    frame["amount"] = raw["amount"].astype(float).abs().to_numpy()
+    frame["partner_key"] = normalize_partners(raw["partner_name"]).to_numpy()
+    frame["partner_name"] = raw["partner_name"].fillna("").to_numpy()
+    frame["direction"] = raw["direction"].to_numpy()
+    frame["currency"] = raw["currency"].to_numpy()
+    frame["category_id"] = raw["category_id"].fillna(-1).astype(np.int32).to_numpy()
+    # Partner nélküli sorokból nem képzünk sorozatot
+    return frame[frame["partner_key"] != ""]
+
+
+def _load_rows(db: Session, query) -> pd.DataFrame:
+    frames = [
+        _compact_frame(partition)
+        for partition in db.execute(
+            query.execution_options(yield_per=LOAD_CHUNK_SIZE)
+        ).partitions()
+    ]
+    if not frames:
+        return _compact_frame([])
+    return pd.concat(frames)
+
+
+def detect_series(frame: pd.DataFrame, today: Optional[date] = None) -> pd.DataFrame:
+    """
+    Ismétlődő sorozatok keresése vektorizáltan:
+    1. csoportok: normalizált partner + irány + deviza
+    2. összeg sávok: csoporton belül összeg szerint rendezve új sáv kezdődik,
+       ha az összeg több mint AMOUNT_TOLERANCE-szel nagyobb az előzőnél
+    3. sávonként dátum szerinti intervallumok medián / szabályosság statisztikája
+    """
+    today = pd.Timestamp(today or date.today())
+    if frame.empty:
+        return pd.DataFrame()
+
+    work = frame.reset_index()
+    work["group"] = work.groupby(GROUP_KEYS, sort=False).ngroup()
+
+    work = work.sort_values(["group", "amount"], kind="stable")
+    group = work["group"].to_numpy()
+    amount = work["amount"].to_numpy()
+    new_band = np.ones(len(work), dtype=bool)
+    new_band[1:] = (group[1:] != group[:-1]) | (
+        amount[1:] > amount[:-1] * (1 + AMOUNT_TOLERANCE)
+    )
+    work["band"] = np.cumsum(new_band)
+
+    work = work.sort_values(["band", "date"], kind="stable")
+    work["interval"] = work.groupby("band")["date"].diff().dt.days
+    # Azonos napi többszörös terhelés nem új előfordulás
+    work = work[work["interval"].isna() | (work["interval"] > 0)]
+
+    median_interval = work.groupby("band")["interval"].transform("median")
+
+    period = pd.Series(pd.NA, index=work.index, dtype="object")
+    tolerance = pd.Series(np.nan, index=work.index)
+    for name, (days, allowed) in PERIODS.items():
+        mask = (median_interval - days).abs() <= allowed
+        period[mask] = name
+        tolerance[mask] = allowed
+    work["period"] = period
+    work["regular"] = (work["interval"] - median_interval).abs() <= tolerance
+
+    bands = work.groupby("band").agg(
+        partner_key=("partner_key", "first"),
+        partner_name=("partner_name", "last"),
+        direction=("direction", "first"),
+        currency=("currency", "first"),
+        period=("period", "first"),
+        occurrences=("id", "size"),
+        interval_days=("interval", "median"),
+        regularity=("regular", "sum"),
+        first_date=("date", "min"),
+        last_date=("date", "max"),
+        median_amount=("amount", "median"),
+        last_amount=("amount", "last"),
+        category_id=("category_id", "last"),
+        last_transaction_id=("id", "last"),
+    )
+    bands = bands[bands["period"].notna()]
+    bands["regularity"] = bands["regularity"] / (bands["occurrences"] - 1)
+
+    min_occurrences = bands["period"].map(MIN_OCCURRENCES)
+    bands = bands[
+        (bands["occurrences"] >= min_occurrences)
+        & (bands["regularity"] >= MIN_REGULARITY)
+    ].copy()
+    if bands.empty:
+        return bands
+
+    # Következő várható dátum: naptári hónap / év léptetés, hetinél +7 nap
+    last_date = pd.DatetimeIndex(bands["last_date"])
+    next_date = last_date + pd.Timedelta(days=7)
+    next_date = next_date.where(
+        bands["period"].to_numpy() != "monthly", last_date + pd.DateOffset(months=1)
+    )
+    next_date = next_date.where(
+        bands["period"].to_numpy() != "yearly", last_date + pd.DateOffset(years=1)
+    )
+    bands["expected_next_date"] = next_date
+
+    # Aktív: a legutóbbi tétel óta nem telt el 1.5 periódusnál több
+    grace = pd.to_timedelta(bands["interval_days"] * 1.5, unit="D")
+    bands["active"] = (bands["last_date"] + grace) >= today
+    return bands
+
+
+def _series_to_dict(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "partner": row["partner_key"],
+        "partner_name": row["partner_name"],
+        "direction": row["direction"],
+        "currency": row["currency"],
+        "period": row["period"],
+        "interval_days": float(row["interval_days"]),
+        "occurrences": int(row["occurrences"]),
+        "regularity": round(float(row["regularity"]), 4),
+        "first_date": row["first_date"].date().isoformat(),
+        "last_date": row["last_date"].date().isoformat(),
+        "median_amount": float(row["median_amount"]),
+        "expected_amount": float(row["last_amount"]),
+        "expected_next_date": row["expected_next_date"].date().isoformat(),
+        "active": bool(row["active"]),
+        "category_id": int(row["category_id"]) if row["category_id"] >= 0 else None,
+        "last_transaction_id": int(row["last_transaction_id"]),
+    }
+
+
+class RecurringDetector:
+    """
+    Ismétlődő fizetések (előfizetés, rezsi, albérlet) felismerése.
+    Első lekérdezéskor teljes elemzés; utána írásonként (ledger_events)
+    csak az érintett partner csoportok értékelődnek újra. Más folyamat írása
+    (pl. CLI restore) után - a DB adatverzió alapján - teljes újraelemzés.
+    """
+
+    def __init__(self):
+        self._frame: Optional[pd.DataFrame] = None
+        # (partner_key, direction, currency) -> felismert sorozatok
+        self._series: Dict[Tuple[str, str, str], List[Dict[str, Any]]] = {}
+        self._stale = False
+        self.version: Optional[int] = None
+        self._lock = threading.RLock()
+        self.analyzed_at: Optional[datetime] = None
+        self.incremental_updates = 0
+
+    def _store(self, bands: pd.DataFrame, keys=None) -> None:
+        if keys is not None:
+            for key in keys:
+                self._series.pop(key, None)
+        for row in bands.to_dict("records") if not bands.empty else []:
+            key = (row["partner_key"], row["direction"], row["currency"])
+            self._series.setdefault(key, []).append(_series_to_dict(row))
+
+    def analyze(self, db: Session) -> None:
+        """Teljes újraelemzés a tranzakció táblán"""
+        version = ledger_events.data_version(db)
+        frame = _load_rows(db, select(*LOAD_COLUMNS))
+        bands = detect_series(frame)
+        with self._lock:
+            self._frame = frame
+            self._series = {}
+            self._store(bands)
+            self._stale = False
+            self.version = version
+            self.analyzed_at = datetime.now()
+
+    def series(self, db: Session) -> List[Dict[str, Any]]:
+        version = ledger_events.data_version(db)
+        with self._lock:
+            if self._frame is None or self._stale or self.version != version:
+                # A megosztott elemzés a primary-ről töltődik (a replika késhet)
+                if database.is_replica(db):
+                    with database.SessionLocal() as primary:
+                        self.analyze(primary)
+                else:
+                    self.analyze(db)
+            return [item for items in self._series.values() for item in items]
+
+    def on_change(self, db: Session, change: ledger_events.LedgerChange) -> None:
+        with self._lock:
+            if self._frame is None:
+                return
+            # Csak a saját commit léptette a verziót: inkrementális frissítés
+            version = ledger_events.data_version(db)
+            if change.full_refresh or version != (self.version or 0) + 1:
+                self._stale = True
+                return
+            self.version = version
+
+            frame = self._frame
+            if change.reassigned_categories:
+                category_ids = frame["category_id"].to_numpy().copy()
+                for old_id, new_id in change.reassigned_categories.items():
+                    category_ids[category_ids == old_id] = (
+                        -1 if new_id is None else new_id
+                    )
+                frame = frame.assign(category_id=category_ids)
+                for items in self._series.values():
+                    for item in items:
+                        if item["category_id"] in change.reassigned_categories:
+                            item["category_id"] = change.reassigned_categories[
+                                item["category_id"]
+                            ]
+
+            changed_ids = list(change.deleted_ids) + list(change.upserted_ids)
+            if not changed_ids:
+                self._frame = frame
+                return
+
+            # Érintett csoportok: a módosított sorok régi és új kulcsai
+            old_rows = frame[frame.index.isin(changed_ids)]
+            frame = frame.drop(index=old_rows.index)
+
+            new_frames = []
+            for start in range(0, len(change.upserted_ids), ID_CHUNK_SIZE):
+                ids = change.upserted_ids[start : start + ID_CHUNK_SIZE]
+                new_frames.append(
+                    _compact_frame(
+                        db.execute(
+                            select(*LOAD_COLUMNS).where(Transaction.id.in_(ids))
+                        ).all()
+                    )
+                )
+            if new_frames:
+                frame = pd.concat([frame] + new_frames)
+
+            affected = set(old_rows[GROUP_KEYS].itertuples(index=False, name=None))
+            for new_frame in new_frames:
+                affected |= set(
+                    new_frame[GROUP_KEYS].itertuples(index=False, name=None)
+                )
+
+            if affected:
+                keys = pd.MultiIndex.from_tuples(list(affected), names=GROUP_KEYS)
+                subset = frame[pd.MultiIndex.from_frame(frame[GROUP_KEYS]).isin(keys)]
+                self._store(detect_series(subset), keys=affected)
+
+            self._frame = frame
+            self.incremental_updates += 1
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "analyzed_at": (
+                    self.analyzed_at.isoformat() if self.analyzed_at else None
+                ),
+                "rows": len(self._frame) if self._frame is not None else 0,
+                "series_count": sum(len(items) for items in self._series.values()),
+                "stale": self._stale,
+                "incremental_updates": self.incremental_updates,
+            }
+
+
+detector = RecurringDetector()
+ledger_events.subscribe(detector.on_change)
@@ -0,0 +1,158 @@
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.database import database
+from app.database.models import Category, DataVersion
+from app.services import metrics
+from app.services.upserts import upsert_increment
+
+# Kategóriák és kulcsszavak közös verziója (a szabálymotor mindkettőből épül)
+CATEGORIES = "categories"
+# Tranzakció tábla (ledger) verziója: minden író commit növeli (change_feed),
+# a CLI scriptek (restore, archiválás) is - erre kulcsolnak az eredmény cache-ek
+TRANSACTIONS = "transactions"
+# Árfolyamok (load_fx_rates.py növeli) - a memoizált árfolyamok érvényessége
+FX_RATES = "fx_rates"
+# Keretek: nincs cache-e, a verzió a read-your-writes commit tokenhez kell
+BUDGETS = "budgets"
+
+# Legfeljebb ilyen gyakran kérdezzük le a DB verziószámlálót (másodperc)
+VERSION_CHECK_INTERVAL = float(os.getenv("REFERENCE_VERSION_CHECK_SECONDS", "1"))
+
+
+def read_version(db: Session, name: str) -> int:
+    """Aktuális verzió a data_versions táblából (primary key lookup)"""
+    version = db.execute(
+        select(DataVersion.version).where(DataVersion.name == name)
+    ).scalar()
+    return version or 0
+
+
+def bump_version(db: Session, name: str) -> int:
+    """
+    Verzió növelése a hívó DB tranzakciójában (commit a hívó feladata), atomi
+    upsert-tel: az első sor egyidejű létrehozása sem ütközik. Az új verziót adja.
+    """
+    version = upsert_increment(
+        db,
+        DataVersion.__table__,
+        keys={"name": name},
+        increments={"version": 1},
+        values={"updated_at": datetime.now()},
+        returning="version",
+    )
+    database.remember_version(db, name, version)
+    return version
+
+
+class ReferenceCache:
+    """
+    Ritkán változó referencia adatok (kategóriák, szabálymotor) cache-e.
+    - Érvényesség: a data_versions számláló, így bármely worker írása után
+      minden worker frissít, változatlan adatnál viszont nem kérdez újra.
+    - Single-flight: egyidejű cache miss-ek kulcsonként egy betöltésen osztoznak.
+    A visszaadott értékek megosztottak - a hívók nem módosíthatják őket.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[int, Any]] = {}
+        self._versions: Dict[str, Tuple[float, int]] = {}
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+
+    def current_version(self, db: Session, name: str) -> int:
+        """
+        DB verzió, legfeljebb VERSION_CHECK_INTERVAL-onként lekérdezve. Replika
+        session-ből olvasott (esetleg késő) verzió nem kerül a közös állapotba.
+        """
+        checked = self._versions.get(name)
+        now = time.monotonic()
+        if checked is not None and now - checked[0] < VERSION_CHECK_INTERVAL:
+            return checked[1]
+        version = read_version(db, name)
+        if not database.is_replica(db):
+            self._versions[name] = (now, version)
+        return version
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def get(
+        self,
+        db: Session,
+        key: str,
+        loader: Callable[[Session], Any],
+        name: str = CATEGORIES,
+    ) -> Any:
+        version = self.current_version(db, name)
+
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            self.hits += 1
+            metrics.CACHE_REQUESTS.inc(cache="reference", result="hit")
+            return entry[1]
+
+        with self._key_lock(key):
+            # Amíg a zárra vártunk, egy másik kérés már betölthette
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self.hits += 1
+                metrics.CACHE_REQUESTS.inc(cache="reference", result="hit")
+                return entry[1]
+
+            self.misses += 1
+            metrics.CACHE_REQUESTS.inc(cache="reference", result="miss")
+            value = loader(db)
+            self.loads += 1
+            # Replikáról betöltött érték nem kerül cache-be (késhet a verzióhoz képest)
+            if not database.is_replica(db):
+                self._entries[key] = (version, value)
+            return value
+
+    def invalidate(self, name: str = CATEGORIES) -> None:
+        """Helyi írás után: a következő olvasás azonnal újra lekérdezi a verziót"""
+        self._versions.pop(name, None)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "entries": {
+                key: {"version": version} for key, (version, _) in self._entries.items()
+            },
+            "hits": self.hits,
+            "misses": self.misses,
+            "loads": self.loads,
+        }
+
+
+cache = ReferenceCache()
+
+
+def commit_change(db: Session, name: str = CATEGORIES) -> None:
+    """Referencia adat írás commitolása verzió növeléssel (azonos DB tranzakcióban)"""
+    bump_version(db, name)
+    db.commit()
+    cache.invalidate(name)
+
+
+def load_categories_by_id(db: Session) -> Dict[int, Dict[str, Any]]:
+    return {
+        category_id: {"id": category_id, "name": name, "type": category_type}
+        for category_id, name, category_type in db.execute(
+            select(Category.id, Category.name, Category.type)
+        ).all()
+    }
+
+
+def get_categories_by_id(db: Session) -> Dict[int, Dict[str, Any]]:
+    """Kategóriák id szerint (id, name, type) - cache-elve"""
+    return cache.get(db, "categories_by_id", load_categories_by_id)
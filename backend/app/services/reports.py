@@ -0,0 +1,344 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+from sqlalchemy import case, extract, func, select
+from sqlalchemy.orm import Session
+
+from app.database import database
+from app.database.models import Transaction
+from app.services import archive, ledger_cache, ledger_events, metrics, reference_data
+from app.services.fx import amount_in_base_currency
+
+# Pivot dimenziók és mérőszámok (a mérőszámok az előjeles HUF összegre vonatkoznak)
+DIMENSIONS = ("month", "category", "partner", "account", "direction", "currency")
+MEASURES = ("sum", "count", "avg", "min", "max")
+
+# Dimenzió -> oszlop a belső lekérdezésben (month: év * 100 + hónap egész)
+_DIMENSION_COLUMNS = {
+    "month": "month",
+    "category": "category_id",
+    "partner": "partner_name",
+    "account": "account_number",
+    "direction": "direction",
+    "currency": "currency",
+}
+
+MAX_REPORT_ROWS = 10000
+
+# LRU: (normalizált lekérdezés, adatverzió) -> kész riport
+REPORT_CACHE_SIZE = 256
+
+_cache: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def normalize_query(
+    dimensions: Sequence[str],
+    measures: Sequence[str],
+    subtotals: bool = False,
+    filters: Optional[Dict[str, Any]] = None,
+) -> Tuple:
+    """Cache kulcs: dimenzió sorrend számít, mérőszámok halmaz, üres szűrők nélkül"""
+    if not dimensions:
+        raise ValueError("Legalább egy dimenzió szükséges")
+    unknown = [name for name in dimensions if name not in DIMENSIONS]
+    if unknown or len(set(dimensions)) != len(dimensions):
+        raise ValueError(f"dimensions lehetséges (egyedi) értékei: {list(DIMENSIONS)}")
+    unknown = [name for name in measures if name not in MEASURES]
+    if unknown:
+        raise ValueError(f"measures lehetséges értékei: {list(MEASURES)}")
+
+    return (
+        tuple(dimensions),
+        tuple(name for name in MEASURES if name in measures) or ("sum", "count"),
+        bool(subtotals),
+        tuple(
+            sorted(
+                (key, value)
+                for key, value in (filters or {}).items()
+                if value is not None
+            )
+        ),
+    )
+
+
+def grouping_sets(
+    dimensions: Tuple[str, ...], subtotals: bool
+) -> List[Tuple[str, ...]]:
+    """ROLLUP szemantika: (a, b, c), (a, b), (a), () - részösszegekkel, különben csak a teljes"""
+    if not subtotals:
+        return [dimensions]
+    return [dimensions[:size] for size in range(len(dimensions), -1, -1)]
+
+
+def _ledger(filters: Dict[str, Any]):
+    """Belső lekérdezés: soronként egyszer számolt előjeles HUF összeg + dimenziók"""
+    signed_huf = case(
+        (Transaction.direction == "Bejövő", func.abs(amount_in_base_currency())),
+        else_=-func.abs(amount_in_base_currency()),
+    )
+    ledger = select(
+        (
+            extract("year", Transaction.transaction_date) * 100
+            + extract("month", Transaction.transaction_date)
+        ).label("month"),
+        Transaction.category_id,
+        Transaction.partner_name,
+        Transaction.account_number,
+        Transaction.direction,
+        Transaction.currency,
+        signed_huf.label("value"),
+    )
+    if filters.get("date_from"):
+        ledger = ledger.where(Transaction.transaction_date >= filters["date_from"])
+    if filters.get("date_to"):
+        ledger = ledger.where(Transaction.transaction_date <= filters["date_to"])
+    for name in ("category_id", "direction", "currency", "account_number"):
+        if filters.get(name) is not None:
+            ledger = ledger.where(getattr(Transaction, name) == filters[name])
+    return ledger.subquery()
+
+
+def _aggregates(ledger) -> List[Any]:
+    return [
+        func.sum(ledger.c.value).label("sum"),
+        func.count().label("count"),
+        func.count(ledger.c.value).label("value_count"),
+        func.min(ledger.c.value).label("min"),
+        func.max(ledger.c.value).label("max"),
+    ]
+
+
+def sql_groups(
+    db: Session,
+    dimensions: Tuple[str, ...],
+    subtotals: bool,
+    filters: Dict[str, Any],
+) -> Dict[Tuple[str, ...], List[Dict[str, Any]]]:
+    """
+    Csoportonkénti sum / count / min / max SQL-ből.
+    MSSQL / PostgreSQL: részösszegek egyetlen GROUP BY ROLLUP-pal (GROUPING() jelöli
+    a részösszeg sorokat); SQLite (nincs ROLLUP): grouping set-enként egy GROUP BY.
+    """
+    ledger = _ledger(filters)
+    columns = [ledger.c[_DIMENSION_COLUMNS[name]] for name in dimensions]
+    sets = grouping_sets(dimensions, subtotals)
+    results: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {key: [] for key in sets}
+
+    if subtotals and db.get_bind().dialect.name in ("mssql", "postgresql"):
+        flags = [
+            func.grouping(column).label(f"g_{i}") for i, column in enumerate(columns)
+        ]
+        query = (
+            select(*columns, *flags, *_aggregates(ledger))
+            .select_from(ledger)
+            .group_by(func.rollup(*columns))
+        )
+        for row in db.execute(query).mappings():
+            level = sum(1 for i in range(len(columns)) if not row[f"g_{i}"])
+            results[dimensions[:level]].append(dict(row))
+        return results
+
+    for grouping in sets:
+        group_columns = [ledger.c[_DIMENSION_COLUMNS[name]] for name in grouping]
+        query = select(*group_columns, *_aggregates(ledger)).select_from(ledger)
+        if group_columns:
+            query = query.group_by(*group_columns)
+        results[grouping] = [dict(row) for row in db.execute(query).mappings()]
+    return results
+
+
+def archived_groups(
+    db: Session,
+    dimensions: Tuple[str, ...],
+    subtotals: bool,
+    filters: Dict[str, Any],
+) -> Dict[Tuple[str, ...], List[Dict[str, Any]]]:
+    """Ugyanazok a csoportok az archivált (Parquet) tranzakciókból, pandas-szal"""
+    if not archive.has_archive():
+        return {}
+    raw = archive.read_archived(
+        filters.get("date_from"),
+        filters.get("date_to"),
+        columns=[column.key for column in ledger_cache.LOAD_COLUMNS],
+        category_id=filters.get("category_id"),
+    )
+    for name in ("direction", "currency", "account_number"):
+        if filters.get(name) is not None:
+            raw = raw[raw[name] == filters[name]]
+    if raw.empty:
+        return {}
+
+    frame = ledger_cache.compact_frame(db, raw)
+    dates = pd.to_datetime(raw["transaction_date"].to_numpy())
+    absolute = frame["amount_huf"].abs()
+    work = pd.DataFrame(
+        {
+            "month": (dates.year * 100 + dates.month).to_numpy(),
+            "category_id": frame["category_id"].where(frame["category_id"] >= 0),
+            "partner_name": raw["partner_name"].to_numpy(),
+            "account_number": raw["account_number"].to_numpy(),
+            "direction": raw["direction"].to_numpy(),
+            "currency": raw["currency"].to_numpy(),
+            "value": absolute.where(frame["direction"] == "Bejövő", -absolute),
+        }
+    )
+
+    results = {}
+    for grouping in grouping_sets(dimensions, subtotals):
+        keys = [_DIMENSION_COLUMNS[name] for name in grouping]
+        if keys:
+            grouped = work.groupby(keys, dropna=False)["value"]
+        else:
+            grouped = work.assign(_all=0).groupby("_all")["value"]
+        table = grouped.agg(["sum", "size", "count", "min", "max"]).reset_index()
+        table = table.rename(columns={"size": "count", "count": "value_count"})
+        results[grouping] = [
+            {key: (None if pd.isna(value) else value) for key, value in row.items()}
+            for row in table.drop(columns="_all", errors="ignore").to_dict("records")
+        ]
+    return results
+
+
+def _merge(
+    target: Dict[Tuple, Dict[str, Any]], rows: List[Dict[str, Any]], columns: List[str]
+) -> None:
+    for row in rows:
+        key = tuple(
+            (
+                int(row[column])
+                if column in ("month", "category_id") and row[column] is not None
+                else row[column]
+            )
+            for column in columns
+        )
+        existing = target.get(key)
+        if existing is None:
+            target[key] = {
+                "sum": row["sum"],
+                "count": int(row["count"]),
+                "value_count": int(row["value_count"]),
+                "min": row["min"],
+                "max": row["max"],
+            }
+            continue
+        existing["count"] += int(row["count"])
+        existing["value_count"] += int(row["value_count"])
+        for name, pick in (("sum", None), ("min", min), ("max", max)):
+            values = [v for v in (existing[name], row[name]) if v is not None]
+            if not values:
+                continue
+            existing[name] = sum(values) if pick is None else pick(values)
+
+
+def compute_report(
+    db: Session,
+    dimensions: Tuple[str, ...],
+    measures: Tuple[str, ...],
+    subtotals: bool,
+    filters: Dict[str, Any],
+) -> Dict[str, Any]:
+    sql_results = sql_groups(db, dimensions, subtotals, filters)
+    archived_results = archived_groups(db, dimensions, subtotals, filters)
+
+    rows = []
+    for grouping in grouping_sets(dimensions, subtotals):
+        columns = [_DIMENSION_COLUMNS[name] for name in grouping]
+        merged: Dict[Tuple, Dict[str, Any]] = {}
+        _merge(merged, sql_results.get(grouping, []), columns)
+        _merge(merged, archived_results.get(grouping, []), columns)
+
+        for key in sorted(merged, key=lambda key: [(v is not None, v) for v in key]):
+            values = merged[key]
+            item = {}
+            for name in dimensions:
+                value = key[grouping.index(name)] if name in grouping else None
+                if name == "month" and value is not None:
+                    value = f"{value // 100:04d}-{value % 100:02d}"
+                item[name] = value
+            item["subtotal"] = len(grouping) < len(dimensions)
+            item["level"] = len(grouping)
+
+            for name in measures:
+                if name == "count":
+                    item["count"] = values["count"]
+                elif name == "avg":
+                    item["avg"] = (
+                        round(float(values["sum"]) / values["value_count"], 2)
+                        if values["value_count"] and values["sum"] is not None
+                        else None
+                    )
+                else:
+                    item[name] = (
+                        round(float(values[name]), 2)
+                        if values[name] is not None
+                        else None
+                    )
+            rows.append(item)
+
+    # Részösszegek a teljes részletezés után, szintenként csökkenő sorrendben
+    truncated = len(rows) > MAX_REPORT_ROWS
+    return {
+        "dimensions": list(dimensions),
+        "measures": list(measures),
+        "subtotals": subtotals,
+        "rows": rows[:MAX_REPORT_ROWS],
+        "row_count": min(len(rows), MAX_REPORT_ROWS),
+        "truncated": truncated,
+    }
+
+
+def get_report(
+    db: Session,
+    dimensions: Sequence[str],
+    measures: Sequence[str],
+    subtotals: bool = False,
+    filters: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Pivot riport LRU cache-ből; a kulcs a normalizált lekérdezés + adatverzió
+    (ledger írás, új archív fájl vagy kategória átszámozás után újraszámol).
+    """
+    query_key = normalize_query(dimensions, measures, subtotals, filters)
+    dimensions, measures, subtotals, filter_items = query_key
+    key = (
+        query_key,
+        ledger_events.data_version(db),
+        archive.manifest_revision(),
+    )
+
+    with _cache_lock:
+        report = _cache.get(key)
+        if report is not None:
+            _cache.move_to_end(key)
+    cached = report is not None
+    metrics.CACHE_REQUESTS.inc(cache="reports", result="hit" if cached else "miss")
+
+    if not cached:
+        report = compute_report(db, dimensions, measures, subtotals, dict(filter_items))
+    # Replikáról számolt eredmény nem kerül cache-be (késhet a verzióhoz képest)
+    if not cached and not database.is_replica(db):
+        with _cache_lock:
+            _cache[key] = report
+            _cache.move_to_end(key)
+            while len(_cache) > REPORT_CACHE_SIZE:
+                _cache.popitem(last=False)
+
+    # Kategória nevek kérésenként (átnevezés nem változtatja a ledger verziót)
+    if "category" in dimensions:
+        categories = reference_data.get_categories_by_id(db)
+        rows = [
+            {
+                **row,
+                "category_name": (
+                    categories[row["category"]]["name"]
+                    if row["category"] in categories
+                    else None
+                ),
+            }
+            for row in report["rows"]
+        ]
+        report = {**report, "rows": rows}
+    return {**report, "cached": cached}
@@ -0,0 +1,248 @@
+import re
+from collections import deque
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional
+
+# Szabály mezők: tranzakció dict kulcs -> (bank export oszlop)
+RULE_FIELDS = {
+    "partner_name": "Partner neve",
+    "description": "Közlemény",
+    "partner_account": "Partner számlaszáma/azonosítója",
+    "expense_category": "Költési kategória",
+}
+
+MATCH_TYPES = ("substring", "prefix", "exact", "regex")
+
+DIRECTIONS = ("Bejövő", "Kimenő")
+
+
+@dataclass(frozen=True)
+class Rule:
+    id: int
+    category: Dict[str, Any]
+    pattern: str
+    field: str = "partner_name"
+    match_type: str = "substring"
+    direction: Optional[str] = None
+    min_amount: Optional[Decimal] = None
+    max_amount: Optional[Decimal] = None
+    priority: int = 0
+
+    def accepts(self, direction: Optional[str], amount: Optional[float]) -> bool:
+        """Irány és összeg tartomány feltételek (összeg abszolút értékén)"""
+        if self.direction and direction != self.direction:
+            return False
+        if self.min_amount is not None or self.max_amount is not None:
+            if amount is None:
+                return False
+            absolute = abs(float(amount))
+            if self.min_amount is not None and absolute < float(self.min_amount):
+                return False
+            if self.max_amount is not None and absolute > float(self.max_amount):
+                return False
+        return True
+
+    @property
+    def rank(self):
+        # Magasabb prioritás, majd hosszabb (specifikusabb) minta, majd régebbi szabály
+        return (self.priority, len(self.pattern), -self.id)
+
+
+def normalize_text(field: str, value: Optional[str]) -> str:
+    """Mező érték normalizálása illesztéshez (nagybetű, számlaszámnál elválasztók nélkül)"""
+    if not value:
+        return ""
+    value = str(value).strip().upper()
+    if field == "partner_account":
+        value = re.sub(r"[\s\-]", "", value)
+    return value
+
+
+def normalize_pattern(field: str, match_type: str, pattern: str) -> str:
+    """Minta tárolási alakja: regex változatlan, egyébként a mezővel azonos normalizálás"""
+    pattern = pattern.strip()
+    if match_type == "regex":
+        return pattern
+    return normalize_text(field, pattern)
+
+
+def validate_rule(
+    field: str,
+    match_type: str,
+    pattern: str,
+    direction: Optional[str] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+) -> None:
+    """Szabály validálása, hiba esetén ValueError"""
+    if field not in RULE_FIELDS:
+        raise ValueError(f"field lehetséges értékei: {list(RULE_FIELDS)}")
+    if match_type not in MATCH_TYPES:
+        raise ValueError(f"match_type lehetséges értékei: {list(MATCH_TYPES)}")
+    if direction is not None and direction not in DIRECTIONS:
+        raise ValueError(f"direction lehetséges értékei: {list(DIRECTIONS)}")
+    if (
+        min_amount is not None
+        and max_amount is not None
+        and float(min_amount) > float(max_amount)
+    ):
+        raise ValueError("min_amount nem lehet nagyobb, mint max_amount")
+    if match_type == "regex":
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            raise ValueError(f"Érvénytelen regex: {e}")
+
+
+class AhoCorasick:
+    """Aho-Corasick automata: egy menetben megtalálja az összes részstring mintát"""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[List[int]] = [[]]
+        self.patterns: List[str] = []
+
+        for pattern in patterns:
+            self._add(pattern)
+        self._build()
+
+    def _add(self, pattern: str) -> None:
+        index = len(self.patterns)
+        self.patterns.append(pattern)
+        node = 0
+        for char in pattern:
+            next_node = self.goto[node].get(char)
+            if next_node is None:
+                next_node = len(self.goto)
+                self.goto[node][char] = next_node
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            node = next_node
+        self.output[node].append(index)
+
+    def _build(self) -> None:
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                state = self.fail[node]
+                while state and char not in self.goto[state]:
+                    state = self.fail[state]
+                fallback = self.goto[state].get(char, 0)
+                self.fail[child] = fallback if fallback != child else 0
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def find_all(self, text: str) -> set:
+        """Az összes előforduló minta indexe"""
+        found = set()
+        node = 0
+        goto, fail, output = self.goto, self.fail, self.output
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if output[node]:
+                found.update(output[node])
+        return found
+
+
+class FieldIndex:
+    """Egy mező összes szabálya match type szerint indexelve"""
+
+    def __init__(self, field: str, rules: List[Rule]):
+        self.field = field
+
+        substring_rules: Dict[str, List[Rule]] = {}
+        self.prefix_rules: Dict[str, List[Rule]] = {}
+        self.exact_rules: Dict[str, List[Rule]] = {}
+        self.regex_rules: List[tuple] = []
+
+        for rule in rules:
+            if rule.match_type == "substring":
+                substring_rules.setdefault(rule.pattern, []).append(rule)
+            elif rule.match_type == "prefix":
+                self.prefix_rules.setdefault(rule.pattern, []).append(rule)
+            elif rule.match_type == "exact":
+                self.exact_rules.setdefault(rule.pattern, []).append(rule)
+            elif rule.match_type == "regex":
+                self.regex_rules.append((re.compile(rule.pattern, re.IGNORECASE), rule))
+
+        self.substring_patterns = list(substring_rules)
+        self.substring_rule_lists = [
+            substring_rules[p] for p in self.substring_patterns
+        ]
+        self.automaton = AhoCorasick(self.substring_patterns)
+
+        # Prefix dispatch: csak a ténylegesen előforduló prefix hosszakat nézzük
+        self.prefix_lengths = sorted({len(p) for p in self.prefix_rules})
+
+        # Regex: prioritás szerint csökkenő sorrend (korai kilépéshez)
+        self.regex_rules.sort(key=lambda item: item[1].rank, reverse=True)
+
+    def candidates(self, text: str) -> Iterable[Rule]:
+        if not text:
+            return
+        for index in self.automaton.find_all(text):
+            yield from self.substring_rule_lists[index]
+        for length in self.prefix_lengths:
+            if length > len(text):
+                break
+            yield from self.prefix_rules.get(text[:length], ())
+        yield from self.exact_rules.get(text, ())
+
+    def best_regex(self, text: str, direction, amount, best: Optional[Rule]):
+        for pattern, rule in self.regex_rules:
+            if best is not None and rule.rank <= best.rank:
+                break
+            if rule.accepts(direction, amount) and pattern.search(text):
+                return rule
+        return best
+
+
+class RuleEngine:
+    """
+    Kategorizáló szabályok egyetlen indexelt kiértékelőbe fordítva:
+    mezőnként Aho-Corasick (substring), prefix dispatch, hash (exact) és regex.
+    Soronkénti költség ~ a mezők hossza, nem a szabályok száma.
+    """
+
+    def __init__(self, rules: Iterable[Rule]):
+        rules_by_field: Dict[str, List[Rule]] = {}
+        for rule in rules:
+            rules_by_field.setdefault(rule.field, []).append(rule)
+        self.rule_count = sum(len(r) for r in rules_by_field.values())
+        self.indexes = [
+            FieldIndex(field, field_rules)
+            for field, field_rules in rules_by_field.items()
+        ]
+
+    def match(self, transaction: Dict[str, Any]) -> Optional[Rule]:
+        """Legjobb (legmagasabb rangú) illeszkedő szabály vagy None"""
+        direction = transaction.get("direction")
+        amount = transaction.get("amount")
+        best = None
+
+        texts = []
+        for index in self.indexes:
+            text = normalize_text(index.field, transaction.get(index.field))
+            texts.append(text)
+            for rule in index.candidates(text):
+                if (best is None or rule.rank > best.rank) and rule.accepts(
+                    direction, amount
+                ):
+                    best = rule
+
+        for index, text in zip(self.indexes, texts):
+            if text and index.regex_rules:
+                best = index.best_regex(text, direction, amount, best)
+
+        return best
+
+    def categorize(self, transaction: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        rule = self.match(transaction)
+        # Másolat: a szabálymotor cache-elt, a hívó módosíthatja az eredményt
+        return dict(rule.category) if rule else None
@@ -0,0 +1,265 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import Table, delete, func, insert, select, text, types
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from app.database.models import (
+    Budget,
+    BudgetTotal,
+    Category,
+    CategoryKeyword,
+    Transaction,
+)
+from app.services import budgets, change_feed, reference_data
+
+# Mentett táblák, FK sorrendben (restore ebben, törlés fordított sorrendben)
+SNAPSHOT_TABLES: List[Table] = [
+    Category.__table__,
+    CategoryKeyword.__table__,
+    Budget.__table__,
+    Transaction.__table__,
+]
+# Származtatott, nem mentett táblák (replace módban ürülnek, restore után újraépülnek)
+DEPENDENT_TABLES: List[Table] = [BudgetTotal.__table__]
+
+MANIFEST_NAME = "manifest.json"
+SNAPSHOT_FORMAT_VERSION = 1
+COMPRESSION = "zstd"
+
+READ_BATCH_SIZE = 50000
+INSERT_BATCH_SIZE = 5000
+
+
+def arrow_type(column_type: types.TypeEngine) -> pa.DataType:
+    """SQLAlchemy oszlop típus -> Parquet (Arrow) típus"""
+    if isinstance(column_type, types.Numeric) and not isinstance(
+        column_type, types.Float
+    ):
+        return pa.decimal128(column_type.precision or 18, column_type.scale or 0)
+    if isinstance(column_type, types.Integer):
+        return pa.int64()
+    if isinstance(column_type, types.DateTime):
+        return pa.timestamp("us")
+    if isinstance(column_type, types.Date):
+        return pa.date32()
+    if isinstance(column_type, types.Float):
+        return pa.float64()
+    if isinstance(column_type, types.Boolean):
+        return pa.bool_()
+    return pa.string()
+
+
+def table_schema(table: Table) -> pa.Schema:
+    return pa.schema(
+        [(column.name, arrow_type(column.type)) for column in table.columns]
+    )
+
+
+@contextmanager
+def consistent_connection(engine: Engine) -> Iterator[Connection]:
+    """
+    Olvasó kapcsolat, amelyen belül az összes tábla ugyanazt az állapotot látja:
+    - MSSQL: SNAPSHOT izoláció (ha az adatbázison engedélyezett), különben
+      SERIALIZABLE (konzisztens, de a mentés idejére blokkolja az írókat)
+    - PostgreSQL: REPEATABLE READ (MVCC snapshot)
+    - SQLite: explicit BEGIN (WAL módban az írók nem blokkolódnak)
+    """
+    dialect = engine.dialect.name
+    if dialect == "sqlite":
+        with engine.connect() as conn:
+            conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+            conn.exec_driver_sql("BEGIN")
+            try:
+                yield conn
+            finally:
+                conn.exec_driver_sql("ROLLBACK")
+        return
+
+    if dialect == "mssql":
+        with engine.connect() as probe:
+            snapshot_allowed = probe.execute(
+                text(
+                    "SELECT snapshot_isolation_state FROM sys.databases "
+                    "WHERE name = DB_NAME()"
+                )
+            ).scalar()
+        isolation_level = "SNAPSHOT" if snapshot_allowed else "SERIALIZABLE"
+    else:
+        isolation_level = "REPEATABLE READ"
+
+    with engine.connect() as conn:
+        conn = conn.execution_options(isolation_level=isolation_level)
+        with conn.begin() as transaction:
+            yield conn
+            transaction.rollback()
+
+
+def create_snapshot(
+    engine: Engine, output_dir: str, batch_size: int = READ_BATCH_SIZE
+) -> Dict[str, Any]:
+    """
+    Táblák mentése output_dir/<tábla>.parquet fájlokba (zstd), batch-enként
+    streamelve egyetlen konzisztens olvasó tranzakcióból. A manifest az
+    utolsó lépés, így félbemaradt mentés nem tűnik érvényesnek.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_file = os.path.join(output_dir, MANIFEST_NAME)
+    if os.path.exists(manifest_file):
+        os.remove(manifest_file)
+
+    started = time.perf_counter()
+    tables = {}
+    with consistent_connection(engine) as conn:
+        for table in SNAPSHOT_TABLES:
+            schema = table_schema(table)
+            file_name = f"{table.name}.parquet"
+            row_count = 0
+            result = conn.execute(
+                select(table)
+                .order_by(table.c.id)
+                .execution_options(yield_per=batch_size)
+            )
+            with pq.ParquetWriter(
+                os.path.join(output_dir, file_name), schema, compression=COMPRESSION
+            ) as writer:
+                for partition in result.partitions():
+                    columns = list(zip(*partition))
+                    writer.write_table(
+                        pa.Table.from_arrays(
+                            [
+                                pa.array(values, type=field.type)
+                                for values, field in zip(columns, schema)
+                            ],
+                            schema=schema,
+                        )
+                    )
+                    row_count += len(partition)
+            tables[table.name] = {"file": file_name, "rows": row_count}
+
+    manifest = {
+        "version": SNAPSHOT_FORMAT_VERSION,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "source_dialect": engine.dialect.name,
+        "tables": tables,
+    }
+    with open(manifest_file, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    return {**manifest, "elapsed_seconds": round(time.perf_counter() - started, 2)}
+
+
+def read_manifest(snapshot_dir: str) -> Dict[str, Any]:
+    manifest_file = os.path.join(snapshot_dir, MANIFEST_NAME)
+    if not os.path.exists(manifest_file):
+        raise ValueError(f"Hiányzó vagy befejezetlen mentés: {manifest_file}")
+    with open(manifest_file, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != SNAPSHOT_FORMAT_VERSION:
+        raise ValueError(f"Nem támogatott mentés verzió: {manifest.get('version')}")
+    return manifest
+
+
+def _set_identity_insert(db: Session, table: Table, enabled: bool) -> None:
+    """MSSQL: explicit id értékek beszúrása IDENTITY oszlopba"""
+    if db.get_bind().dialect.name == "mssql":
+        db.execute(
+            text(f"SET IDENTITY_INSERT {table.name} {'ON' if enabled else 'OFF'}")
+        )
+
+
+def _reset_sequence(db: Session, table: Table) -> None:
+    """PostgreSQL: a serial szekvencia folytatása a legnagyobb betöltött id után"""
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(
+            text(
+                f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                f"COALESCE((SELECT MAX(id) FROM {table.name}), 0) + 1, false)"
+            )
+        )
+
+
+def restore_snapshot(
+    db: Session,
+    snapshot_dir: str,
+    replace: bool = False,
+    batch_size: int = INSERT_BATCH_SIZE,
+) -> Dict[str, Any]:
+    """
+    Mentés visszatöltése bulk INSERT-ekkel (executemany, eredeti id-kkal),
+    egyetlen DB tranzakcióban: hiba esetén a cél adatbázis változatlan marad.
+    replace=False esetén csak üres táblákba tölt.
+    """
+    manifest = read_manifest(snapshot_dir)
+    started = time.perf_counter()
+
+    existing = {
+        table.name: db.execute(select(func.count()).select_from(table)).scalar()
+        for table in SNAPSHOT_TABLES
+    }
+    if any(existing.values()) and not replace:
+        raise ValueError(
+            f"A cél táblák nem üresek ({existing}) - replace móddal felülírható"
+        )
+    # Régebbi mentésből hiányzó tábla (pl. budgets): a meglévő sorok nem törölhetők
+    missing = [
+        table.name for table in SNAPSHOT_TABLES if table.name not in manifest["tables"]
+    ]
+    not_empty = [name for name in missing if existing[name]]
+    if not_empty:
+        raise ValueError(
+            f"A mentés nem tartalmazza: {not_empty} - a meglévő adatok elvesznének"
+        )
+
+    try:
+        for table in reversed(SNAPSHOT_TABLES + DEPENDENT_TABLES):
+            db.execute(delete(table))
+
+        loaded = {}
+        for table in SNAPSHOT_TABLES:
+            if table.name in missing:
+                continue
+            entry = manifest["tables"][table.name]
+            parquet_file = pq.ParquetFile(os.path.join(snapshot_dir, entry["file"]))
+            column_names = [
+                name for name in parquet_file.schema_arrow.names if name in table.c
+            ]
+
+            _set_identity_insert(db, table, True)
+            row_count = 0
+            for batch in parquet_file.iter_batches(
+                batch_size=batch_size, columns=column_names
+            ):
+                rows = batch.to_pylist()
+                if rows:
+                    db.execute(insert(table), rows)
+                    row_count += len(rows)
+            _set_identity_insert(db, table, False)
+            _reset_sequence(db, table)
+
+            if row_count != entry["rows"]:
+                raise ValueError(
+                    f"{table.name}: {row_count} sor betöltve, a manifest szerint {entry['rows']}"
+                )
+            loaded[table.name] = row_count
+
+        # Származtatott adatok: keret összesítők és a referencia cache verziója
+        budgets.rebuild_totals(db)
+        change_feed.record_reset(db)
+        reference_data.commit_change(db)
+    except Exception:
+        db.rollback()
+        raise
+
+    return {
+        "snapshot_created_at": manifest["created_at"],
+        "tables": loaded,
+        "elapsed_seconds": round(time.perf_counter() - started, 2),
+    }
@@ -0,0 +1,188 @@
+import io
+import os
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import openpyxl
+import pandas as pd
+
+# Opcionális függőségek: calamine (Rust, leggyorsabb), xlrd (régi .xls)
+try:
+    import python_calamine
+except ImportError:  # pragma: no cover
+    python_calamine = None
+
+try:
+    import xlrd
+except ImportError:  # pragma: no cover
+    xlrd = None
+
+# Fájl formátum felismerés a tartalom alapján (a kiterjesztés nem megbízható)
+ZIP_MAGIC = b"PK\x03\x04"  # .xlsx (Office Open XML)
+OLE2_MAGIC = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"  # .xls (BIFF)
+
+# Kényszerített olvasó (pl. SPREADSHEET_READER=openpyxl), különben automatikus
+READER_OVERRIDE = os.getenv("SPREADSHEET_READER")
+
+
+def detect_format(content: bytes) -> str:
+    if content.startswith(ZIP_MAGIC):
+        return "xlsx"
+    if content.startswith(OLE2_MAGIC):
+        return "xls"
+    raise ValueError("Nem felismerhető Excel formátum (csak .xlsx és .xls)")
+
+
+def _read_calamine(content: bytes) -> List[Sequence[Any]]:
+    workbook = python_calamine.CalamineWorkbook.from_filelike(io.BytesIO(content))
+    return workbook.get_sheet_by_index(0).to_python(skip_empty_area=False)
+
+
+def _read_openpyxl(content: bytes) -> List[Sequence[Any]]:
+    # read_only: soronként streamelt XML feldolgozás, cella objektumok nélkül
+    workbook = openpyxl.load_workbook(
+        io.BytesIO(content), read_only=True, data_only=True
+    )
+    try:
+        return list(workbook.worksheets[0].iter_rows(values_only=True))
+    finally:
+        workbook.close()
+
+
+def _read_xlrd(content: bytes) -> List[Sequence[Any]]:
+    book = xlrd.open_workbook(file_contents=content, on_demand=True)
+    sheet = book.sheet_by_index(0)
+    rows = []
+    for index in range(sheet.nrows):
+        row = []
+        for cell_type, value in zip(sheet.row_types(index), sheet.row_values(index)):
+            if cell_type == xlrd.XL_CELL_DATE:
+                value = xlrd.xldate_as_datetime(value, book.datemode)
+            elif cell_type == xlrd.XL_CELL_BOOLEAN:
+                value = bool(value)
+            elif cell_type in (
+                xlrd.XL_CELL_EMPTY,
+                xlrd.XL_CELL_BLANK,
+                xlrd.XL_CELL_ERROR,
+            ):
+                value = None
+            row.append(value)
+        rows.append(row)
+    return rows
+
+
+@dataclass(frozen=True)
+class SpreadsheetReader:
+    name: str
+    formats: Sequence[str]
+    read_rows: Callable[[bytes], List[Sequence[Any]]]
+    available: bool
+
+
+# Sebesség szerinti sorrend (bench_spreadsheet.py): az első elérhető, a formátumot
+# támogató olvasó fut
+READERS: List[SpreadsheetReader] = [
+    SpreadsheetReader(
+        "calamine", ("xlsx", "xls"), _read_calamine, python_calamine is not None
+    ),
+    SpreadsheetReader("openpyxl", ("xlsx",), _read_openpyxl, True),
+    SpreadsheetReader("xlrd", ("xls",), _read_xlrd, xlrd is not None),
+]
+
+
+def available_readers() -> Dict[str, List[str]]:
+    """Elérhető olvasók formátumonként, választási sorrendben"""
+    result: Dict[str, List[str]] = {}
+    for reader in READERS:
+        if reader.available:
+            for file_format in reader.formats:
+                result.setdefault(file_format, []).append(reader.name)
+    return result
+
+
+def select_reader(file_format: str, engine: Optional[str] = None) -> SpreadsheetReader:
+    engine = engine or READER_OVERRIDE
+    candidates = [
+        reader
+        for reader in READERS
+        if reader.available
+        and file_format in reader.formats
+        and (engine is None or reader.name == engine)
+    ]
+    if not candidates:
+        if engine:
+            raise ValueError(
+                f"A(z) '{engine}' olvasó nem elérhető {file_format} fájlhoz"
+            )
+        raise ValueError(f"Nincs telepített olvasó {file_format} fájlhoz (pl. xlrd)")
+    return candidates[0]
+
+
+def _normalize_cell(value: Any) -> Any:
+    """
+    Backend-független cella érték (a pandas read_excel konverziói szerint):
+    üres -> None, egész értékű float -> int, date -> datetime
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, float):
+        return int(value) if value.is_integer() else value
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return datetime(value.year, value.month, value.day)
+    return value
+
+
+def rows_to_frame(
+    rows: Sequence[Sequence[Any]], columns: Optional[Sequence[str]] = None
+) -> pd.DataFrame:
+    """
+    Nyers sorok -> DataFrame: első nem üres sor a fejléc (szóközök nélkül), üres
+    sorok és fejléc nélküli üres oszlopok nélkül; a columns oszlopok elöl, ebben
+    a sorrendben, az ismeretlen oszlopok utánuk (a validáció jelzi őket).
+    """
+    cleaned = [[_normalize_cell(value) for value in row] for row in rows]
+    cleaned = [row for row in cleaned if any(value is not None for value in row)]
+    if not cleaned:
+        return pd.DataFrame(columns=list(columns or []))
+
+    header, body = cleaned[0], cleaned[1:]
+    width = max(len(row) for row in cleaned)
+    header = header + [None] * (width - len(header))
+    body = [row + [None] * (width - len(row)) for row in body]
+
+    names = []
+    for index, name in enumerate(header):
+        name = f"Unnamed: {index}" if name is None else str(name).strip()
+        # Ismétlődő fejléc: pandas-szerű .1, .2 szuffix
+        unique_name, counter = name, 0
+        while unique_name in names:
+            counter += 1
+            unique_name = f"{name}.{counter}"
+        names.append(unique_name)
+
+    frame = pd.DataFrame(body, columns=names)
+    empty_unnamed = [
+        name
+        for index, name in enumerate(names)
+        if header[index] is None and frame[name].isna().all()
+    ]
+    frame = frame.drop(columns=empty_unnamed)
+
+    if columns:
+        ordered = [name for name in columns if name in frame.columns]
+        frame = frame[ordered + [name for name in frame.columns if name not in ordered]]
+    return frame
+
+
+def read_statement(
+    content: bytes,
+    columns: Optional[Sequence[str]] = None,
+    engine: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    Excel kivonat első munkalapja DataFrame-ként a leggyorsabb elérhető olvasóval.
+    Az eredmény olvasótól független (azonos típusok és oszlop sorrend).
+    """
+    reader = select_reader(detect_format(content), engine)
+    return rows_to_frame(reader.read_rows(content), columns)
@@ -0,0 +1,12 @@
+import json
+from typing import Any
+
+# Proxy-k (nginx) ne puffereljék a stream-et, böngésző ne cache-elje
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+SSE_MEDIA_TYPE = "text/event-stream"
+
+
+def sse_event(event: str, data: Any) -> str:
+    """Egy Server-Sent Events üzenet (event + egysoros JSON data)"""
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"event: {event}\ndata: {payload}\n\n"
@@ -0,0 +1,156 @@
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import case, func, update
+from sqlalchemy.orm import Session
+
+from app.database.models import Transaction
+from app.services import budgets, reference_data
+from app.services.deduplication import compute_fingerprint
+
+# Soronként módosítható mezők (a hiányzó kulcs = változatlan, null = törlés)
+PATCH_FIELDS = ("category_id", "partner_name", "description", "expense_category")
+
+MAX_BATCH_SIZE = 5000
+
+# Egy UPDATE utasításban kezelt sorok: soronként mezőnként 2 paraméter (id + érték),
+# 4 mező + fingerprint + IN lista -> max. 11 paraméter / sor (MSSQL: max 2100)
+UPDATE_CHUNK_SIZE = 150
+
+# Szöveges mezők: null vagy str, legfeljebb az oszlop hosszáig
+STRING_FIELDS = ("partner_name", "description", "expense_category")
+
+
+def _is_int(value: Any) -> bool:
+    # A bool az int leszármazottja, de id-ként / kategóriaként nem elfogadható
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def validate_changes(db: Session, changes: List[Dict[str, Any]]) -> None:
+    """
+    Payload ellenőrzés: id kötelező egész szám és egyedi, csak ismert mezők
+    megfelelő típussal (category_id: egész vagy null, szöveges mezők: str vagy
+    null az oszlop hosszáig), létező kategóriák. Hiba esetén ValueError.
+    """
+    if len(changes) > MAX_BATCH_SIZE:
+        raise ValueError(f"Legfeljebb {MAX_BATCH_SIZE} sor módosítható egyszerre")
+
+    seen = set()
+    category_ids = set()
+    for change in changes:
+        if not isinstance(change, dict):
+            raise ValueError("Minden sornak objektumnak kell lennie")
+        transaction_id = change.get("id")
+        if not _is_int(transaction_id):
+            raise ValueError("Minden sorhoz egész szám id szükséges")
+        if transaction_id in seen:
+            raise ValueError(f"Ismétlődő id: {transaction_id}")
+        seen.add(transaction_id)
+
+        unknown = set(change) - set(PATCH_FIELDS) - {"id"}
+        if unknown:
+            raise ValueError(
+                f"Nem módosítható mezők: {sorted(unknown)} "
+                f"(lehetséges: {list(PATCH_FIELDS)})"
+            )
+
+        category_id = change.get("category_id")
+        if category_id is not None:
+            if not _is_int(category_id):
+                raise ValueError(
+                    f"A category_id egész szám vagy null lehet (id: {transaction_id})"
+                )
+            category_ids.add(category_id)
+
+        for field in STRING_FIELDS:
+            value = change.get(field)
+            if value is None:
+                continue
+            if not isinstance(value, str):
+                raise ValueError(
+                    f"A(z) {field} szöveg vagy null lehet (id: {transaction_id})"
+                )
+            max_length = Transaction.__table__.c[field].type.length
+            if max_length is not None and len(value) > max_length:
+                raise ValueError(
+                    f"A(z) {field} legfeljebb {max_length} karakter lehet "
+                    f"(id: {transaction_id})"
+                )
+
+    missing = category_ids - set(reference_data.get_categories_by_id(db))
+    if missing:
+        raise ValueError(f"Kategória nem található: {sorted(missing)}")
+
+
+def _case(values: Dict[int, Any], column) -> Optional[Any]:
+    """CASE id WHEN ... THEN új érték ELSE jelenlegi érték END (csak érintett soroknál)"""
+    if not values:
+        return None
+    return case(values, value=Transaction.id, else_=column)
+
+
+def apply_changes(db: Session, changes: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Soronként eltérő módosítások halmaz alapon: chunk-onként egyetlen
+    UPDATE ... SET mező = CASE id WHEN ... END WHERE id IN (...) utasítás,
+    a módosított sorokat RETURNING / OUTPUT adja vissza (nincs újraolvasás).
+    Commit a hívó feladata.
+    """
+    # Előző állapot: keret összesítőkhöz és fingerprint újraszámoláshoz
+    current = {
+        row.id: row
+        for row in budgets.load_rows(db, [change["id"] for change in changes])
+    }
+    found = [change for change in changes if change["id"] in current]
+    not_found = [change["id"] for change in changes if change["id"] not in current]
+
+    # Kategória változások célkategóriánként a havi összesítőkbe
+    by_category: Dict[Optional[int], List[Any]] = {}
+    for change in found:
+        if "category_id" in change:
+            by_category.setdefault(change["category_id"], []).append(
+                current[change["id"]]
+            )
+    for category_id, rows in by_category.items():
+        budgets.record_category_change(db, rows, category_id)
+
+    updated = []
+    for start in range(0, len(found), UPDATE_CHUNK_SIZE):
+        chunk = found[start : start + UPDATE_CHUNK_SIZE]
+
+        values = {}
+        for field in PATCH_FIELDS:
+            expression = _case(
+                {c["id"]: c[field] for c in chunk if field in c},
+                getattr(Transaction, field),
+            )
+            if expression is not None:
+                values[field] = expression
+
+        fingerprints = {
+            c["id"]: compute_fingerprint(
+                current[c["id"]].transaction_date,
+                current[c["id"]].amount,
+                c["partner_name"],
+            )
+            for c in chunk
+            if "partner_name" in c
+        }
+        if fingerprints:
+            values["fingerprint"] = _case(fingerprints, Transaction.fingerprint)
+        if not values:
+            continue
+
+        values["updated_at"] = func.now()
+        result = db.execute(
+            update(Transaction)
+            .where(Transaction.id.in_([c["id"] for c in chunk]))
+            .values(**values)
+            .returning(*Transaction.__table__.columns)
+            .execution_options(synchronize_session=False)
+        )
+        updated.extend(result.all())
+
+    return {
+        "updated": sorted(updated, key=lambda row: row.id),
+        "not_found": not_found,
+    }
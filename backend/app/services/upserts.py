@@ -0,0 +1,120 @@
+from typing import Any, Dict, Optional
+
+from sqlalchemy import Table, bindparam, insert, select, text, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+
+def upsert_increment(
+    db: Session,
+    table: Table,
+    keys: Dict[str, Any],
+    increments: Dict[str, Any],
+    values: Optional[Dict[str, Any]] = None,
+    returning: Optional[str] = None,
+) -> Any:
+    """
+    Számláló sor atomi növelése: increments oszlopok += delta, nem létező sornál
+    INSERT a delta kezdőértékkel, values oszlopok mindkét esetben felülírva.
+    Egyetlen utasítás (MSSQL: MERGE WITH (HOLDLOCK), SQLite / PostgreSQL:
+    INSERT ... ON CONFLICT DO UPDATE), így két egyidejű első írás sem ütközik
+    a unique indexen. returning: a megadott oszlop új értéke.
+    """
+    values = values or {}
+    dialect = db.get_bind().dialect.name
+
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+
+        statement = dialect_insert(table).values({**keys, **increments, **values})
+        statement = statement.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={
+                **{
+                    name: table.c[name] + statement.excluded[name]
+                    for name in increments
+                },
+                **{name: statement.excluded[name] for name in values},
+            },
+        )
+        if returning:
+            return db.execute(statement.returning(table.c[returning])).scalar()
+        db.execute(statement)
+        return None
+
+    if dialect == "mssql":
+        return _merge_mssql(db, table, keys, increments, values, returning)
+
+    # Egyéb backend: UPDATE, nem létező sornál INSERT savepoint-ban; ha közben
+    # egy másik tranzakció beszúrta, a unique index hibája után újra UPDATE
+    def apply_update():
+        return db.execute(
+            update(table)
+            .where(*[table.c[name] == value for name, value in keys.items()])
+            .values(
+                **{name: table.c[name] + delta for name, delta in increments.items()},
+                **values,
+            )
+        )
+
+    if apply_update().rowcount == 0:
+        try:
+            with db.begin_nested():
+                db.execute(insert(table).values({**keys, **increments, **values}))
+        except IntegrityError:
+            apply_update()
+    if returning:
+        return db.execute(
+            select(table.c[returning]).where(
+                *[table.c[name] == value for name, value in keys.items()]
+            )
+        ).scalar()
+    return None
+
+
+def _merge_mssql(
+    db: Session,
+    table: Table,
+    keys: Dict[str, Any],
+    increments: Dict[str, Any],
+    values: Dict[str, Any],
+    returning: Optional[str],
+) -> Any:
+    """MERGE ... USING (SELECT ...) ON kulcs oszlopok - egy round trip"""
+    dialect = db.get_bind().dialect
+    columns = {**keys, **increments, **values}
+
+    source = []
+    params = []
+    for name, value in columns.items():
+        column_type = table.c[name].type
+        source.append(
+            f"CAST(:p_{name} AS {column_type.compile(dialect=dialect)}) AS {name}"
+        )
+        params.append(bindparam(f"p_{name}", value=value, type_=column_type))
+
+    on_clause = " AND ".join(f"target.{name} = source.{name}" for name in keys)
+    set_clause = ", ".join(
+        [f"{name} = target.{name} + source.{name}" for name in increments]
+        + [f"{name} = source.{name}" for name in values]
+    )
+    column_list = ", ".join(columns)
+    output = f"OUTPUT inserted.{returning}" if returning else ""
+
+    statement = text(f"""
+        MERGE INTO {table.name} WITH (HOLDLOCK) AS target
+        USING (SELECT {', '.join(source)}) AS source
+        ON {on_clause}
+        WHEN MATCHED THEN
+            UPDATE SET {set_clause}
+        WHEN NOT MATCHED THEN
+            INSERT ({column_list})
+            VALUES ({', '.join(f'source.{name}' for name in columns)})
+        {output};
+        """).bindparams(*params)
+
+    result = db.execute(statement)
+    return result.scalar() if returning else None
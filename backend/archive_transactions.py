@@ -0,0 +1,64 @@
+# archive_transactions.py
+# Régi tranzakciók áthelyezése a transactions táblából tömörített, havi
+# partíciójú Parquet fájlokba (ARCHIVE_DIR, alapértelmezés: data/archive).
+#
+# Használat:
+#   python archive_transactions.py --keep-months 24
+#   python archive_transactions.py --before 2023-01-01 --dry-run
+#
+# Az archivált sorokat a lista / keresés / export / analytics végpontok
+# továbbra is látják, a duplikáció szűrés is figyelembe veszi őket.
+import argparse
+import sys
+from datetime import date, datetime
+
+from app.database.database import SessionLocal
+from app.services import archive
+
+
+def cutoff_from_months(keep_months: int, today: date) -> date:
+    """Az aktuális hónap előtti keep_months teljes hónap marad a hot táblában"""
+    month_index = today.year * 12 + today.month - 1 - keep_months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tranzakciók archiválása Parquet-be")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--before", help="Ennél korábbi tranzakciók (YYYY-MM-DD)")
+    group.add_argument(
+        "--keep-months", type=int, help="Ennyi hónap marad a hot táblában"
+    )
+    parser.add_argument("--batch-size", type=int, default=archive.ARCHIVE_BATCH_SIZE)
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Csak számolás, írás nélkül"
+    )
+    args = parser.parse_args()
+
+    if args.before:
+        cutoff = datetime.fromisoformat(args.before).date()
+    else:
+        cutoff = cutoff_from_months(args.keep_months, date.today())
+
+    db = SessionLocal()
+    try:
+        result = archive.archive_transactions(
+            db, cutoff, batch_size=args.batch_size, dry_run=args.dry_run
+        )
+    except Exception as e:
+        print(f"❌ Archiving failed: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+    prefix = "[dry-run] " if args.dry_run else ""
+    print(
+        f"✅ {prefix}{result['archived_count']} transactions before {cutoff} "
+        f"-> {archive.ARCHIVE_DIR}"
+    )
+    for path in result["files"]:
+        print(f"  - {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# backfill_fingerprints.py
+# Meglévő tranzakciók fingerprint oszlopának kitöltése (upgrade_schema.py után futtatandó).
+# Batch-enként halad id szerint; a már létező fingerprint-tel ütköző (azonos napi,
+# összegű és partnerű) sorok a következő szabad előfordulási sorszámot kapják,
+# ahogy egy kivonaton belül ismétlődő tételek feltöltéskor.
+from sqlalchemy import bindparam, select, update
+
+from app.database.database import SessionLocal
+from app.database.models import Transaction
+from app.services.deduplication import compute_fingerprint, find_existing_fingerprints
+
+BATCH_SIZE = 1000
+
+
+def backfill_fingerprints():
+    db = SessionLocal()
+    updated = 0
+    numbered = []
+
+    try:
+        last_id = 0
+        while True:
+            rows = db.execute(
+                select(
+                    Transaction.id,
+                    Transaction.transaction_date,
+                    Transaction.amount,
+                    Transaction.partner_name,
+                )
+                .where(Transaction.fingerprint.is_(None), Transaction.id > last_id)
+                .order_by(Transaction.id)
+                .limit(BATCH_SIZE)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            fingerprints = {
+                row.id: compute_fingerprint(
+                    row.transaction_date, row.amount, row.partner_name
+                )
+                for row in rows
+            }
+            existing = find_existing_fingerprints(db, fingerprints.values())
+
+            params = []
+            for row in rows:
+                fingerprint = fingerprints[row.id]
+                occurrence = 1
+                while fingerprint in existing:
+                    occurrence += 1
+                    fingerprint = compute_fingerprint(
+                        row.transaction_date, row.amount, row.partner_name, occurrence
+                    )
+                    existing.update(find_existing_fingerprints(db, [fingerprint]))
+                if occurrence > 1:
+                    numbered.append((row.id, occurrence))
+                existing[fingerprint] = row.id
+                params.append({"b_id": row.id, "b_fingerprint": fingerprint})
+
+            if params:
+                db.connection().execute(
+                    update(Transaction.__table__)
+                    .where(Transaction.__table__.c.id == bindparam("b_id"))
+                    .values(fingerprint=bindparam("b_fingerprint")),
+                    params,
+                )
+            db.commit()
+            updated += len(params)
+            print(f"  ... {updated} transactions processed")
+
+        print(f"✅ Fingerprint backfill done: {updated} transactions updated")
+        if numbered:
+            print(
+                f"ℹ️  {len(numbered)} repeated transactions got an occurrence number:"
+            )
+            for transaction_id, occurrence in numbered[:20]:
+                print(f"  - id {transaction_id} (occurrence {occurrence})")
+
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Fingerprint backfill failed: {e}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    backfill_fingerprints()
@@ -0,0 +1,133 @@
+# bench_spreadsheet.py
+# Excel olvasó backend-ek (calamine / openpyxl / xlrd) összehasonlítása ugyanazon
+# a szintetikus bankkivonaton: átlagos / legjobb beolvasási idő, sor / mp, és
+# annak ellenőrzése, hogy minden backend azonos DataFrame-et ad.
+#
+# Használat:
+#   python bench_spreadsheet.py --rows 20000 --repeat 3
+# Az .xls méréshez az xlwt csomag kell (csak a teszt fájl generálásához).
+import argparse
+import io
+import random
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+import openpyxl
+
+from app.services import spreadsheet
+from loadtest import EXPORT_COLUMNS, random_transaction
+
+try:
+    import xlwt
+except ImportError:
+    xlwt = None
+
+
+def statement_rows(rows: int, seed: int) -> List[List[Any]]:
+    """Bankkivonat sorok valódi dátum cellákkal (ahogy a bank exportál)"""
+    rng = random.Random(seed)
+    records = []
+    for _ in range(rows):
+        t = random_transaction(rng)
+        records.append(
+            [
+                datetime.fromisoformat(t["transaction_date"]),
+                datetime.fromisoformat(t["booking_date"]),
+                t["transaction_type"],
+                t["direction"],
+                t["partner_name"],
+                t["partner_account"],
+                t["expense_category"],
+                t["description"],
+                t["account_name"],
+                t["account_number"],
+                t["amount"],
+                t["currency"],
+            ]
+        )
+    return records
+
+
+def make_xlsx(records: List[List[Any]]) -> bytes:
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(EXPORT_COLUMNS)
+    for record in records:
+        sheet.append(record)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def make_xls(records: List[List[Any]]) -> bytes:
+    workbook = xlwt.Workbook(encoding="utf-8")
+    sheet = workbook.add_sheet("Kivonat")
+    date_style = xlwt.easyxf(num_format_str="YYYY-MM-DD")
+    for column, name in enumerate(EXPORT_COLUMNS):
+        sheet.write(0, column, name)
+    for row, record in enumerate(records, start=1):
+        for column, value in enumerate(record):
+            if isinstance(value, datetime):
+                sheet.write(row, column, value, date_style)
+            else:
+                sheet.write(row, column, value)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def bench(content: bytes, engine: str, repeat: int) -> Dict[str, Any]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        frame = spreadsheet.read_statement(content, EXPORT_COLUMNS, engine=engine)
+        timings.append(time.perf_counter() - started)
+    return {
+        "frame": frame,
+        "mean": sum(timings) / len(timings),
+        "best": min(timings),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Excel olvasó backend benchmark")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    records = statement_rows(args.rows, args.seed)
+    files = {"xlsx": make_xlsx(records)}
+    if xlwt is not None and args.rows < 65536:
+        files["xls"] = make_xls(records)
+    else:
+        print("ℹ️  .xls kihagyva (xlwt nincs telepítve vagy túl sok sor)")
+
+    available = spreadsheet.available_readers()
+    for file_format, content in files.items():
+        engines = available.get(file_format, [])
+        print(
+            f"\n{file_format}: {args.rows} sor, {len(content) / 1024:.0f} KB "
+            f"(automatikus választás: {engines[0] if engines else '-'})"
+        )
+        print(
+            f"{'backend':<10} {'átlag (s)':>10} {'legjobb (s)':>12} {'sor/s':>10}  azonos"
+        )
+
+        reference = None
+        for engine in engines:
+            result = bench(content, engine, args.repeat)
+            if reference is None:
+                reference = result["frame"]
+            identical = result["frame"].equals(reference) and list(
+                result["frame"].dtypes
+            ) == list(reference.dtypes)
+            print(
+                f"{engine:<10} {result['mean']:>10.3f} {result['best']:>12.3f} "
+                f"{args.rows / result['best']:>10.0f}  {'✅' if identical else '❌'}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# load_fx_rates.py
+# Árfolyamok bulk betöltése helyi CSV / XLSX fájlból az fx_rates táblába.
+#
+# Használat: python load_fx_rates.py rates.csv
+#
+# Elfogadott formátumok:
+#   - hosszú:  date,currency,rate          (egy sor = egy deviza egy napra)
+#   - széles:  date,EUR,USD,...            (pl. MNB export, deviza oszloponként)
+import sys
+
+import pandas as pd
+from sqlalchemy import delete, insert
+
+from app.database.database import SessionLocal
+from app.database.models import FxRate
+from app.services import reference_data
+from app.services.budgets import rebuild_totals
+from app.services.fx import BASE_CURRENCY
+
+INSERT_BATCH_SIZE = 1000
+
+
+def read_rates(path: str) -> pd.DataFrame:
+    if path.lower().endswith((".xlsx", ".xls")):
+        df = pd.read_excel(path)
+    else:
+        df = pd.read_csv(path)
+
+    df.columns = [str(col).strip().lower() for col in df.columns]
+    if "date" not in df.columns:
+        raise ValueError("Hiányzó 'date' oszlop")
+
+    # Széles formátum -> hosszú formátum
+    if "currency" not in df.columns:
+        df = df.melt(id_vars=["date"], var_name="currency", value_name="rate")
+
+    df = df.dropna(subset=["date", "currency", "rate"])
+    df["rate_date"] = pd.to_datetime(df["date"]).dt.date
+    df["currency"] = df["currency"].astype(str).str.strip().str.upper()
+    df["rate_to_huf"] = pd.to_numeric(
+        df["rate"].astype(str).str.replace(",", ".", regex=False)
+    )
+    df = df[df["currency"] != BASE_CURRENCY]
+
+    return df.drop_duplicates(subset=["currency", "rate_date"], keep="last")[
+        ["rate_date", "currency", "rate_to_huf"]
+    ]
+
+
+def load_fx_rates(path: str):
+    db = SessionLocal()
+
+    try:
+        rates = read_rates(path)
+        if rates.empty:
+            print("Nothing to load.")
+            return
+
+        # Átfedő időszak felülírása devizánként (DELETE tartomány + bulk INSERT)
+        for currency, group in rates.groupby("currency"):
+            db.execute(
+                delete(FxRate).where(
+                    FxRate.currency == currency,
+                    FxRate.rate_date >= group["rate_date"].min(),
+                    FxRate.rate_date <= group["rate_date"].max(),
+                )
+            )
+
+        records = rates.to_dict("records")
+        for start in range(0, len(records), INSERT_BATCH_SIZE):
+            db.execute(insert(FxRate), records[start : start + INSERT_BATCH_SIZE])
+
+        # Devizás tételek HUF összegei változhattak - keret összesítők újraszámolása
+        rebuild_totals(db)
+        # Az API workerek árfolyam cache-e és a HUF alapú eredmény cache-ek
+        # (riportok, ledger cache) a verzió alapján frissülnek
+        reference_data.bump_version(db, reference_data.FX_RATES)
+        reference_data.bump_version(db, reference_data.TRANSACTIONS)
+        db.commit()
+
+        print(f"✅ Loaded {len(records)} FX rates")
+        for currency, group in rates.groupby("currency"):
+            print(
+                f"  - {currency}: {len(group)} rates "
+                f"({group['rate_date'].min()} - {group['rate_date'].max()})"
+            )
+
+    except Exception as e:
+        db.rollback()
+        print(f"❌ FX rate loading failed: {e}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python load_fx_rates.py <rates.csv|rates.xlsx>")
+        sys.exit(1)
+    load_fx_rates(sys.argv[1])
@@ -0,0 +1,428 @@
+# loadtest.py
+# Beépített terheléses teszt: konfigurálható kérés-mix (tranzakció lista, kategóriák,
+# upload, bulk mentés) async HTTP klienssel, endpointonkénti throughput és
+# p50 / p95 / p99 latencia, JSON kimenettel (release-ek közötti összehasonlításhoz).
+#
+# Helyi futtatás (beágyazott sqlite adatbázissal, saját uvicorn workerrel):
+#   python loadtest.py --concurrency 20 --duration 30 --output results.json
+# Már futó API ellen:
+#   python loadtest.py --base-url http://localhost:8000
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+import pandas as pd
+
+DEFAULT_MIX = "transactions=60,categories=25,upload=5,bulk=10"
+DEFAULT_DB_PATH = "data/loadtest.db"
+
+# Bank export oszlopai (upload endpoint kötelező oszlopai)
+EXPORT_COLUMNS = [
+    "Tranzakció dátuma",
+    "Könyvelés dátuma",
+    "Típus",
+    "Bejövő/Kimenő",
+    "Partner neve",
+    "Partner számlaszáma/azonosítója",
+    "Költési kategória",
+    "Közlemény",
+    "Számla név",
+    "Számla szám",
+    "Összeg",
+    "Pénznem",
+]
+
+PARTNERS = [
+    "TESCO BUDAPEST",
+    "LIDL 1234",
+    "SPAR MAGYARORSZAG",
+    "NETFLIX.COM",
+    "UDEMY",
+    "MVM NEXT",
+    "BKK AUTOMATA",
+    "BPION KFT",
+]
+
+
+def random_transaction(rng: random.Random) -> Dict[str, Any]:
+    day = date(2023, 1, 1) + timedelta(days=rng.randint(0, 730))
+    partner = rng.choice(PARTNERS)
+    incoming = partner == "BPION KFT"
+    return {
+        "transaction_date": day.isoformat(),
+        "booking_date": day.isoformat(),
+        "transaction_type": "Kártyás fizetés",
+        "direction": "Bejövő" if incoming else "Kimenő",
+        # Egyedi partner szuffix, hogy a bulk mentés ne csak duplikátumot kapjon
+        "partner_name": f"{partner} {rng.randint(0, 10**9)}",
+        "partner_account": "11111111-22222222",
+        "expense_category": "Bolt",
+        "description": f"loadtest {rng.randint(0, 10**6)}",
+        "account_name": "Főszámla",
+        "account_number": "12345678-12345678",
+        "amount": 650000.0 if incoming else -float(rng.randint(100, 50000)),
+        "currency": "HUF",
+    }
+
+
+def make_statement(rows: int, rng: random.Random) -> bytes:
+    """Bank export formátumú xlsx generálása az upload endpointhoz"""
+    records = []
+    for _ in range(rows):
+        t = random_transaction(rng)
+        records.append(
+            [
+                t["transaction_date"],
+                t["booking_date"],
+                t["transaction_type"],
+                t["direction"],
+                t["partner_name"],
+                t["partner_account"],
+                t["expense_category"],
+                t["description"],
+                t["account_name"],
+                t["account_number"],
+                t["amount"],
+                t["currency"],
+            ]
+        )
+    buffer = io.BytesIO()
+    pd.DataFrame(records, columns=EXPORT_COLUMNS).to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise SystemExit(
+                f"Ismeretlen scenario: {name} (lehetséges: {list(SCENARIOS)})"
+            )
+        weights[name] = float(weight or 1)
+    return weights
+
+
+# --- Scenariók: egy kérés, visszatérés: HTTP státusz ---
+
+
+async def scenario_transactions(client: httpx.AsyncClient, ctx: Dict[str, Any]) -> int:
+    skip = ctx["rng"].randint(0, max(ctx["seed_rows"] - 100, 0))
+    response = await client.get(
+        "/api/transactions/", params={"skip": skip, "limit": 100}
+    )
+    return response.status_code
+
+
+async def scenario_categories(client: httpx.AsyncClient, ctx: Dict[str, Any]) -> int:
+    response = await client.get("/api/categories/")
+    return response.status_code
+
+
+async def scenario_upload(client: httpx.AsyncClient, ctx: Dict[str, Any]) -> int:
+    content = ctx["rng"].choice(ctx["statements"])
+    response = await client.post(
+        "/api/upload/",
+        files={
+            "file": (
+                "loadtest.xlsx",
+                content,
+                "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            )
+        },
+    )
+    return response.status_code
+
+
+async def scenario_bulk(client: httpx.AsyncClient, ctx: Dict[str, Any]) -> int:
+    rows = [random_transaction(ctx["rng"]) for _ in range(ctx["bulk_rows"])]
+    response = await client.post("/api/transactions/bulk", json=rows)
+    return response.status_code
+
+
+SCENARIOS = {
+    "transactions": scenario_transactions,
+    "categories": scenario_categories,
+    "upload": scenario_upload,
+    "bulk": scenario_bulk,
+}
+
+
+# --- Terhelés ---
+
+
+async def worker(
+    client: httpx.AsyncClient,
+    ctx: Dict[str, Any],
+    weights: Dict[str, float],
+    deadline: float,
+    samples: Dict[str, List[float]],
+    errors: Dict[str, int],
+) -> None:
+    names = list(weights)
+    weight_values = list(weights.values())
+    while time.perf_counter() < deadline:
+        name = ctx["rng"].choices(names, weights=weight_values)[0]
+        started = time.perf_counter()
+        try:
+            status_code = await SCENARIOS[name](client, ctx)
+            ok = status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        elapsed = time.perf_counter() - started
+        if ok:
+            samples[name].append(elapsed)
+        else:
+            errors[name] += 1
+
+
+def summarize(
+    samples: Dict[str, List[float]], errors: Dict[str, int], duration: float
+) -> Dict[str, Any]:
+    endpoints = {}
+    all_latencies = []
+    for name in samples:
+        latencies = np.array(samples[name]) * 1000
+        all_latencies.extend(latencies.tolist())
+        endpoints[name] = describe(latencies, errors[name], duration)
+    return {
+        "endpoints": endpoints,
+        "total": describe(np.array(all_latencies), sum(errors.values()), duration),
+    }
+
+
+def describe(latencies_ms: np.ndarray, error_count: int, duration: float) -> Dict:
+    if len(latencies_ms) == 0:
+        return {"requests": 0, "errors": error_count, "throughput_rps": 0.0}
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    return {
+        "requests": int(len(latencies_ms)),
+        "errors": error_count,
+        "throughput_rps": round(len(latencies_ms) / duration, 2),
+        "mean_ms": round(float(latencies_ms.mean()), 2),
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "max_ms": round(float(latencies_ms.max()), 2),
+    }
+
+
+async def run_load(args, weights: Dict[str, float]) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    ctx = {
+        "rng": rng,
+        "seed_rows": args.seed_rows,
+        "bulk_rows": args.bulk_rows,
+        "statements": (
+            [make_statement(args.upload_rows, rng) for _ in range(5)]
+            if "upload" in weights
+            else []
+        ),
+    }
+    samples = {name: [] for name in weights}
+    errors = {name: 0 for name in weights}
+
+    limits = httpx.Limits(
+        max_connections=args.concurrency, max_keepalive_connections=args.concurrency
+    )
+    async with httpx.AsyncClient(
+        base_url=args.base_url, limits=limits, timeout=args.timeout
+    ) as client:
+        # Bemelegítés (nem mérjük): lazy init, process pool indulás, cache-ek
+        if args.warmup > 0:
+            warmup_deadline = time.perf_counter() + args.warmup
+            await asyncio.gather(
+                *(
+                    worker(
+                        client,
+                        ctx,
+                        weights,
+                        warmup_deadline,
+                        {name: [] for name in weights},
+                        {name: 0 for name in weights},
+                    )
+                    for _ in range(args.concurrency)
+                )
+            )
+
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(
+            *(
+                worker(client, ctx, weights, deadline, samples, errors)
+                for _ in range(args.concurrency)
+            )
+        )
+        duration = time.perf_counter() - started
+
+    return {"duration_s": round(duration, 2), **summarize(samples, errors, duration)}
+
+
+# --- Helyi szerver (beágyazott adatbázis) ---
+
+
+def prepare_database(db_path: str, seed_rows: int) -> str:
+    """Friss sqlite adatbázis: táblák, alap kategóriák, seed tranzakciók"""
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    database_url = f"sqlite:///{db_path}"
+    os.environ["DATABASE_URL"] = database_url
+
+    from app.database.database import Base, SessionLocal, engine
+    from app.database.models import Transaction
+    from app.services.deduplication import compute_fingerprint
+    from seed_categories import seed_default_categories
+
+    Base.metadata.create_all(bind=engine)
+    seed_default_categories()
+
+    rng = random.Random(0)
+    db = SessionLocal()
+    try:
+        rows = []
+        for _ in range(seed_rows):
+            t = random_transaction(rng)
+            t["transaction_date"] = datetime.fromisoformat(t["transaction_date"]).date()
+            t["booking_date"] = t["transaction_date"]
+            t["fingerprint"] = compute_fingerprint(
+                t["transaction_date"], t["amount"], t["partner_name"]
+            )
+            rows.append(t)
+        db.bulk_insert_mappings(Transaction, rows)
+        db.commit()
+    finally:
+        db.close()
+    engine.dispose()
+    return database_url
+
+
+def start_server(database_url: str, port: int) -> subprocess.Popen:
+    env = {**os.environ, "DATABASE_URL": database_url, "DEBUG": "False"}
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "main:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--workers",
+            "1",
+            "--log-level",
+            "warning",
+        ],
+        env=env,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        if process.poll() is not None:
+            raise SystemExit("❌ Az API nem indult el")
+        try:
+            if httpx.get(f"{base_url}/api/health", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise SystemExit("❌ Az API nem válaszol a /api/health végponton")
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(
+        f"\n{'endpoint':<14}{'req':>8}{'err':>6}{'rps':>9}"
+        f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    )
+    rows = list(report["endpoints"].items()) + [("TOTAL", report["total"])]
+    for name, stats in rows:
+        print(
+            f"{name:<14}{stats['requests']:>8}{stats['errors']:>6}"
+            f"{stats['throughput_rps']:>9}"
+            f"{stats.get('p50_ms', '-'):>10}{stats.get('p95_ms', '-'):>10}"
+            f"{stats.get('p99_ms', '-'):>10}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Finance App API terheléses teszt")
+    parser.add_argument(
+        "--base-url", help="Már futó API címe (alapból helyi szerver indul sqlite-tal)"
+    )
+    parser.add_argument("--db-path", default=DEFAULT_DB_PATH)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30, help="Mérés hossza (s)")
+    parser.add_argument("--warmup", type=float, default=3, help="Bemelegítés (s)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="pl. " + DEFAULT_MIX)
+    parser.add_argument("--seed-rows", type=int, default=5000)
+    parser.add_argument("--upload-rows", type=int, default=200)
+    parser.add_argument("--bulk-rows", type=int, default=100)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="JSON eredmény fájl")
+    args = parser.parse_args(argv)
+
+    weights = parse_mix(args.mix)
+
+    server = None
+    if not args.base_url:
+        print(f"Preparing embedded database ({args.db_path}, {args.seed_rows} rows)...")
+        database_url = prepare_database(args.db_path, args.seed_rows)
+        server = start_server(database_url, args.port)
+        args.base_url = f"http://127.0.0.1:{args.port}"
+
+    try:
+        print(
+            f"Running load test: {args.concurrency} concurrent clients, "
+            f"{args.duration}s, mix {weights}"
+        )
+        results = asyncio.run(run_load(args, weights))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+
+    report = {
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "base_url": args.base_url,
+            "embedded_db": server is not None,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "mix": weights,
+            "seed_rows": args.seed_rows,
+            "upload_rows": args.upload_rows,
+            "bulk_rows": args.bulk_rows,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        **results,
+    }
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\n✅ Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
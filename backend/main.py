@@ -1,13 +1,22 @@
 from typing import Union
 
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 import os
 from dotenv import load_dotenv
+from app.database import database
+from app.database.database import replication_status
+from app.routers import analytics
+from app.routers import budgets
 from app.routers import categories
+from app.routers import changes
 from app.routers import category_keywords
+from app.routers import profiles
 from app.routers import transactions
 from app.routers import upload
+from app.services import metrics, profiling, read_your_writes
+from app.services.compression import CompressionMiddleware
 
 load_dotenv()
 
@@ -26,10 +35,29 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Válasz tömörítés (br / gzip az Accept-Encoding alapján, SSE kivételével)
+app.add_middleware(CompressionMiddleware)
+
+# Kérésenkénti latencia és folyamatban lévő kérések (GET /metrics)
+app.add_middleware(metrics.MetricsMiddleware)
+
+# Kérésenkénti profilozás (X-Profile: 1 header / PROFILE_SAMPLE_RATE), csak ha
+# engedélyezett - kikapcsolva a middleware be sem kerül a láncba
+if profiling.PROFILING_ENABLED:
+    app.add_middleware(profiling.ProfilingMiddleware)
+
+# Read-your-writes commit token (cookie) - csak külön olvasó replika esetén
+if database.read_engine is not database.engine:
+    app.add_middleware(read_your_writes.ReadYourWritesMiddleware)
+
 app.include_router(categories.router, prefix="/api")
 app.include_router(category_keywords.router, prefix="/api")
 app.include_router(transactions.router, prefix="/api")
 app.include_router(upload.router, prefix="/api")
+app.include_router(analytics.router, prefix="/api")
+app.include_router(budgets.router, prefix="/api")
+app.include_router(profiles.router, prefix="/api")
+app.include_router(changes.router, prefix="/api")
 
 
 @app.get("/")
@@ -37,9 +65,19 @@ async def root():
     return {"message": "Finance App API v1.0", "status": "running"}
 
 
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Prometheus scrape végpont (text exposition formátum)"""
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
 @app.get("/api/health")
 async def health_check():
-    return {"status": "healthy", "version": "1.0.0"}
+    return {
+        "status": "healthy",
+        "version": "1.0.0",
+        "database": replication_status(),
+    }
 
 
 if __name__ == "__main__":
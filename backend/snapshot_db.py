@@ -0,0 +1,75 @@
+# snapshot_db.py
+# Teljes adatbázis mentés / visszatöltés tömörített Parquet fájlokba
+# (categories, category_keywords, budgets, transactions - eredeti id-kkal;
+# a budget_totals összesítők restore után újraépülnek).
+#
+# Használat:
+#   python snapshot_db.py create snapshots/2025-06-01
+#   python snapshot_db.py restore snapshots/2025-06-01 [--replace]
+#   python snapshot_db.py restore snapshots/2025-06-01 --database-url sqlite:///data/dev.db
+#
+# --database-url nélkül a .env / DATABASE_URL szerinti adatbázist használja.
+# Az archivált tranzakciók (ARCHIVE_DIR) már fájlok, azokat külön kell másolni.
+import argparse
+import sys
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.services import snapshot
+
+
+def get_engine(database_url: str = None):
+    if database_url:
+        return create_engine(database_url)
+    from app.database.database import engine
+
+    return engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Adatbázis mentés / visszatöltés")
+    parser.add_argument("command", choices=["create", "restore"])
+    parser.add_argument("directory", help="Mentés könyvtára")
+    parser.add_argument("--database-url", help="Cél / forrás adatbázis URL")
+    parser.add_argument(
+        "--replace", action="store_true", help="Restore: meglévő adatok felülírása"
+    )
+    parser.add_argument("--batch-size", type=int, default=None)
+    args = parser.parse_args()
+
+    engine = get_engine(args.database_url)
+
+    try:
+        if args.command == "create":
+            result = snapshot.create_snapshot(
+                engine, args.directory, args.batch_size or snapshot.READ_BATCH_SIZE
+            )
+        else:
+            # Üres cél adatbázisnál a táblák is létrejönnek (create_tables.py nélkül)
+            from app.database.database import Base
+            from app.database import models  # noqa: F401
+
+            Base.metadata.create_all(bind=engine)
+            db = sessionmaker(bind=engine, autocommit=False, autoflush=False)()
+            try:
+                result = snapshot.restore_snapshot(
+                    db,
+                    args.directory,
+                    replace=args.replace,
+                    batch_size=args.batch_size or snapshot.INSERT_BATCH_SIZE,
+                )
+            finally:
+                db.close()
+    except Exception as e:
+        print(f"❌ Snapshot {args.command} failed: {e}")
+        sys.exit(1)
+
+    for table_name, info in result["tables"].items():
+        rows = info["rows"] if isinstance(info, dict) else info
+        print(f"  - {table_name}: {rows} rows")
+    print(f"✅ Snapshot {args.command} done in {result['elapsed_seconds']}s")
+
+
+if __name__ == "__main__":
+    main()
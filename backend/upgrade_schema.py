@@ -0,0 +1,72 @@
+# upgrade_schema.py
+# Meglévő adatbázis sémájának frissítése a modellekhez (új táblák, oszlopok, indexek).
+# A create_all csak hiányzó táblákat hoz létre, meglévő táblát nem módosít.
+from sqlalchemy import inspect, text
+
+from app.database.database import engine, Base
+from app.database import models  # noqa: F401  (modellek regisztrálása)
+
+
+def add_missing_columns(conn, table, existing_columns):
+    dialect = conn.dialect
+    add_keyword = "ADD" if dialect.name == "mssql" else "ADD COLUMN"
+
+    for column in table.columns:
+        if column.name in existing_columns:
+            continue
+
+        column_type = column.type.compile(dialect=dialect)
+        default = ""
+        if column.server_default is not None:
+            arg = column.server_default.arg
+            if isinstance(arg, str):
+                default = f" DEFAULT '{arg}'"
+            else:
+                default = f" DEFAULT {arg.compile(dialect=dialect)}"
+        elif not column.nullable:
+            print(
+                f"  ⚠️  {table.name}.{column.name}: NOT NULL oszlop default nélkül, kihagyva"
+            )
+            continue
+
+        nullability = " NULL" if column.nullable else " NOT NULL"
+        conn.execute(
+            text(
+                f"ALTER TABLE {table.name} {add_keyword} {column.name} {column_type}{default}{nullability}"
+            )
+        )
+        print(f"  + {table.name}.{column.name} ({column_type})")
+
+
+def upgrade_schema():
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                table.create(conn)
+                print(f"  + {table.name} (új tábla)")
+                continue
+
+            existing_columns = {
+                col["name"] for col in inspector.get_columns(table.name)
+            }
+            add_missing_columns(conn, table, existing_columns)
+
+            existing_indexes = {
+                idx["name"] for idx in inspector.get_indexes(table.name)
+            }
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    index.create(conn)
+                    print(f"  + {table.name}.{index.name} (index)")
+
+
+if __name__ == "__main__":
+    try:
+        print("Upgrading schema...")
+        upgrade_schema()
+        print("✅ Schema up to date!")
+    except Exception as e:
+        print(f"❌ Schema upgrade failed: {e}")